@@ -1,11 +1,24 @@
 import asyncio
+import signal
+import threading
 from contextlib import asynccontextmanager
+from typing import Callable, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query
 from api.schemas import SessionRequest, SessionResponse
-from application.services.session_service import create_session, get_session, list_sessions_for_user, replay_session, verify_event_chain
+from application.services.session_service import create_session, get_session, list_sessions_for_user, list_sessions_page, replay_session, verify_event_chain
 from api.routes.streaming import router as streaming_router
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from application.services.executor import ExecutorSaturated, get_blocking_executor
+from application.services.pipeline_cache import get_pipeline_cache
+from infrastructure.persistence.session_repository import IdempotencyConflict
+from domain.phases.purity import purity_stats
+from application.services.daily_update_service import daily_update_stats
+from reflecto.instrumentation import instrumentation_stats
+from infrastructure.persistence.connection_pool import pool_stats
+from infrastructure.streaming.connections import get_stream_registry
+from infrastructure.streaming.frame_cache import get_frame_cache
 
 from api.routes.write import router as write_router
 from api.routes import daily
@@ -15,16 +28,75 @@ from api.routes import daily
 # Global shutdown event for SSE cancellation
 shutdown_event = asyncio.Event()
 
+EXIT_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+
+def begin_shutdown() -> "asyncio.Future":
+    """
+    Close open SSE streams (flushing what they already buffered) within
+    REFLECTO_STREAM_DRAIN_SECONDS. Runs on the event loop; idempotent.
+    """
+    shutdown_event.set()
+    return get_stream_registry().start_drain()
+
+
+def _drain_on_exit_signals(loop: asyncio.AbstractEventLoop) -> Callable[[], None]:
+    """
+    Start the drain as soon as the server is told to exit. Uvicorn reaches
+    lifespan shutdown only after every connection has closed, so waiting for
+    it would let one open stream hold up a restart. The server's own handler
+    still runs afterwards. Returns a function restoring the previous handlers.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        # Handlers can only be installed from the main thread (e.g. TestClient)
+        return lambda: None
+    previous = {signum: signal.getsignal(signum) for signum in EXIT_SIGNALS}
+
+    def handler(signum, frame):
+        loop.call_soon_threadsafe(begin_shutdown)
+        chained = previous[signum]
+        if callable(chained):
+            chained(signum, frame)
+
+    for signum in EXIT_SIGNALS:
+        signal.signal(signum, handler)
+
+    def restore() -> None:
+        for signum, chained in previous.items():
+            signal.signal(signum, chained)
+
+    return restore
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    yield
-    shutdown_event.set()
+    streams = get_stream_registry()
+    shutdown_event.clear()
+    streams.reopen()
+    restore_signals = _drain_on_exit_signals(asyncio.get_running_loop())
+    try:
+        yield
+    finally:
+        restore_signals()
+    # Usually already started by the exit signal; this joins it
+    await begin_shutdown()
 
 
 app = FastAPI(title="Reflecto API", version="1.0", lifespan=lifespan)
 
 
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request, exc: ExecutorSaturated):
+    # Blocking executor is full: shed load instead of queueing behind slow sessions
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+
+@app.exception_handler(IdempotencyConflict)
+async def idempotency_conflict_handler(request, exc: IdempotencyConflict):
+    # Same key, different body: refuse rather than replay an unrelated session
+    return JSONResponse(status_code=422, content={"detail": str(exc)})
+
+
 
 app.include_router(daily.router)
 
@@ -57,7 +129,6 @@ app.include_router(streaming_router)
 
 # POST /avatar/render: generate avatar image for user
 from fastapi import Request
-from fastapi.responses import JSONResponse
 
 @app.post("/avatar/render")
 async def render_avatar(request: Request):
@@ -70,7 +141,11 @@ async def render_avatar(request: Request):
 
 # POST /session: run and persist session
 @app.post("/session")
-def post_session(req: SessionRequest):
+def post_session(
+    req: SessionRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    timings: bool = Query(False),
+):
     # user_id must be in req
     if not hasattr(req, 'user_id') or not req.user_id:
         raise HTTPException(status_code=400, detail="user_id required")
@@ -81,7 +156,12 @@ def post_session(req: SessionRequest):
         "flow_context": req.flow_context,
         "raw_response": req.raw_response
     }
-    result = create_session(req.user_id, input_data)
+    result = create_session(
+        req.user_id,
+        input_data,
+        idempotency_key=idempotency_key,
+        include_timings=timings,
+    )
     return result
 
 # GET /session/{id}: retrieve session by id
@@ -93,9 +173,26 @@ def get_session_api(session_id: str):
     return session
 
 # GET /sessions/{user_id}: list sessions for user
+# Any of limit/cursor/fields switches to the keyset-paginated page shape:
+#   {"items": [...], "next_cursor": str | None}
 @app.get("/sessions/{user_id}")
-def list_sessions_api(user_id: str):
-    return list_sessions_for_user(user_id)
+def list_sessions_api(
+    user_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    if limit is None and cursor is None and fields is None:
+        return list_sessions_for_user(user_id)
+    try:
+        return list_sessions_page(
+            user_id,
+            limit=limit or 50,
+            cursor=cursor,
+            fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
 # Phase 12B: Session Replay (Audit Mode)
@@ -110,3 +207,18 @@ def replay_session_api(session_id: str):
 @app.get("/session/{session_id}/verify")
 def verify_session_events(session_id: str):
     return verify_event_chain(session_id)
+
+
+# Runtime metrics: executor latency/backpressure, caches, SQLite pools
+@app.get("/metrics")
+def metrics():
+    return {
+        "executor": get_blocking_executor().stats(),
+        "pipeline_cache": get_pipeline_cache().stats(),
+        "sse_frame_cache": get_frame_cache().stats(),
+        "sse_streams": get_stream_registry().stats(),
+        "purity": purity_stats(),
+        "daily_update": daily_update_stats(),
+        "stages": instrumentation_stats(),
+        "sqlite_pools": pool_stats(),
+    }
@@ -1,14 +1,38 @@
-from fastapi import APIRouter
-from application.services.daily_update_service import run_daily_update_service
+from typing import Optional
+
+from fastapi import APIRouter, Header, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from application.services.daily_update_service import daily_update_etag, run_daily_update_service
 from interfaces.runtime.store_adapters import get_identity_store, get_prompt_store
 
 router = APIRouter()
 
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
 @router.get("/daily/{user_id}/{day}")
-def daily_update(user_id: str, day: str):
-    return run_daily_update_service(
+def daily_update(
+    user_id: str,
+    day: str,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+):
+    """
+    Daily update for a user-day. Carries an ETag; pollers sending it back in
+    If-None-Match get 304 while nothing has changed.
+    """
+    result = run_daily_update_service(
         user_id=user_id,
         day=day,
         identity_store=get_identity_store(),
         prompt_store=get_prompt_store(),
     )
+    etag = daily_update_etag(result)
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(jsonable_encoder(result), headers={"ETag": etag})
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 
 from api.schemas import SessionRequest
+from application.services.executor import run_blocking
 from application.services.session_service import create_session
 
 router = APIRouter()
@@ -46,8 +47,10 @@ async def start_session(request: Request):
     if not payload.user_id:
         raise HTTPException(status_code=400, detail="user_id required")
 
-    result = create_session(
+    result = await run_blocking(
+        create_session,
         user_id=payload.user_id,
         input_data=payload.model_dump(),
+        idempotency_key=request.headers.get("Idempotency-Key"),
     )
     return {"session_id": result["session_id"], "status": "started"}
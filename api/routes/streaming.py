@@ -1,12 +1,15 @@
 import os
+from typing import Optional
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, HTTPException, Query
 from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
 
 from api.schemas import SessionRequest
+from application.services.executor import run_blocking
 from application.services.session_service import create_session
-from application.services.streaming_service import stream_session_events
+from application.services.streaming_service import stream_session_events, stream_user_events
+from infrastructure.streaming.connections import get_stream_registry
 
 router = APIRouter()
 
@@ -18,6 +21,14 @@ def is_test_mode() -> bool:
     return os.getenv("PYTEST_RUNNING") == "1"
 
 
+def sse_response(stream) -> StreamingResponse:
+    """SSE response with heartbeats, slow-client disconnect and shutdown drain."""
+    registry = get_stream_registry()
+    if registry.draining:
+        raise HTTPException(status_code=503, detail="Shutting down", headers={"Retry-After": "1"})
+    return StreamingResponse(registry.guard(stream.__aiter__()), media_type="text/event-stream")
+
+
 # ------------------------------------------
 # Wrapper Expected by Tests
 # ------------------------------------------
@@ -29,15 +40,20 @@ class StreamSessionRequest(BaseModel):
 # Streaming Endpoint
 # ------------------------------------------
 @router.post("/session/stream")
-async def session_stream(payload: StreamSessionRequest):
+async def session_stream(
+    payload: StreamSessionRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
 
     # Unwrap request
     req = payload.input
 
     # Create session
-    session = create_session(
+    session = await run_blocking(
+        create_session,
         user_id=req.user_id,
-        input_data=req.model_dump()
+        input_data=req.model_dump(),
+        idempotency_key=idempotency_key,
     )
 
     session_id = session["session_id"]
@@ -46,26 +62,47 @@ async def session_stream(payload: StreamSessionRequest):
     # Test Mode → Deterministic JSON
     # --------------------------------------
     if is_test_mode():
-        events = [chunk async for chunk in stream_session_events(session_id=session_id)]
+        # The session is complete here: a replay yields every frame
+        events = await run_blocking(list, stream_session_events(session_id=session_id))
         return JSONResponse(events)
 
     # --------------------------------------
     # Production Streaming Mode
     # --------------------------------------
-    return StreamingResponse(
-        stream_session_events(session_id=session_id),
-        media_type="text/event-stream"
-    )
+    return sse_response(stream_session_events(session_id=session_id))
 
 
 @router.get("/session/{session_id}/stream")
-async def session_stream_sse(session_id: str):
+async def session_stream_sse(
+    session_id: str,
+    after: Optional[int] = Query(None, ge=0),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
     """
     SSE endpoint for streaming session events in deterministic order.
     Does NOT create session or execute domain logic.
     Closes when session completes.
+    Each frame's id is its event_index; a reconnect carrying Last-Event-ID
+    (or ?after=) resumes after that event instead of replaying the journal.
     """
-    return StreamingResponse(
-        stream_session_events(session_id=session_id),
-        media_type="text/event-stream"
-    )
+    after_index = after
+    if last_event_id is not None and last_event_id.strip():
+        try:
+            after_index = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+        if after_index < 0:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+
+    return sse_response(stream_session_events(session_id=session_id, after_index=after_index))
+
+
+@router.get("/user/{user_id}/stream")
+async def user_stream_sse(user_id: str, types: Optional[str] = Query(None)):
+    """
+    One SSE connection per user: live journal events from all of the user's
+    sessions (tagged with session_id), daily updates and avatar state
+    changes. ?types=presence,done,daily_update filters server-side.
+    """
+    wanted = [t.strip() for t in types.split(",") if t.strip()] if types else None
+    return sse_response(stream_user_events(user_id=user_id, types=wanted))
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Query
 from api.contracts.write import ActionWrite
 from application.services.action_service import add_action
+from application.services.executor import run_blocking
 from application.services.mood_scoring_service import score_mood_from_note
 from extensions.llm_bridge.openai_adapter import OpenAIAdapter
 from interfaces.runtime.action_store_adapters import get_action_store
@@ -17,7 +18,7 @@ async def write_action(
     # If note is present and value is not, try to assign mood score
     if action.note and action.value is None:
         action.value = await score_mood_from_note(action.note, llm_bridge=_LLM_BRIDGE)
-    count = add_action(session_id, action, store=get_action_store())
+    count = await run_blocking(add_action, session_id, action, store=get_action_store())
     return {
         "status": "accepted",
         "count": count,
@@ -0,0 +1,174 @@
+"""
+Nightly batch daily update for every active user of a day.
+
+    python -m application.services.daily_batch 2026-02-08 [--db sessions.db]
+        [--workers N] [--chunk-size N] [--restart]
+
+Users with journal events on the day are split into chunks. Worker
+processes compute each chunk with prepare_daily_update() (reads and pure
+computation, no writes); the parent saves identities and writes a chunk's
+results together with its checkpoint in one transaction. An interrupted run
+resumes where it stopped: checkpointed users are skipped unless --restart.
+
+Results land in daily_update_state with the same watermark and input digest
+a request would compute, so morning traffic gets the stored result instead
+of running the update inline.
+
+Settings:
+  REFLECTO_DAILY_BATCH_WORKERS      worker processes (default: CPU count; 0 runs inline)
+  REFLECTO_DAILY_BATCH_CHUNK_SIZE   users per chunk and per write transaction (default 64)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from application.ports.identity_store import IdentityStorePort
+from application.ports.prompt_store import PromptStorePort
+from application.services.daily_update_service import PreparedDailyUpdate, prepare_daily_update
+from infrastructure.persistence.session_repository import SessionRepository
+from interfaces.runtime.store_adapters import get_identity_store, get_prompt_store
+from reflecto.instrumentation import StageTiming, collect_timings, measure, timings_block
+
+ChunkResult = Tuple[List[PreparedDailyUpdate], List[Tuple[str, str]], List[StageTiming]]
+
+
+def batch_job_name(day: str) -> str:
+    return f"daily_update:{day}"
+
+
+def _prepare_chunk(
+    db_path: str,
+    day: str,
+    user_ids: Sequence[str],
+    identity_store: IdentityStorePort,
+    prompt_store: PromptStorePort,
+) -> ChunkResult:
+    # Runs in a worker process: its own repository and connection pool
+    repo = SessionRepository(db_path)
+    prepared: List[PreparedDailyUpdate] = []
+    failed: List[Tuple[str, str]] = []
+    with collect_timings() as timings:
+        for user_id in user_ids:
+            try:
+                prepared.append(prepare_daily_update(repo, user_id, day, identity_store, prompt_store))
+            except Exception as exc:
+                # Left uncheckpointed, so the next run retries it
+                failed.append((user_id, f"{type(exc).__name__}: {exc}"))
+    return prepared, failed, list(timings)
+
+
+def run_daily_batch(
+    day: str,
+    db_path: str = "sessions.db",
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    identity_store: Optional[IdentityStorePort] = None,
+    prompt_store: Optional[PromptStorePort] = None,
+    restart: bool = False,
+) -> Dict[str, object]:
+    """
+    Compute and store the daily update of every user active on `day`.
+    Returns a report with counts, throughput and per-stage timings.
+    """
+    if workers is None:
+        workers = int(os.getenv("REFLECTO_DAILY_BATCH_WORKERS", str(os.cpu_count() or 1)))
+    if chunk_size is None:
+        chunk_size = int(os.getenv("REFLECTO_DAILY_BATCH_CHUNK_SIZE", "64"))
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be >= 1")
+    if workers > 0 and db_path == ":memory:":
+        raise ValueError("An in-memory database cannot be shared with worker processes; use workers=0")
+    identity_store = identity_store or get_identity_store()
+    prompt_store = prompt_store or get_prompt_store()
+
+    started = time.perf_counter()
+    repo = SessionRepository(db_path)
+    job = batch_job_name(day)
+    if restart:
+        repo.clear_batch_checkpoint(job)
+    users = repo.list_active_users(day)
+    done = repo.get_batch_checkpoint(job)
+    pending = [user_id for user_id in users if user_id not in done]
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+
+    report: Dict[str, object] = {
+        "day": day,
+        "job": job,
+        "users": len(users),
+        "resumed": len(users) - len(pending),
+        "computed": 0,
+        "unchanged": 0,
+        "failed": {},
+        "workers": workers,
+        "chunks": len(chunks),
+    }
+    timings: List[StageTiming] = []
+
+    def write(result: ChunkResult) -> None:
+        prepared, failed, chunk_timings = result
+        timings.extend(chunk_timings)
+        changed = [p for p in prepared if not p.stored]
+        with collect_timings() as written, measure("daily_batch", "write"):
+            for p in changed:
+                identity_store.save_identity(p.user_id, p.result["identity"])
+            repo.save_daily_updates(
+                [p.as_write() for p in changed],
+                checkpoint=job,
+                checkpoint_users=[p.user_id for p in prepared],
+            )
+        timings.extend(written)
+        report["computed"] += len(changed)
+        report["unchanged"] += len(prepared) - len(changed)
+        report["failed"].update(failed)
+
+    if workers == 0 or len(chunks) <= 1:
+        for chunk in chunks:
+            write(_prepare_chunk(db_path, day, chunk, identity_store, prompt_store))
+    else:
+        # spawn: forked children would inherit the parent's SQLite connections
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context) as pool:
+            futures = [
+                pool.submit(_prepare_chunk, db_path, day, chunk, identity_store, prompt_store)
+                for chunk in chunks
+            ]
+            for future in as_completed(futures):
+                write(future.result())
+
+    elapsed = time.perf_counter() - started
+    processed = report["computed"] + report["unchanged"]
+    report["elapsed_seconds"] = elapsed
+    report["users_per_second"] = processed / elapsed if elapsed > 0 else 0.0
+    report["stages"] = timings_block(timings)
+    return report
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Precompute daily updates for every active user of a day.")
+    parser.add_argument("day", help="UTC day, YYYY-MM-DD")
+    parser.add_argument("--db", default="sessions.db", help="SQLite database path")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (0 runs inline)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="users per chunk / write transaction")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint of a previous run")
+    args = parser.parse_args(argv)
+
+    report = run_daily_batch(
+        args.day,
+        db_path=args.db,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        restart=args.restart,
+    )
+    print(json.dumps(report, indent=2, sort_keys=True))
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
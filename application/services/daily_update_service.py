@@ -1,11 +1,151 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
 
 from infrastructure.persistence.session_repository import SessionRepository
+from infrastructure.persistence.canonical import canonical_json
 from domain.core.daily_update import run_daily_update
-from domain.core.snapshot_builder import build_daily_snapshot
 from application.ports.identity_store import IdentityStorePort
 from application.ports.prompt_store import PromptStorePort
 from application.services.reflection_service import build_reflection_prompt
+from reflecto.instrumentation import measure
+
+# Bump when the daily update logic changes so stored results are recomputed
+DAILY_UPDATE_VERSION = "v1"
+
+_stats_lock = threading.Lock()
+_stats = {"computed": 0, "skipped": 0}
+
+
+# Newest stored days feeding patterns (streaks use the whole user_stats window)
+PATTERN_WINDOW = 13
+
+
+def _input_digest(today_snapshot: Dict[str, Any], day: str, stats: Dict[str, Any]) -> str:
+    # Other days only matter through what streaks and patterns read from them
+    history = [
+        entry for entry in zip(stats["days"], stats["meaningful"], stats["focus"]) if entry[0] != day
+    ]
+    payload = {
+        "version": DAILY_UPDATE_VERSION,
+        "snapshot": today_snapshot,
+        "history": history,
+    }
+    return hashlib.sha256(canonical_json(payload).encode("utf-8")).hexdigest()
+
+
+def _window_snapshots(stats: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    user_stats windows as the snapshot-shaped entries compute_streak and
+    extract_patterns read (newest first), without decoding stored snapshots.
+    """
+    return [
+        {"snapshot": {"meaningful_events": count, "skills": {} if focus is None else {"focus": focus}}}
+        for count, focus in zip(stats["meaningful"], stats["focus"])
+    ]
+
+
+def daily_update_etag(result: Dict[str, Any]) -> str:
+    """Strong ETag over the canonical form of a daily update response."""
+    return '"' + hashlib.sha256(canonical_json(result).encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def daily_update_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
+
+
+@dataclass(frozen=True)
+class PreparedDailyUpdate:
+    """A computed (or stored) daily update and the inputs that produced it."""
+
+    user_id: str
+    day: str
+    event_count: int
+    high_water_index: Optional[int]
+    input_digest: str
+    result: Dict[str, Any]
+    stored: bool  # True: inputs unchanged, result is the stored one and nothing needs writing
+
+    def as_write(self) -> Dict[str, Any]:
+        """Row for SessionRepository.save_daily_updates()."""
+        return {
+            "user_id": self.user_id,
+            "day": self.day,
+            "snapshot": self.result["snapshot"],
+            "avatar_state": self.result["avatar_state"],
+            "event_count": self.event_count,
+            "high_water_index": self.high_water_index,
+            "input_digest": self.input_digest,
+            "result": canonical_json(self.result),
+        }
+
+
+def prepare_daily_update(
+    repo: SessionRepository,
+    user_id: str,
+    day: str,
+    identity_store: IdentityStorePort,
+    prompt_store: PromptStorePort,
+) -> PreparedDailyUpdate:
+    """Read the inputs and compute a user-day's update. Writes nothing."""
+    with measure("daily_update", "load"):
+        # Folded at append time; one row instead of re-reading the day's journal
+        aggregate = repo.get_daily_aggregate(user_id, day)
+        today_snapshot = aggregate["snapshot"]
+
+        # Nothing new for the day and no other day changed: serve the stored
+        # result instead of rewriting snapshot, avatar state and identity.
+        # State written by the update itself (avatar, identity) is not an input.
+        stats = repo.get_user_stats(user_id)
+        input_digest = _input_digest(today_snapshot, day, stats)
+        state = repo.get_daily_update_state(user_id, day)
+    if (
+        state is not None
+        and state["event_count"] == aggregate["event_count"]
+        and state["high_water_index"] == aggregate["high_water_index"]
+        and state["input_digest"] == input_digest
+    ):
+        return PreparedDailyUpdate(
+            user_id, day, aggregate["event_count"], aggregate["high_water_index"],
+            input_digest, json.loads(state["result"]), stored=True,
+        )
+
+    # Build the pure update payload (include today's snapshot for streak/patterns)
+    history = _window_snapshots(stats)
+    daily_snapshots = [{"snapshot": today_snapshot}] + history
+    raw_snapshots = [{"snapshot": today_snapshot}] + history[:PATTERN_WINDOW]
+
+    with measure("daily_update", "load"):
+        prev = repo.get_avatar_state(user_id)
+        prev_state = prev["state"] if prev else None
+
+        identity = identity_store.load_identity(user_id)
+
+    with measure("daily_update", "compute"):
+        update = run_daily_update(
+            day=day,
+            events=None,
+            daily_snapshots=daily_snapshots,
+            raw_snapshots=raw_snapshots,
+            prev_avatar_state=prev_state,
+            identity=identity,
+            snapshot=today_snapshot,
+        )
+
+    with measure("daily_update", "reflection_prompt"):
+        reflection_prompt = build_reflection_prompt(
+            snapshot=update["snapshot"],
+            avatar_state=update["avatar_state"],
+            prompt_store=prompt_store,
+        )
+
+    return PreparedDailyUpdate(
+        user_id, day, aggregate["event_count"], aggregate["high_water_index"], input_digest,
+        {**update, "reflection_prompt": reflection_prompt}, stored=False,
+    )
 
 
 def run_daily_update_service(
@@ -20,39 +160,17 @@ def run_daily_update_service(
     if prompt_store is None:
         raise ValueError("prompt_store is required")
     repo = repo or SessionRepository()
-    events = repo.get_events_for_user_day(user_id, day)
+    prepared = prepare_daily_update(repo, user_id, day, identity_store, prompt_store)
+    if prepared.stored:
+        with _stats_lock:
+            _stats["skipped"] += 1
+        return prepared.result
 
-    today_snapshot = build_daily_snapshot(events)
-    # Build the pure update payload (include today's snapshot for streak/patterns)
-    daily_snapshots = [{"snapshot": today_snapshot}] + repo.list_daily_snapshots(user_id=user_id, limit=60)
-    raw_snapshots = [{"snapshot": today_snapshot}] + repo.list_daily_snapshots(user_id=user_id, limit=13)
-
-    prev = repo.get_avatar_state(user_id)
-    prev_state = prev["state"] if prev else None
-
-    identity = identity_store.load_identity(user_id)
-
-    update = run_daily_update(
-        day=day,
-        events=events,
-        daily_snapshots=daily_snapshots,
-        raw_snapshots=raw_snapshots,
-        prev_avatar_state=prev_state,
-        identity=identity,
-    )
-
-    # Persist derived outputs
-    repo.upsert_daily_snapshot(user_id, day, update["snapshot"])
-    repo.upsert_avatar_state(user_id, update["avatar_state"], version="v1")
-    identity_store.save_identity(user_id, update["identity"])
-
-    reflection_prompt = build_reflection_prompt(
-        snapshot=update["snapshot"],
-        avatar_state=update["avatar_state"],
-        prompt_store=prompt_store,
-    )
-
-    return {
-        **update,
-        "reflection_prompt": reflection_prompt,
-    }
+    # Persist derived outputs; the update state is committed with the rows,
+    # so if the identity write or the transaction fails the next call recomputes
+    with measure("daily_update", "persist"):
+        identity_store.save_identity(user_id, prepared.result["identity"])
+        repo.save_daily_updates([prepared.as_write()])
+    with _stats_lock:
+        _stats["computed"] += 1
+    return prepared.result
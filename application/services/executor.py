@@ -0,0 +1,144 @@
+"""
+Bounded executor for blocking work called from async routes.
+
+create_session runs the pipeline, SQLite writes and hashing synchronously;
+async handlers dispatch it here instead of running it on the event loop.
+Admission is bounded: once workers + queue slots are all taken, run()
+raises ExecutorSaturated immediately (routes map it to 503) rather than
+letting requests pile up behind a slow session.
+
+Settings:
+  REFLECTO_EXECUTOR_WORKERS     worker threads (default 8)
+  REFLECTO_EXECUTOR_MAX_QUEUE   calls allowed to wait for a worker (default 32)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class ExecutorSaturated(RuntimeError):
+    pass
+
+
+class BlockingExecutor:
+    def __init__(self, workers: int = 8, max_queue: int = 32, name: str = "reflecto-blocking"):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.workers = workers
+        self.max_queue = max(0, max_queue)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "latency_total_seconds": 0.0,
+            "latency_max_seconds": 0.0,
+            "queue_wait_total_seconds": 0.0,
+        }
+        self._buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    @classmethod
+    def from_env(cls) -> "BlockingExecutor":
+        return cls(
+            workers=int(os.getenv("REFLECTO_EXECUTOR_WORKERS", "8")),
+            max_queue=int(os.getenv("REFLECTO_EXECUTOR_MAX_QUEUE", "32")),
+        )
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run func(*args, **kwargs) on a worker thread and await its result."""
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._stats["rejected"] += 1
+                raise ExecutorSaturated(
+                    f"Blocking executor saturated ({self._in_flight}/{self.capacity} in flight)"
+                )
+            self._in_flight += 1
+            self._stats["submitted"] += 1
+
+        submitted = time.perf_counter()
+
+        def call() -> T:
+            started = time.perf_counter()
+            with self._lock:
+                self._stats["queue_wait_total_seconds"] += started - submitted
+            return func(*args, **kwargs)
+
+        def done(fut: Future) -> None:
+            # Account when the worker is actually done, not when the awaiting
+            # task gives up: a cancelled request keeps its slot until then
+            ok = not fut.cancelled() and fut.exception() is None
+            self._record(time.perf_counter() - submitted, ok)
+
+        try:
+            fut = self._pool.submit(call)
+        except BaseException:
+            self._record(time.perf_counter() - submitted, False)
+            raise
+        fut.add_done_callback(done)
+        return await asyncio.wrap_future(fut)
+
+    def _record(self, elapsed: float, ok: bool) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._stats["completed" if ok else "failed"] += 1
+            self._stats["latency_total_seconds"] += elapsed
+            self._stats["latency_max_seconds"] = max(self._stats["latency_max_seconds"], elapsed)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if elapsed <= bound:
+                    self._buckets[i] += 1
+                    break
+            else:
+                self._buckets[-1] += 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            out: Dict[str, object] = dict(self._stats)
+            out["in_flight"] = self._in_flight
+            buckets = list(self._buckets)
+        finished = out["completed"] + out["failed"]
+        out["latency_mean_seconds"] = out["latency_total_seconds"] / finished if finished else 0.0
+        out["latency_histogram"] = {
+            **{f"le_{bound}": count for bound, count in zip(LATENCY_BUCKETS, buckets)},
+            "le_inf": buckets[-1],
+        }
+        out["workers"] = self.workers
+        out["max_queue"] = self.max_queue
+        return out
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+
+_executor: Optional[BlockingExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_blocking_executor() -> BlockingExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = BlockingExecutor.from_env()
+        return _executor
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Dispatch blocking work through the shared executor."""
+    return await get_blocking_executor().run(func, *args, **kwargs)
@@ -0,0 +1,218 @@
+"""
+Deterministic full-history rebuild of daily snapshots, avatar state and identity.
+
+    python -m application.services.history_rebuild [--db sessions.db] [--workers N]
+
+After a change to the snapshot, avatar or identity logic, every user's
+journal is replayed day by day, oldest first, through run_daily_update():
+each day's snapshot is built from that day's events, and the avatar state
+and identity produced by one day are the inputs of the next. Days with a
+stored snapshot but no journal events (written before the journal existed)
+cannot be rebuilt, so their stored snapshot is replayed as-is. Replay starts
+from no avatar state and no identity, so the same data always rebuilds the
+same history.
+
+Users are replayed in worker processes, a bounded number at a time; each
+replay holds one user's history. The parent stages every user in shadow
+tables, then swaps them in with one transaction, so readers see either the
+old history or the new one. Identity files are staged in the database too
+and promoted through the identity store after the swap. Live writes to the
+journal, daily snapshots or avatar states while the stage is built would be
+lost by the swap, so the users they touched are replayed and staged again
+before the swap is retried. If live history keeps moving past the retry
+budget, the rebuild aborts (HistoryRebuildConflict) and leaves the live
+history as it was; run it again in a quieter window.
+
+Settings:
+  REFLECTO_REBUILD_WORKERS        worker processes (default: CPU count; 0 runs inline)
+  REFLECTO_REBUILD_SWAP_RETRIES   restage-and-swap attempts after a live write (default: 3)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+from application.ports.identity_store import IdentityStorePort
+from domain.core.daily_update import run_daily_update
+from domain.core.snapshot_builder import build_daily_snapshot
+from infrastructure.persistence.session_repository import HistoryRebuildConflict, SessionRepository
+from interfaces.runtime.store_adapters import get_identity_store
+from reflecto.instrumentation import StageTiming, collect_timings, measure, timings_block
+
+# Same windows run_daily_update_service feeds into streaks and patterns
+STREAK_WINDOW = 60
+PATTERN_WINDOW = 13
+
+
+@dataclass(frozen=True)
+class ReplayedUser:
+    user_id: str
+    snapshots: Tuple[Tuple[str, Dict[str, Any]], ...]
+    avatar_state: Optional[Dict[str, Any]]
+    identity: Optional[Dict[str, Any]]
+    timings: Tuple[StageTiming, ...] = ()
+
+
+def replay_user(repo: SessionRepository, user_id: str) -> ReplayedUser:
+    """Replay one user's journal day by day; reads only."""
+    history: Deque[Dict[str, Any]] = deque(maxlen=STREAK_WINDOW)  # newest first
+    snapshots: List[Tuple[str, Dict[str, Any]]] = []
+    avatar_state: Optional[Dict[str, Any]] = None
+    identity: Optional[Dict[str, Any]] = None
+    with collect_timings() as timings:
+        for day in repo.list_user_days(user_id):
+            with measure("history_rebuild", "load"):
+                events = repo.get_events_for_user_day(user_id, day)
+                stored = None if events else repo.get_daily_snapshot(user_id, day)
+            with measure("history_rebuild", "compute"):
+                snapshot = stored["snapshot"] if stored is not None else build_daily_snapshot(events)
+                today = {"snapshot": snapshot}
+                update = run_daily_update(
+                    day=day,
+                    events=None,
+                    daily_snapshots=[today] + list(history),
+                    raw_snapshots=[today] + list(history)[:PATTERN_WINDOW],
+                    prev_avatar_state=avatar_state,
+                    identity=identity,
+                    snapshot=snapshot,
+                )
+            history.appendleft(today)
+            snapshots.append((day, update["snapshot"]))
+            avatar_state = update["avatar_state"]
+            identity = update["identity"]
+    return ReplayedUser(user_id, tuple(snapshots), avatar_state, identity, tuple(timings))
+
+
+def _replay_in_worker(db_path: str, user_id: str) -> ReplayedUser:
+    return replay_user(SessionRepository(db_path), user_id)
+
+
+def promote_rebuilt_identities(repo: SessionRepository, identity_store: IdentityStorePort) -> int:
+    """
+    Write staged identities through the identity store, then drop the stage.
+    Safe to call again if a previous promotion was interrupted.
+    """
+    promoted = 0
+    for user_id, identity in repo.iter_rebuilt_identities():
+        identity_store.save_identity(user_id, identity)
+        promoted += 1
+    repo.finish_history_rebuild()
+    return promoted
+
+
+def rebuild_history(
+    db_path: str = "sessions.db",
+    workers: Optional[int] = None,
+    identity_store: Optional[IdentityStorePort] = None,
+    swap_retries: Optional[int] = None,
+) -> Dict[str, object]:
+    """Rebuild and swap in every user's history. Returns counts, throughput and stage timings."""
+    if workers is None:
+        workers = int(os.getenv("REFLECTO_REBUILD_WORKERS", str(os.cpu_count() or 1)))
+    if swap_retries is None:
+        swap_retries = int(os.getenv("REFLECTO_REBUILD_SWAP_RETRIES", "3"))
+    if workers > 0 and db_path == ":memory:":
+        raise ValueError("An in-memory database cannot be shared with worker processes; use workers=0")
+    identity_store = identity_store or get_identity_store()
+
+    started = time.perf_counter()
+    repo = SessionRepository(db_path)
+    timings: List[StageTiming] = []
+    report: Dict[str, object] = {"users": 0, "days": 0, "workers": workers, "swap_retries": 0, "restaged": 0}
+    staged_days: Dict[str, int] = {}
+
+    def stage(replayed: ReplayedUser) -> None:
+        timings.extend(replayed.timings)
+        with measure("history_rebuild", "stage"):
+            repo.write_rebuilt_user(
+                replayed.user_id, replayed.snapshots, replayed.avatar_state, replayed.identity
+            )
+        staged_days[replayed.user_id] = len(replayed.snapshots)
+
+    with collect_timings() as collected:
+        # Running aggregates are folded with the same builder; refresh them too
+        with measure("history_rebuild", "daily_aggregates"):
+            repo.rebuild_daily_aggregates()
+        repo.begin_history_rebuild()
+        try:
+            user_ids = repo.list_user_ids()
+
+            if workers == 0 or len(user_ids) <= 1:
+                for user_id in user_ids:
+                    stage(replay_user(repo, user_id))
+            else:
+                # spawn: forked children would inherit the parent's SQLite connections.
+                # At most 2 replays per worker are in flight, so memory stays bounded.
+                context = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=min(workers, len(user_ids)), mp_context=context) as pool:
+                    remaining = iter(user_ids)
+                    in_flight: Set[Future] = set()
+                    for user_id in remaining:
+                        in_flight.add(pool.submit(_replay_in_worker, db_path, user_id))
+                        if len(in_flight) >= workers * 2:
+                            break
+                    while in_flight:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            stage(future.result())
+                            next_user = next(remaining, None)
+                            if next_user is not None:
+                                in_flight.add(pool.submit(_replay_in_worker, db_path, next_user))
+
+            while True:
+                try:
+                    with measure("history_rebuild", "swap"):
+                        report.update(repo.swap_rebuilt_history())
+                    break
+                except HistoryRebuildConflict:
+                    if report["swap_retries"] >= swap_retries:
+                        raise
+                    report["swap_retries"] += 1
+                # Few users move during a rebuild; replay them inline
+                for user_id in repo.take_history_rebuild_writes():
+                    stage(replay_user(repo, user_id))
+                    report["restaged"] += 1
+        except BaseException:
+            # Stale or partial stage: keep the live history, stop watching it
+            repo.abort_history_rebuild()
+            raise
+        with measure("history_rebuild", "identities"):
+            report["identities"] = promote_rebuilt_identities(repo, identity_store)
+    timings.extend(collected)
+    report["users"] = len(staged_days)
+    report["days"] = sum(staged_days.values())
+
+    elapsed = time.perf_counter() - started
+    report["elapsed_seconds"] = elapsed
+    report["users_per_second"] = report["users"] / elapsed if elapsed > 0 else 0.0
+    report["stages"] = timings_block(timings)
+    return report
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Rebuild daily snapshots, avatar state and identities from the event journal."
+    )
+    parser.add_argument("--db", default="sessions.db", help="SQLite database path")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (0 runs inline)")
+    args = parser.parse_args(argv)
+
+    try:
+        report = rebuild_history(db_path=args.db, workers=args.workers)
+    except HistoryRebuildConflict as exc:
+        print(f"history rebuild aborted: {exc}")
+        return 1
+    print(json.dumps(report, indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,152 @@
+"""
+Pipeline output cache.
+
+run_session is deterministic, so its output is a pure function of
+(REFLECTO_VERSION, input_hash). Outputs are memoized in a bounded in-process
+LRU and, optionally, in a SQLite tier shared by every worker on the same
+database. Entries are stored as JSON text in the output's own key order
+(a hit must persist exactly what a miss would) and hits are returned
+frozen, like a freshly computed pipeline output, so no caller can alter an
+entry or see another caller's changes. Changing the version string drops all
+entries written under the old version.
+
+Settings:
+  REFLECTO_PIPELINE_CACHE_SIZE     in-process entries (default 256, 0 disables)
+  REFLECTO_PIPELINE_CACHE_SQLITE   "1" enables the SQLite tier
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from domain.phases.purity import freeze_value
+from infrastructure.persistence.session_repository import SessionRepository
+
+
+class PipelineCache:
+    def __init__(self, max_entries: int = 256, sqlite_enabled: bool = False):
+        self.max_entries = max_entries
+        self.sqlite_enabled = sqlite_enabled
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._version: Optional[str] = None
+        self._purged_dbs: set = set()
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "sqlite_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "PipelineCache":
+        return cls(
+            max_entries=int(os.getenv("REFLECTO_PIPELINE_CACHE_SIZE", "256")),
+            sqlite_enabled=os.getenv("REFLECTO_PIPELINE_CACHE_SQLITE") == "1",
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 or self.sqlite_enabled
+
+    def _switch_version(self, version: str) -> None:
+        # Caller holds the lock
+        if self._version != version:
+            if self._version is not None:
+                self._stats["invalidations"] += 1
+            self._entries.clear()
+            self._purged_dbs.clear()
+            self._version = version
+
+    def _purge_sqlite(self, version: str, repo: SessionRepository) -> None:
+        with self._lock:
+            if repo.db_path in self._purged_dbs:
+                return
+            self._purged_dbs.add(repo.db_path)
+        repo.purge_pipeline_outputs(keep_version=version)
+
+    def get(self, version: str, input_hash: str, repo: Optional[SessionRepository] = None) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._switch_version(version)
+            encoded = self._entries.get(input_hash)
+            if encoded is not None:
+                self._entries.move_to_end(input_hash)
+                self._stats["memory_hits"] += 1
+        if encoded is not None:
+            return freeze_value(json.loads(encoded))
+
+        if self.sqlite_enabled and repo is not None:
+            self._purge_sqlite(version, repo)
+            encoded = repo.get_pipeline_output(version, input_hash)
+            if encoded is not None:
+                with self._lock:
+                    self._stats["sqlite_hits"] += 1
+                    self._remember(input_hash, encoded)
+                return freeze_value(json.loads(encoded))
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, version: str, input_hash: str, output: dict, repo: Optional[SessionRepository] = None) -> None:
+        if not self.enabled:
+            return
+        # Not canonical_json: sorting keys would make hits differ from misses
+        encoded = json.dumps(output, separators=(",", ":"), default=str)
+        with self._lock:
+            self._switch_version(version)
+            self._remember(input_hash, encoded)
+        if self.sqlite_enabled and repo is not None:
+            repo.put_pipeline_output(version, input_hash, encoded)
+
+    def _remember(self, input_hash: str, encoded: str) -> None:
+        # Caller holds the lock
+        if self.max_entries <= 0:
+            return
+        self._entries[input_hash] = encoded
+        self._entries.move_to_end(input_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._purged_dbs.clear()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            out: Dict[str, object] = dict(self._stats)
+            out["entries"] = len(self._entries)
+            out["version"] = self._version
+        lookups = out["memory_hits"] + out["sqlite_hits"] + out["misses"]
+        out["hit_ratio"] = (out["memory_hits"] + out["sqlite_hits"]) / lookups if lookups else 0.0
+        out["max_entries"] = self.max_entries
+        out["sqlite_enabled"] = self.sqlite_enabled
+        return out
+
+
+_pipeline_cache: Optional[PipelineCache] = None
+_pipeline_cache_lock = threading.Lock()
+
+
+def get_pipeline_cache() -> PipelineCache:
+    global _pipeline_cache
+    with _pipeline_cache_lock:
+        if _pipeline_cache is None:
+            _pipeline_cache = PipelineCache.from_env()
+        return _pipeline_cache
+
+
+def reset_pipeline_cache() -> None:
+    """Drop the process-wide cache; the next access re-reads settings."""
+    global _pipeline_cache
+    with _pipeline_cache_lock:
+        _pipeline_cache = None
@@ -1,9 +1,11 @@
 from typing import Dict, Any, List, Optional, Callable
 import hashlib
 import json
+import os
 
 from infrastructure.persistence.session_repository import SessionRepository
 from infrastructure.persistence.models import SessionRecord
+from infrastructure.persistence.canonical import canonical_json, event_hash
 from infrastructure.providers import (
     TimeProvider,
     IdProvider,
@@ -12,11 +14,21 @@ from infrastructure.providers import (
     enforce_deterministic_providers,
 )
 from reflecto.session_runner import run_session
+from reflecto.instrumentation import collect_timings, measure, timings_block
+from application.services.pipeline_cache import get_pipeline_cache
 from domain.core.daily_state import DailyState
+from domain.phases.purity import freeze_value
 
 REFLECTO_VERSION = "reflecto-v1.0"
 
 
+def _idempotency_settings() -> tuple[float, bool]:
+    """(window_seconds, dedupe_by_input_hash) from the environment."""
+    window = float(os.getenv("REFLECTO_IDEMPOTENCY_WINDOW_SECONDS", "600"))
+    by_input_hash = os.getenv("REFLECTO_IDEMPOTENCY_INPUT_HASH") == "1"
+    return window, by_input_hash
+
+
 def _normalize_history_for_hash(history: List[DailyState]) -> List[Dict[str, Any]]:
     out: List[Dict[str, Any]] = []
     for h in history:
@@ -43,19 +55,17 @@ def _compute_input_hash(
         "flow_context": flow_context,
         "raw_response": raw_response,
     }
-    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
-    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+    return hashlib.sha256(canonical_json(payload).encode("utf-8")).hexdigest()
 
-def _append_stream_events(
+def _build_stream_events(
     session_id: str,
     session_output: dict,
-    repo: SessionRepository,
     now: Optional[str] = None,
     id_factory: Optional[Callable[[], str]] = None,
     time_provider: Optional[TimeProvider] = None,
     id_provider: Optional[IdProvider] = None,
-) -> None:
-    """Persist deterministic event journal for SSE + replay."""
+) -> List[dict]:
+    """Build the deterministic, hash-chained event journal for SSE + replay."""
     enforce_deterministic_providers(time_provider, id_provider)
     time_provider = get_time_provider(time_provider)
     id_provider = get_id_provider(id_provider)
@@ -63,25 +73,17 @@ def _append_stream_events(
     source = "session_service"
     event_id = id_factory or (lambda: f"evt_{id_provider.new_id()}")
 
+    events: List[dict] = []
     event_index = 0
     prev_hash: str | None = None
 
-    def _event_hash(event_type: str, payload: dict, event_index: int, timestamp: str, prev: str | None) -> str:
-        canonical = {
-            "type": event_type,
-            "payload": payload,
-            "event_index": event_index,
-            "timestamp": timestamp,
-            "prev_hash": prev,
-        }
-        encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
-        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
-
     def append(event_type: str, payload: dict) -> None:
         nonlocal event_index, prev_hash
         event_index += 1
-        event_hash = _event_hash(event_type, payload, event_index, timestamp, prev_hash)
-        repo.append_event(
+        # Encode once: the same canonical text is hashed and stored
+        payload_json = canonical_json(payload)
+        hashed = event_hash(event_type, payload_json, event_index, timestamp, prev_hash)
+        events.append(
             {
                 "id": event_id(),
                 "session_id": session_id,
@@ -89,12 +91,13 @@ def _append_stream_events(
                 "event_index": event_index,
                 "type": event_type,
                 "payload": payload,
+                "payload_raw": payload_json,
                 "source": source,
-                "event_hash": event_hash,
+                "event_hash": hashed,
                 "prev_hash": prev_hash,
             }
         )
-        prev_hash = event_hash
+        prev_hash = hashed
 
     def _coerce_text(value: Any) -> str:
         if value is None:
@@ -130,6 +133,29 @@ def _append_stream_events(
     append("closing", {"closing_phrase": closing_phrase})
     append("timeline_phase", {"phase": "closing"})
     append("done", {"session_id": session_id})
+    return events
+
+
+def _append_stream_events(
+    session_id: str,
+    session_output: dict,
+    repo: SessionRepository,
+    now: Optional[str] = None,
+    id_factory: Optional[Callable[[], str]] = None,
+    time_provider: Optional[TimeProvider] = None,
+    id_provider: Optional[IdProvider] = None,
+) -> None:
+    """Persist deterministic event journal for SSE + replay (one transaction)."""
+    repo.append_events(
+        _build_stream_events(
+            session_id=session_id,
+            session_output=session_output,
+            now=now,
+            id_factory=id_factory,
+            time_provider=time_provider,
+            id_provider=id_provider,
+        )
+    )
 
 
 def create_session(
@@ -142,37 +168,104 @@ def create_session(
     id_provider: Optional[IdProvider] = None,
     record_id: Optional[str] = None,
     record_created_at: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
+    include_timings: bool = False,
+) -> dict:
+    """
+    Run and persist a session.
+
+    Idempotency (opt-in): with an `idempotency_key`, or with
+    REFLECTO_IDEMPOTENCY_INPUT_HASH=1 using the computed input hash, a repeat
+    request from the same user within REFLECTO_IDEMPOTENCY_WINDOW_SECONDS
+    returns the already-stored session (flagged "replayed") instead of
+    writing a new one. Reusing a key with different inputs raises
+    IdempotencyConflict.
+
+    include_timings adds meta.timings (per-stage wall/CPU/allocations) to the
+    returned session only; the persisted output never carries it.
+    """
+    if not include_timings:
+        return _create_session(
+            user_id, input_data, repo, now, id_factory, time_provider, id_provider,
+            record_id, record_created_at, idempotency_key,
+        )
+    with collect_timings() as timings:
+        result = _create_session(
+            user_id, input_data, repo, now, id_factory, time_provider, id_provider,
+            record_id, record_created_at, idempotency_key,
+        )
+    session = result.get("session")
+    if isinstance(session, dict):
+        meta = dict(session.get("meta") or {})
+        meta["timings"] = timings_block(timings)
+        result = {**result, "session": {**session, "meta": meta}}
+    return result
+
+
+def _create_session(
+    user_id: str,
+    input_data: dict,
+    repo: Optional[SessionRepository],
+    now: Optional[str],
+    id_factory: Optional[Callable[[], str]],
+    time_provider: Optional[TimeProvider],
+    id_provider: Optional[IdProvider],
+    record_id: Optional[str],
+    record_created_at: Optional[str],
+    idempotency_key: Optional[str],
 ) -> dict:
     enforce_deterministic_providers(time_provider, id_provider)
     repo = repo or SessionRepository(time_provider=time_provider, id_provider=id_provider)
     time_provider = get_time_provider(time_provider)
     id_provider = get_id_provider(id_provider)
-    history_objs = [
-        DailyState.from_dict(
-            h.model_dump() if hasattr(h, "model_dump") else (h.dict() if hasattr(h, "dict") else h)
+    with measure("session", "input_hash"):
+        history_objs = [
+            DailyState.from_dict(
+                h.model_dump() if hasattr(h, "model_dump") else (h.dict() if hasattr(h, "dict") else h)
+            )
+            if not isinstance(h, DailyState) else h
+            for h in input_data["history"]
+        ]
+        input_hash = _compute_input_hash(
+            input_data["user_state"],
+            history_objs,
+            input_data["flow_context"],
+            input_data.get("raw_response"),
         )
-        if not isinstance(h, DailyState) else h
-        for h in input_data["history"]
-    ]
-    session_output = run_session(
-        input_data["user_state"],
-        history_objs,
-        input_data["flow_context"],
-        input_data.get("raw_response")
-    )
-    input_hash = _compute_input_hash(
-        input_data["user_state"],
-        history_objs,
-        input_data["flow_context"],
-        input_data.get("raw_response"),
-    )
+    window_seconds, by_input_hash = _idempotency_settings()
+    idem_key = None
+    if idempotency_key:
+        idem_key = f"key:{idempotency_key}"
+    elif by_input_hash:
+        idem_key = f"input:{input_hash}"
+    now_ts = time_provider.now().timestamp()
+    if idem_key is not None:
+        with measure("session", "idempotency_lookup"):
+            existing = repo.find_idempotent_session(user_id, idem_key, window_seconds, now_ts, input_hash)
+        if existing is not None:
+            return _replayed_session(existing, repo)
+
+    # Deterministic pipeline: identical inputs under the same version reuse the output
+    cache = get_pipeline_cache()
+    with measure("session", "pipeline_cache"):
+        session_output = cache.get(REFLECTO_VERSION, input_hash, repo=repo)
+    if session_output is None:
+        with measure("session", "pipeline"):
+            session_output = run_session(
+                input_data["user_state"],
+                history_objs,
+                input_data["flow_context"],
+                input_data.get("raw_response")
+            )
+        with measure("session", "pipeline_cache"):
+            cache.put(REFLECTO_VERSION, input_hash, session_output, repo=repo)
     if isinstance(session_output, dict):
+        # Cache hits and fresh outputs may both be shared: copy, never mutate
         meta = session_output.get("meta")
-        if not isinstance(meta, dict):
-            meta = {}
+        meta = dict(meta) if isinstance(meta, dict) else {}
         meta["input_hash"] = input_hash
         meta["input_hash_algo"] = "sha256"
-        session_output["meta"] = meta
+        session_output = freeze_value({**session_output, "meta": meta})
     record = SessionRecord(
         user_id=user_id,
         data=session_output,
@@ -182,19 +275,38 @@ def create_session(
         time_provider=time_provider,
         id_provider=id_provider,
     )
-    session_id = repo.save(record)
-    _append_stream_events(
-        session_id=session_id,
-        session_output=session_output,
-        repo=repo,
-        now=now,
-        id_factory=id_factory,
-        time_provider=time_provider,
-        id_provider=id_provider,
-    )
+    with measure("session", "build_events"):
+        events = _build_stream_events(
+            session_id=record.id,
+            session_output=session_output,
+            now=now,
+            id_factory=id_factory,
+            time_provider=time_provider,
+            id_provider=id_provider,
+        )
+    # Session row + journal commit together: no half-written journals.
+    with measure("session", "persist"):
+        if idem_key is None:
+            session_id = repo.save_with_events(record, events)
+        else:
+            session_id = repo.save_with_events_once(
+                record, events, idem_key, window_seconds, now_ts, fingerprint=input_hash
+            )
+    if session_id != record.id:
+        # Lost a race against a concurrent duplicate
+        return _replayed_session(session_id, repo)
     return {"session_id": session_id, "session": session_output}
 
 
+def _replayed_session(session_id: str, repo: SessionRepository) -> dict:
+    stored = repo.get(session_id)
+    return {
+        "session_id": session_id,
+        "session": stored["data"] if stored else None,
+        "replayed": True,
+    }
+
+
 def get_session(session_id: str, repo: Optional[SessionRepository] = None) -> Optional[dict]:
     repo = repo or SessionRepository()
     return repo.get(session_id)
@@ -205,6 +317,17 @@ def list_sessions_for_user(user_id: str, repo: Optional[SessionRepository] = Non
     return repo.list_for_user(user_id)
 
 
+def list_sessions_page(
+    user_id: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    repo: Optional[SessionRepository] = None,
+) -> dict:
+    repo = repo or SessionRepository()
+    return repo.list_for_user_page(user_id, limit=limit, cursor=cursor, fields=fields)
+
+
 # Phase 12B: Session Replay (Audit Mode)
 
 def replay_session(session_id: str, repo: Optional[SessionRepository] = None) -> Optional[dict]:
@@ -237,25 +360,23 @@ def verify_event_chain(
     Returns status and first mismatch details if any.
     """
     repo = repo or SessionRepository()
-    events = repo.get_events(session_id)
+    legacy = repo.legacy_payload_event_ids(session_id)
     prev: str | None = None
-    for event in events:
-        payload = event.get("payload", {})
-        canonical = {
-            "type": event.get("type"),
-            "payload": payload,
-            "event_index": event.get("event_index"),
-            "timestamp": event.get("timestamp"),
-            "prev_hash": prev,
-        }
-        encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
-        computed = hashlib.sha256(encoded.encode("utf-8")).hexdigest()
-        stored = event.get("event_hash")
+    for event in repo.iter_events(session_id):
+        # Stored payload text is canonical, so hash it as-is
+        computed = event_hash(event.type, event.payload_raw, event.event_index, event.timestamp, prev)
+        stored = event.event_hash
+        if stored and computed != stored and event.id in legacy:
+            # Only rows written before canonical storage get one re-encode;
+            # a rewritten canonical row must not verify
+            computed = event_hash(
+                event.type, canonical_json(event.payload), event.event_index, event.timestamp, prev
+            )
         if stored and computed != stored:
             return {
                 "session_id": session_id,
                 "valid": False,
-                "index": event.get("event_index"),
+                "index": event.event_index,
                 "expected": stored,
                 "computed": computed,
             }
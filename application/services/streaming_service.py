@@ -1,9 +1,23 @@
-from typing import Optional
+from typing import Iterable, Optional
 
 from infrastructure.persistence.session_repository import SessionRepository
 from infrastructure.streaming.streaming_service import stream_session_events as _stream_session_events
+from infrastructure.streaming.streaming_service import stream_user_events as _stream_user_events
 
 
-def stream_session_events(session_id: str, repo: Optional[SessionRepository] = None):
+def stream_session_events(
+    session_id: str,
+    repo: Optional[SessionRepository] = None,
+    after_index: Optional[int] = None,
+):
     repo = repo or SessionRepository()
-    return _stream_session_events(session_id=session_id, repo=repo)
+    return _stream_session_events(session_id=session_id, repo=repo, after_index=after_index)
+
+
+def stream_user_events(
+    user_id: str,
+    repo: Optional[SessionRepository] = None,
+    types: Optional[Iterable[str]] = None,
+):
+    repo = repo or SessionRepository()
+    return _stream_user_events(user_id=user_id, repo=repo, types=types)
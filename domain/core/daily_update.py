@@ -10,17 +10,20 @@ from domain.core.identity_update import update_identity_from_snapshot
 
 def run_daily_update(
     day: str,
-    events: List[Dict[str, Any]],
+    events: List[Dict[str, Any]] | None,
     daily_snapshots: List[Dict[str, Any]],
     raw_snapshots: List[Dict[str, Any]],
     prev_avatar_state: Dict[str, Any] | None,
     identity: Dict[str, Any] | None,
+    snapshot: Dict[str, Any] | None = None,
 ) -> dict:
     """
     Pure daily update computation. No persistence, no I/O.
+    Pass `snapshot` when the day's snapshot is already folded; events are then unused.
     """
 
-    snapshot = build_daily_snapshot(events)
+    if snapshot is None:
+        snapshot = build_daily_snapshot(events or [])
     streak = compute_streak(daily_snapshots)
 
     avatar_state = derive_avatar_state(prev_avatar_state, snapshot, streak, day)
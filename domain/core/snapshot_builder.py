@@ -1,6 +1,6 @@
 # reflecto/core/snapshot_builder.py
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Mapping
 
 DEFAULT_SKILLS = {
     "financial": 80,
@@ -16,14 +16,12 @@ MEANINGFUL_EVENT_TYPES = {
     # later: mood, activity, reflection, etc
 }
 
+# Event types whose latest payload overwrites a snapshot field
+LAST_VALUE_TYPES = ("presence", "time_of_day", "skills")
 
-def build_daily_snapshot(events: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """
-    Deterministic daily snapshot builder (C.2 v1)
-    Same events -> same snapshot (required for replay + trust)
-    """
 
-    snapshot = {
+def empty_snapshot() -> Dict[str, Any]:
+    return {
         "counts": {},                 # event counts by type
         "last_presence": None,         # final presence of day
         "last_time_of_day": None,      # final time_of_day
@@ -31,13 +29,20 @@ def build_daily_snapshot(events: List[Dict[str, Any]]) -> Dict[str, Any]:
         "meaningful_events": 0         # used for streaks
     }
 
-    for e in events:
-        t = e["type"]
 
-        # count events
-        snapshot["counts"][t] = snapshot["counts"].get(t, 0) + 1
+def fold_event(snapshot: Dict[str, Any], e: Mapping[str, Any], latest: bool = True) -> Dict[str, Any]:
+    """
+    Fold one event into snapshot (in place) and return it.
+    latest=False counts the event but keeps the current last_* / skills
+    values, for events that arrive after a later one was already folded.
+    """
+    t = e["type"]
 
-        # capture final states
+    # count events
+    snapshot["counts"][t] = snapshot["counts"].get(t, 0) + 1
+
+    # capture final states
+    if latest:
         if t == "presence":
             snapshot["last_presence"] = e["payload"]
 
@@ -47,8 +52,20 @@ def build_daily_snapshot(events: List[Dict[str, Any]]) -> Dict[str, Any]:
         elif t == "skills":
             snapshot["skills"] = e["payload"]
 
-        # streak signal
-        if t in MEANINGFUL_EVENT_TYPES:
-            snapshot["meaningful_events"] += 1
+    # streak signal
+    if t in MEANINGFUL_EVENT_TYPES:
+        snapshot["meaningful_events"] += 1
 
     return snapshot
+
+
+def build_daily_snapshot(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Deterministic daily snapshot builder (C.2 v1)
+    Same events -> same snapshot (required for replay + trust)
+    """
+
+    snapshot = empty_snapshot()
+    for e in events:
+        fold_event(snapshot, e)
+    return snapshot
@@ -1,7 +1,23 @@
+"""
+Purity enforcement for pipeline phases.
+
+@phase_pure behaves according to the process-wide purity mode, selected by
+REFLECTO_PURITY_MODE:
+  strict  (default) freeze inputs and outputs; a phase cannot mutate anything
+  verify  no copies: fingerprint the arguments before and after the call and
+          raise PurityViolation if the phase mutated them
+  off     plain pass-through, for production hot paths
+"""
+
 from __future__ import annotations
 
 import copy
-from typing import Any, Callable
+import dataclasses
+import hashlib
+import os
+import pickle
+import threading
+from typing import Any, Callable, Dict
 
 
 class FrozenList(list):
@@ -71,32 +87,198 @@ class FrozenDict(dict):
         return self
 
 
+class _FrozenDataclass:
+    """
+    Mixin of the read-only twin of a dataclass (see _frozen_type). Instances
+    still pass isinstance checks for the original class and compare equal to
+    its instances; constructing one (e.g. dataclasses.replace) yields a plain,
+    mutable instance of the original class.
+    """
+
+    __slots__ = ()
+    _base: type
+
+    def __new__(cls, *args, **kwargs):
+        return cls._base(*args, **kwargs)
+
+    def _blocked(self, *args, **kwargs):
+        raise TypeError(f"Frozen {self._base.__name__} is immutable")
+
+    __setattr__ = _blocked
+    __delattr__ = _blocked
+
+    def __eq__(self, other):
+        if isinstance(other, self._base):
+            return all(
+                getattr(self, f.name) == getattr(other, f.name)
+                for f in dataclasses.fields(self._base)
+                if f.compare
+            )
+        return NotImplemented
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return _thaw, (self._base, _dataclass_state(self))
+
+
+_frozen_types: Dict[type, type] = {}
+_frozen_types_lock = threading.Lock()
+
+
+def _frozen_type(cls: type) -> type:
+    frozen = _frozen_types.get(cls)
+    if frozen is None:
+        with _frozen_types_lock:
+            frozen = _frozen_types.get(cls)
+            if frozen is None:
+                frozen = type(f"Frozen{cls.__name__}", (_FrozenDataclass, cls), {
+                    "__slots__": (),
+                    "_base": cls,
+                    "__hash__": cls.__hash__,
+                    "__module__": __name__,
+                })
+                _frozen_types[cls] = frozen
+    return frozen
+
+
+def _dataclass_state(value: Any) -> Dict[str, Any]:
+    if hasattr(value, "__dict__"):
+        return dict(vars(value))
+    return {f.name: getattr(value, f.name) for f in dataclasses.fields(value)}
+
+
+def _thaw(cls: type, state: Dict[str, Any]) -> Any:
+    # Unpickling a frozen dataclass: rebuild it frozen
+    return _freeze_dataclass(cls, state)
+
+
+def _freeze_dataclass(cls: type, state: Dict[str, Any]) -> Any:
+    frozen = object.__new__(_frozen_type(cls))
+    for name, field_value in state.items():
+        object.__setattr__(frozen, name, _freeze(field_value))
+    return frozen
+
+
+# Leaves that can be shared as-is
+_IMMUTABLE_SCALARS = (str, bytes, int, float, complex, bool, type(None), frozenset)
+
+
 def _freeze(value: Any) -> Any:
+    """
+    Frozen view of a value tree that shares nothing mutable with the input.
+    Already-frozen subtrees are immutable, so they are shared instead of
+    copied: freezing a frozen tree is free, and a tree built from frozen
+    phase outputs only allocates its new top-level containers.
+    """
+    if isinstance(value, (FrozenDict, FrozenList, _FrozenDataclass)) or isinstance(value, _IMMUTABLE_SCALARS):
+        return value
     if isinstance(value, dict):
         return FrozenDict({k: _freeze(v) for k, v in value.items()})
     if isinstance(value, list):
         return FrozenList([_freeze(v) for v in value])
     if isinstance(value, tuple):
-        return tuple(_freeze(v) for v in value)
-    return value
+        items = tuple(_freeze(v) for v in value)
+        if type(value) is tuple and all(a is b for a, b in zip(items, value)):
+            return value
+        return items
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        # Read-only copy: every phase can share it, none can change it
+        return _freeze_dataclass(type(value), _dataclass_state(value))
+    # Other mutable objects cannot be frozen in place; copy once
+    return copy.deepcopy(value)
 
 
 def freeze_value(value: Any) -> Any:
     """
-    Public helper to deep-copy then freeze a value tree.
+    Public helper to freeze a value tree (copying only what is still mutable).
     Useful for enforcing immutability at architectural boundaries.
     """
-    return _freeze(copy.deepcopy(value))
+    return _freeze(value)
+
+
+PURITY_MODES = ("strict", "verify", "off")
+
+
+class PurityViolation(RuntimeError):
+    pass
+
+
+def _mode_from_env() -> str:
+    mode = os.getenv("REFLECTO_PURITY_MODE", "strict").strip().lower() or "strict"
+    if mode not in PURITY_MODES:
+        raise ValueError(f"REFLECTO_PURITY_MODE must be one of {PURITY_MODES}, got {mode!r}")
+    return mode
+
+
+_mode = _mode_from_env()
+_stats_lock = threading.Lock()
+# Counted in strict and verify modes; off mode stays lock-free
+_stats = {"calls": 0, "checks": 0, "violations": 0}
+
+
+def get_purity_mode() -> str:
+    return _mode
+
+
+def set_purity_mode(mode: str) -> None:
+    """Override the mode for this process (tests, benchmarks)."""
+    global _mode
+    if mode not in PURITY_MODES:
+        raise ValueError(f"purity mode must be one of {PURITY_MODES}, got {mode!r}")
+    _mode = mode
+
+
+def purity_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        out: Dict[str, Any] = dict(_stats)
+    out["mode"] = _mode
+    return out
+
+
+def _bump(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def _fingerprint(args: tuple, kwargs: dict) -> bytes:
+    # pickle walks containers and every object's state (vars() of plain
+    # objects, whatever their __repr__ shows) in C; no copies made. Arguments
+    # that cannot be pickled fall back to repr, which only sees what
+    # __repr__ prints.
+    try:
+        data = pickle.dumps((args, kwargs), protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        data = repr((args, kwargs)).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).digest()
 
 
 def phase_pure(func: Callable[..., Any]) -> Callable[..., Any]:
-    """Deep-copy inputs and freeze outputs to enforce purity boundaries."""
+    """Enforce purity boundaries according to the process purity mode."""
 
     def wrapper(*args, **kwargs):
-        frozen_args = copy.deepcopy(args)
-        frozen_kwargs = copy.deepcopy(kwargs)
+        mode = _mode
+        if mode == "off":
+            # Production hot path: no lock, no stats
+            return func(*args, **kwargs)
+        _bump("calls")
+        if mode == "verify":
+            before = _fingerprint(args, kwargs)
+            result = func(*args, **kwargs)
+            _bump("checks")
+            if _fingerprint(args, kwargs) != before:
+                _bump("violations")
+                raise PurityViolation(f"{wrapper.__name__} mutated its inputs")
+            return result
+        frozen_args = tuple(_freeze(a) for a in args)
+        frozen_kwargs = {k: _freeze(v) for k, v in kwargs.items()}
         result = func(*frozen_args, **frozen_kwargs)
-        return _freeze(copy.deepcopy(result))
+        _bump("checks")
+        return _freeze(result)
 
     wrapper.__name__ = getattr(func, "__name__", "phase_pure")
     wrapper.__doc__ = getattr(func, "__doc__", None)
@@ -0,0 +1,46 @@
+"""
+Canonical JSON encoding for the event journal.
+
+A payload is encoded once with canonical_json(); those exact bytes are both
+stored in session_events.payload and fed into the hash chain. event_hash()
+builds the chained hash from the already-encoded payload, so verification
+can hash stored rows directly without a decode/encode round trip.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any
+
+
+def canonical_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def event_hash(
+    event_type: str,
+    payload_json: str,
+    event_index: int | None,
+    timestamp: str,
+    prev_hash: str | None,
+) -> str:
+    """
+    SHA-256 over the canonical form of
+        {"type", "payload", "event_index", "timestamp", "prev_hash"}
+    i.e. exactly json.dumps(..., sort_keys=True, separators=(",", ":")),
+    with the payload spliced in from its stored canonical text.
+    """
+    h = hashlib.sha256()
+    h.update(b'{"event_index":')
+    h.update(canonical_json(event_index).encode("utf-8"))
+    h.update(b',"payload":')
+    h.update(payload_json.encode("utf-8"))
+    h.update(b',"prev_hash":')
+    h.update(canonical_json(prev_hash).encode("utf-8"))
+    h.update(b',"timestamp":')
+    h.update(canonical_json(timestamp).encode("utf-8"))
+    h.update(b',"type":')
+    h.update(canonical_json(event_type).encode("utf-8"))
+    h.update(b"}")
+    return h.hexdigest()
@@ -0,0 +1,293 @@
+"""
+SQLite connection pool for the persistence layer.
+
+One pool per database file, shared by every SessionRepository pointing at it:
+  - readers are thread-affine: each thread keeps its own autocommit connection,
+    closed when the thread exits
+  - writes go through a single writer connection, serialized by a lock and
+    wrapped in an explicit BEGIN IMMEDIATE / COMMIT transaction
+  - every connection runs in WAL mode with tuned pragmas (see PoolSettings)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return int(value)
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    synchronous: str = "NORMAL"
+    cache_size: int = -16000          # negative = KiB, i.e. 16 MiB page cache per connection
+    mmap_size: int = 134217728        # 128 MiB
+    busy_timeout_ms: int = 5000
+
+    @classmethod
+    def from_env(cls) -> "PoolSettings":
+        return cls(
+            synchronous=os.getenv("REFLECTO_SQLITE_SYNCHRONOUS", cls.synchronous),
+            cache_size=_env_int("REFLECTO_SQLITE_CACHE_SIZE", cls.cache_size),
+            mmap_size=_env_int("REFLECTO_SQLITE_MMAP_SIZE", cls.mmap_size),
+            busy_timeout_ms=_env_int("REFLECTO_SQLITE_BUSY_TIMEOUT_MS", cls.busy_timeout_ms),
+        )
+
+
+class _ReaderSlot:
+    # Lives only in the owning thread's threading.local; collected when the thread exits
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+def _release_reader(readers: Dict[int, sqlite3.Connection], lock: threading.Lock, key: int) -> None:
+    with lock:
+        conn = readers.pop(key, None)
+    if conn is not None:
+        conn.close()
+
+
+class _OpenConnections:
+    # Held apart from the pool so its finalizer can close them without keeping it alive
+    __slots__ = ("writer", "readers")
+
+    def __init__(self, readers: Dict[int, sqlite3.Connection]):
+        self.writer: Optional[sqlite3.Connection] = None
+        self.readers = readers
+
+
+def _close_connections(conns: _OpenConnections, lock: threading.Lock) -> None:
+    with lock:
+        readers = list(conns.readers.values())
+        conns.readers.clear()
+    for conn in readers:
+        conn.close()
+    if conns.writer is not None:
+        conns.writer.close()
+        conns.writer = None
+
+
+class SQLitePool:
+    def __init__(self, db_path: str, settings: Optional[PoolSettings] = None):
+        self.db_path = db_path
+        self.settings = settings or PoolSettings.from_env()
+        self._memory = db_path == ":memory:"
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+        self._stats_lock = threading.Lock()
+        self._readers: Dict[int, sqlite3.Connection] = {}
+        self._reader_keys = 0
+        self._conns = _OpenConnections(self._readers)
+        self._closed = False
+        # A pool nobody references any more (e.g. one retired by get_pool) closes its connections
+        self._finalizer = weakref.finalize(self, _close_connections, self._conns, self._stats_lock)
+        # Set by the first repository to run its DDL against this database
+        self.schema_ready = False
+        self._stats = {
+            "connections_opened": 0,
+            "reader_checkouts": 0,
+            "writer_checkouts": 0,
+            "commits": 0,
+            "rollbacks": 0,
+            "writer_wait_seconds": 0.0,
+        }
+
+    # ----------------------------
+    # Connections
+    # ----------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.settings.busy_timeout_ms / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        conn.execute(f"PRAGMA busy_timeout = {int(self.settings.busy_timeout_ms)}")
+        if not self._memory:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute(f"PRAGMA mmap_size = {int(self.settings.mmap_size)}")
+        conn.execute(f"PRAGMA synchronous = {self.settings.synchronous}")
+        conn.execute(f"PRAGMA cache_size = {int(self.settings.cache_size)}")
+        self._bump("connections_opened")
+        return conn
+
+    def _writer_conn(self) -> sqlite3.Connection:
+        if self._closed:
+            raise sqlite3.ProgrammingError(f"Connection pool for {self.db_path} is closed")
+        if self._conns.writer is None:
+            self._conns.writer = self._connect()
+        return self._conns.writer
+
+    def _reader_conn(self) -> sqlite3.Connection:
+        if self._closed:
+            raise sqlite3.ProgrammingError(f"Connection pool for {self.db_path} is closed")
+        slot = getattr(self._local, "reader", None)
+        if slot is None:
+            slot = _ReaderSlot(self._connect())
+            self._local.reader = slot
+            with self._stats_lock:
+                self._reader_keys += 1
+                key = self._reader_keys
+                self._readers[key] = slot.conn
+            # Thread exit drops the slot; close its connection then, not at pool close
+            weakref.finalize(slot, _release_reader, self._readers, self._stats_lock, key)
+        return slot.conn
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Yield this thread's read connection (autocommit, never closed here)."""
+        self._bump("reader_checkouts")
+        if self._memory:
+            # Every :memory: connection is its own database; share the writer.
+            with self._write_lock:
+                yield self._writer_conn()
+            return
+        yield self._reader_conn()
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        Yield the writer connection inside a single transaction.
+        Commits on success, rolls back on any exception. Re-entrant: nested
+        calls on the same thread join the outer transaction.
+        """
+        started = time.perf_counter()
+        with self._write_lock:
+            waited = time.perf_counter() - started
+            conn = self._writer_conn()
+            depth = getattr(self._local, "write_depth", 0)
+            if depth:
+                self._local.write_depth = depth + 1
+                try:
+                    yield conn
+                finally:
+                    self._local.write_depth = depth
+                return
+
+            with self._stats_lock:
+                self._stats["writer_checkouts"] += 1
+                self._stats["writer_wait_seconds"] += waited
+            conn.execute("BEGIN IMMEDIATE")
+            self._local.write_depth = 1
+            self._local.on_commit = []
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                self._bump("rollbacks")
+                raise
+            else:
+                conn.execute("COMMIT")
+                self._bump("commits")
+                # Still under the write lock: callbacks observe commit order.
+                # The data is committed; a failing callback must not fail the write.
+                for callback in self._local.on_commit:
+                    try:
+                        callback()
+                    except Exception:
+                        logger.exception("after_commit callback failed for %s", self.db_path)
+            finally:
+                self._local.write_depth = 0
+                self._local.on_commit = []
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """
+        Run callback once the current write transaction commits (dropped on
+        rollback). Must be called inside writer().
+        """
+        if not getattr(self._local, "write_depth", 0):
+            raise sqlite3.ProgrammingError("after_commit() requires an open write transaction")
+        self._local.on_commit.append(callback)
+
+    # ----------------------------
+    # Lifecycle + stats
+    # ----------------------------
+
+    def _bump(self, key: str) -> None:
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def close(self) -> None:
+        with self._write_lock:
+            self._closed = True
+            self._finalizer()
+
+    def stats(self) -> Dict[str, object]:
+        with self._stats_lock:
+            out: Dict[str, object] = dict(self._stats)
+            out["readers_open"] = len(self._readers)
+        out["db_path"] = self.db_path
+        out["writer_open"] = self._conns.writer is not None
+        out["settings"] = {
+            "journal_mode": "memory" if self._memory else "wal",
+            "synchronous": self.settings.synchronous,
+            "cache_size": self.settings.cache_size,
+            "mmap_size": self.settings.mmap_size,
+            "busy_timeout_ms": self.settings.busy_timeout_ms,
+        }
+        return out
+
+
+# ----------------------------
+# Process-wide registry
+# ----------------------------
+
+_POOLS: Dict[str, SQLitePool] = {}
+# Pools replaced in the registry but possibly still used by live repositories;
+# held weakly, so each one closes once its last repository is gone
+_RETIRED: "weakref.WeakSet[SQLitePool]" = weakref.WeakSet()
+_POOLS_LOCK = threading.Lock()
+
+
+def _pool_key(db_path: str) -> str:
+    return db_path if db_path == ":memory:" else os.path.abspath(db_path)
+
+
+def get_pool(db_path: str) -> SQLitePool:
+    """Return the shared pool for db_path, opening it on first use."""
+    key = _pool_key(db_path)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        # A pool whose file was removed underneath it would keep serving the
+        # unlinked inode; new callers start over against the new path. The old
+        # pool stays open for repositories still holding it.
+        if pool is not None and key != ":memory:" and not os.path.exists(key):
+            _RETIRED.add(pool)
+            pool = None
+        if pool is None:
+            pool = SQLitePool(db_path)
+            _POOLS[key] = pool
+        return pool
+
+
+def close_all_pools() -> None:
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values()) + list(_RETIRED)
+        _POOLS.clear()
+        _RETIRED.clear()
+    for pool in pools:
+        pool.close()
+
+
+def pool_stats() -> List[Dict[str, object]]:
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+    return [pool.stats() for pool in pools]
@@ -1,4 +1,6 @@
-from typing import Any
+import json
+from collections.abc import Mapping
+from typing import Any, Iterator
 from infrastructure.providers import (
     TimeProvider,
     IdProvider,
@@ -26,3 +28,92 @@ class SessionRecord:
         self.created_at = created_at or time_provider.now().isoformat()
         self.data = data
         self.version = version
+
+
+_UNDECODED = object()
+
+
+class EventRecord(Mapping):
+    """
+    Read-side journal event. Keeps the stored payload text as `payload_raw`
+    and only runs json.loads the first time `payload` is accessed.
+    Behaves as a read-only mapping so dict-style consumers keep working.
+    """
+
+    __slots__ = (
+        "id",
+        "session_id",
+        "timestamp",
+        "event_index",
+        "type",
+        "payload_raw",
+        "source",
+        "event_hash",
+        "prev_hash",
+        "_payload",
+    )
+
+    _KEYS = (
+        "id",
+        "session_id",
+        "timestamp",
+        "event_index",
+        "type",
+        "payload",
+        "source",
+        "event_hash",
+        "prev_hash",
+    )
+
+    # Column order expected by from_row()
+    COLUMNS = "id, session_id, timestamp, event_index, type, payload, source, event_hash, prev_hash"
+
+    def __init__(
+        self,
+        id: str,
+        session_id: str,
+        timestamp: str,
+        event_index: int | None,
+        type: str,
+        payload_raw: str,
+        source: str,
+        event_hash: str | None = None,
+        prev_hash: str | None = None,
+    ):
+        self.id = id
+        self.session_id = session_id
+        self.timestamp = timestamp
+        self.event_index = event_index
+        self.type = type
+        self.payload_raw = payload_raw
+        self.source = source
+        self.event_hash = event_hash
+        self.prev_hash = prev_hash
+        self._payload = _UNDECODED
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "EventRecord":
+        return cls(*row)
+
+    @property
+    def payload(self) -> Any:
+        if self._payload is _UNDECODED:
+            self._payload = json.loads(self.payload_raw)
+        return self._payload
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self) -> str:
+        return f"EventRecord(session_id={self.session_id!r}, event_index={self.event_index!r}, type={self.type!r})"
+
+    def to_dict(self) -> dict:
+        return {key: self[key] for key in self._KEYS}
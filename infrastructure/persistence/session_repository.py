@@ -1,7 +1,12 @@
+import base64
 import sqlite3
 import json
-from typing import List, Optional
-from .models import SessionRecord
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+from .canonical import canonical_json
+from .connection_pool import get_pool
+from .models import EventRecord, SessionRecord
+from domain.core.snapshot_builder import LAST_VALUE_TYPES, build_daily_snapshot, empty_snapshot, fold_event
+from infrastructure.streaming.broker import EventBroker, Notice, get_event_broker, session_channel, user_channel
 from infrastructure.providers import (
     TimeProvider,
     IdProvider,
@@ -13,16 +18,59 @@ from infrastructure.providers import (
 
 
 
+SESSION_FIELDS = ("id", "user_id", "created_at", "data", "version")
+
+
+def encode_page_cursor(created_at: str, session_id: str) -> str:
+    raw = json.dumps([created_at, session_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_page_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        created_at, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError, UnicodeError) as exc:
+        raise ValueError("Malformed page cursor") from exc
+    if not isinstance(created_at, str) or not isinstance(session_id, str):
+        raise ValueError("Malformed page cursor")
+    return created_at, session_id
+
+
+class IdempotencyConflict(ValueError):
+    """An Idempotency-Key was reused with a different request body."""
+
+
+class HistoryRebuildConflict(RuntimeError):
+    """Live history changed while a full-history rebuild was being staged."""
+
+
+# Live tables whose writes invalidate a user's staged history rebuild
+REBUILD_WATCHED_TABLES = ("session_events", "daily_snapshots", "avatar_state")
+
+
+# Days of history kept in user_stats (the streak window of a daily update)
+STATS_WINDOW = 60
+
+
+def _stats_entry(snapshot: dict) -> Tuple[int, Optional[float]]:
+    # What compute_streak / extract_patterns read from one daily snapshot
+    skills = snapshot.get("skills", {})
+    return int(snapshot.get("meaningful_events", 0)), (skills.get("focus", 0) if skills else None)
+
+
 class SessionRepository:
     def __init__(
         self,
         db_path: str = 'sessions.db',
         time_provider: Optional[TimeProvider] = None,
         id_provider: Optional[IdProvider] = None,
+        broker: Optional[EventBroker] = None,
     ):
         self.db_path = db_path
         self._time_provider = time_provider
         self._id_provider = id_provider
+        self._broker = broker or get_event_broker()
+        self._pool = get_pool(db_path)
         self._init_db()
 
     def _ensure_providers(self) -> None:
@@ -30,8 +78,19 @@ class SessionRepository:
         self._time_provider = get_time_provider(self._time_provider)
         self._id_provider = get_id_provider(self._id_provider)
 
+    @property
+    def broker(self) -> EventBroker:
+        """Broker this repository publishes committed journal events to."""
+        return self._broker
+
+    def pool_stats(self) -> Dict[str, object]:
+        return self._pool.stats()
+
     def _init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
+        # DDL and backfill run once per database, not once per repository
+        if self._pool.schema_ready:
+            return
+        with self._pool.writer() as conn:
             # Sessions table (existing)
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS sessions (
@@ -43,6 +102,11 @@ class SessionRepository:
                 )
             ''')
 
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_sessions_user_created
+                ON sessions (user_id, created_at, id)
+            """)
+
             # Event journal table (C.1)
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS session_events (
@@ -54,7 +118,9 @@ class SessionRepository:
                     payload TEXT NOT NULL,
                     source TEXT NOT NULL,
                     event_hash TEXT,
-                    prev_hash TEXT
+                    prev_hash TEXT,
+                    user_id TEXT,
+                    day TEXT
                 )
             """)
 
@@ -74,11 +140,48 @@ class SessionRepository:
             except sqlite3.OperationalError:
                 pass
 
+            # Denormalized owner + UTC day for per-user daily reads (C.2)
+            try:
+                conn.execute("ALTER TABLE session_events ADD COLUMN user_id TEXT")
+            except sqlite3.OperationalError:
+                pass
+
+            try:
+                conn.execute("ALTER TABLE session_events ADD COLUMN day TEXT")
+            except sqlite3.OperationalError:
+                pass
+
+            # 1 = payload stored as canonical_json text; NULL = legacy json.dumps row
+            try:
+                conn.execute("ALTER TABLE session_events ADD COLUMN payload_canonical INTEGER")
+            except sqlite3.OperationalError:
+                pass
+
             conn.execute("""
                 CREATE UNIQUE INDEX IF NOT EXISTS idx_session_events_session_index
                 ON session_events (session_id, event_index)
             """)
 
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_session_events_user_day
+                ON session_events (user_id, day, event_index)
+            """)
+
+            # Per-session event index counter (replaces MAX(event_index) per append)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS session_event_sequences (
+                    session_id TEXT PRIMARY KEY,
+                    last_index INTEGER NOT NULL
+                )
+            """)
+
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    name TEXT PRIMARY KEY,
+                    completed_at TEXT NOT NULL
+                )
+            """)
+
             # Daily snapshots table (C.2)
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS daily_snapshots (
@@ -106,6 +209,146 @@ class SessionRepository:
                 )
             """)
 
+            # Idempotent session creation: (user_id, key) -> first stored session
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS session_idempotency (
+                    user_id TEXT NOT NULL,
+                    idem_key TEXT NOT NULL,
+                    session_id TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (user_id, idem_key)
+                )
+            """)
+            # Fingerprint of the request body first stored under the key
+            try:
+                conn.execute("ALTER TABLE session_idempotency ADD COLUMN request_fingerprint TEXT")
+            except sqlite3.OperationalError:
+                pass
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_session_idempotency_created
+                ON session_idempotency (created_at)
+            """)
+
+            # Memoized pipeline outputs keyed by (version, input_hash)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pipeline_cache (
+                    version TEXT NOT NULL,
+                    input_hash TEXT NOT NULL,
+                    output TEXT NOT NULL,
+                    PRIMARY KEY (version, input_hash)
+                )
+            """)
+
+            # Rendered SSE bodies of completed sessions
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS session_frames (
+                    session_id TEXT PRIMARY KEY,
+                    format TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    offsets TEXT NOT NULL
+                )
+            """)
+
+            # Running daily snapshot per (user, day), folded as events are appended.
+            # last_keys holds the (event_index, timestamp) of the event behind each
+            # last-value field so out-of-order appends keep batch semantics.
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS daily_aggregates (
+                    user_id TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    snapshot TEXT NOT NULL,
+                    last_keys TEXT NOT NULL,
+                    high_water_index INTEGER,
+                    event_count INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, day)
+                )
+            """)
+
+            # What produced the last daily update, so unchanged days skip the rewrite
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS daily_update_state (
+                    user_id TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    event_count INTEGER NOT NULL,
+                    high_water_index INTEGER,
+                    input_digest TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (user_id, day)
+                )
+            """)
+
+            # Rolling per-user stats over the newest STATS_WINDOW daily snapshots,
+            # maintained on every snapshot upsert (day DESC, parallel arrays)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS user_stats (
+                    user_id TEXT PRIMARY KEY,
+                    streak INTEGER NOT NULL,
+                    last_meaningful_day TEXT,
+                    days TEXT NOT NULL,
+                    meaningful TEXT NOT NULL,
+                    focus TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+
+            # Per-job progress of batch runners, so a crashed run resumes
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS batch_checkpoints (
+                    job TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    completed_at TEXT NOT NULL,
+                    PRIMARY KEY (job, user_id)
+                )
+            """)
+
+        self.backfill_event_user_day()
+        self._pool.schema_ready = True
+
+    # ----------------------------
+    # Online migrations
+    # ----------------------------
+
+    def _migration_done(self, name: str) -> bool:
+        with self._pool.reader() as conn:
+            cur = conn.execute("SELECT 1 FROM schema_migrations WHERE name = ?", (name,))
+            return cur.fetchone() is not None
+
+    def backfill_event_user_day(self, batch_size: int = 500) -> int:
+        """
+        Fill session_events.user_id/day for rows written before those columns
+        existed. Runs in small transactions so concurrent writers are never
+        blocked for long; records completion so later startups skip the scan.
+        Returns the number of rows updated.
+        """
+        name = "session_events_user_day_backfill"
+        if self._migration_done(name):
+            return 0
+        updated = 0
+        while True:
+            with self._pool.writer() as conn:
+                cur = conn.execute("""
+                    UPDATE session_events
+                    SET day = substr(timestamp, 1, 10),
+                        user_id = COALESCE(
+                            user_id,
+                            (SELECT s.user_id FROM sessions s WHERE s.id = session_events.session_id)
+                        )
+                    WHERE rowid IN (
+                        SELECT rowid FROM session_events WHERE day IS NULL LIMIT ?
+                    )
+                """, (batch_size,))
+                updated += cur.rowcount
+                if cur.rowcount < batch_size:
+                    if updated:
+                        # Rows changed owner/day under any existing aggregates
+                        conn.execute("DELETE FROM daily_aggregates")
+                    conn.execute(
+                        "INSERT OR REPLACE INTO schema_migrations (name, completed_at) VALUES (?, datetime('now'))",
+                        (name,)
+                    )
+                    return updated
+
 
 
     # ----------------------------
@@ -114,21 +357,119 @@ class SessionRepository:
 
     def save(self, session_record: SessionRecord) -> str:
         self._ensure_providers()
-        with sqlite3.connect(self.db_path) as conn:
+        with self._pool.writer() as conn:
+            self._insert_session(conn, session_record)
+        return session_record.id
+
+    def save_with_events(self, session_record: SessionRecord, events: List[dict]) -> str:
+        """
+        Persist a session row and its event journal in a single transaction.
+        Either both land or neither does.
+        """
+        self._ensure_providers()
+        with self._pool.writer() as conn:
+            self._insert_session(conn, session_record)
+            self._insert_events(conn, events)
+        return session_record.id
+
+    def find_idempotent_session(
+        self,
+        user_id: str,
+        idem_key: str,
+        window_seconds: float,
+        now_ts: float,
+        fingerprint: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Session id previously stored under (user_id, idem_key) within the window,
+        if any. Raises IdempotencyConflict if it was stored for a different
+        request fingerprint.
+        """
+        with self._pool.reader() as conn:
+            return self._lookup_idempotent(conn, user_id, idem_key, window_seconds, now_ts, fingerprint)
+
+    def save_with_events_once(
+        self,
+        session_record: SessionRecord,
+        events: List[dict],
+        idem_key: str,
+        window_seconds: float,
+        now_ts: float,
+        fingerprint: Optional[str] = None,
+    ) -> str:
+        """
+        Idempotent save_with_events. If (user_id, idem_key) already maps to a
+        session inside the window, nothing is written and that session id is
+        returned (IdempotencyConflict if it was stored for another
+        fingerprint). The check and the write share one IMMEDIATE
+        transaction, so concurrent duplicates resolve to a single stored
+        session. Keys that left the window are pruned on the way.
+        """
+        self._ensure_providers()
+        user_id = session_record.user_id
+        with self._pool.writer() as conn:
+            existing = self._lookup_idempotent(conn, user_id, idem_key, window_seconds, now_ts, fingerprint)
+            if existing is not None:
+                return existing
+            self._insert_session(conn, session_record)
+            self._insert_events(conn, events)
             conn.execute(
-                'INSERT INTO sessions (id, user_id, created_at, data, version) VALUES (?, ?, ?, ?, ?)',
-                (
-                    session_record.id,
-                    session_record.user_id,
-                    session_record.created_at,
-                    json.dumps(session_record.data),
-                    session_record.version
-                )
+                "DELETE FROM session_idempotency WHERE created_at < ?",
+                (now_ts - window_seconds,),
             )
+            conn.execute("""
+                INSERT OR REPLACE INTO session_idempotency
+                    (user_id, idem_key, session_id, created_at, request_fingerprint)
+                VALUES (?, ?, ?, ?, ?)
+            """, (user_id, idem_key, session_record.id, now_ts, fingerprint))
         return session_record.id
 
+    def _lookup_idempotent(
+        self,
+        conn: sqlite3.Connection,
+        user_id: str,
+        idem_key: str,
+        window_seconds: float,
+        now_ts: float,
+        fingerprint: Optional[str],
+    ) -> Optional[str]:
+        cur = conn.execute("""
+            SELECT session_id, request_fingerprint FROM session_idempotency
+            WHERE user_id = ? AND idem_key = ? AND created_at >= ?
+        """, (user_id, idem_key, now_ts - window_seconds))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        # Rows from before fingerprints were stored cannot be compared
+        if fingerprint is not None and row[1] is not None and row[1] != fingerprint:
+            raise IdempotencyConflict("Idempotency-Key was already used with a different request body")
+        return row[0]
+
+    def _insert_session(self, conn: sqlite3.Connection, session_record: SessionRecord) -> None:
+        conn.execute(
+            'INSERT INTO sessions (id, user_id, created_at, data, version) VALUES (?, ?, ?, ?, ?)',
+            (
+                session_record.id,
+                session_record.user_id,
+                session_record.created_at,
+                json.dumps(session_record.data),
+                session_record.version
+            )
+        )
+        # Journal events may have been appended before their session row existed
+        cur = conn.execute(
+            'UPDATE session_events SET user_id = ? WHERE session_id = ? AND user_id IS NULL',
+            (session_record.user_id, session_record.id)
+        )
+        if cur.rowcount:
+            # Their days are rebuilt from the journal on next touch
+            conn.execute("""
+                DELETE FROM daily_aggregates
+                WHERE user_id = ? AND day IN (SELECT DISTINCT day FROM session_events WHERE session_id = ?)
+            """, (session_record.user_id, session_record.id))
+
     def get(self, session_id: str) -> Optional[dict]:
-        with sqlite3.connect(self.db_path) as conn:
+        with self._pool.reader() as conn:
             cur = conn.execute(
                 'SELECT id, user_id, created_at, data, version FROM sessions WHERE id = ?',
                 (session_id,)
@@ -145,7 +486,7 @@ class SessionRepository:
             return None
 
     def list_for_user(self, user_id: str) -> List[dict]:
-        with sqlite3.connect(self.db_path) as conn:
+        with self._pool.reader() as conn:
             cur = conn.execute(
                 'SELECT id, user_id, created_at, data, version '
                 'FROM sessions WHERE user_id = ? ORDER BY created_at DESC',
@@ -162,6 +503,52 @@ class SessionRepository:
                 for row in cur.fetchall()
             ]
 
+    def list_for_user_page(
+        self,
+        user_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ) -> dict:
+        """
+        Keyset-paginated listing, newest first, ordered by (created_at, id).
+        `fields` projects the returned columns; leaving out "data" skips
+        reading and decoding the session blobs entirely.
+        Raises ValueError on an unknown field, bad limit or malformed cursor.
+        """
+        if limit < 1:
+            raise ValueError("limit must be >= 1")
+        fields = list(fields) if fields else list(SESSION_FIELDS)
+        unknown = [f for f in fields if f not in SESSION_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown session fields: {unknown}")
+
+        columns = ["created_at", "id"] + [f for f in fields if f not in ("created_at", "id")]
+        sql = f"SELECT {', '.join(columns)} FROM sessions WHERE user_id = ?"
+        params: list = [user_id]
+        if cursor is not None:
+            created_at, session_id = decode_page_cursor(cursor)
+            sql += " AND (created_at, id) < (?, ?)"
+            params += [created_at, session_id]
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._pool.reader() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        items = []
+        for row in rows[:limit]:
+            values = dict(zip(columns, row))
+            if "data" in values:
+                values["data"] = json.loads(values["data"])
+            items.append({f: values[f] for f in fields})
+
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_page_cursor(last[0], last[1])
+        return {"items": items, "next_cursor": next_cursor}
+
     # ----------------------------
     # Event journal (C.1)
     # ----------------------------
@@ -171,89 +558,282 @@ class SessionRepository:
         Append-only event journal write.
         NEVER update or overwrite events.
         """
+        self.append_events([event])
+
+    def append_events(self, events: List[dict]) -> None:
+        """
+        Append a batch of journal events in one transaction (all-or-nothing).
+        Events without an event_index continue their session's sequence.
+        """
         self._ensure_providers()
-        with sqlite3.connect(self.db_path) as conn:
-            required = {"id", "session_id", "timestamp", "type", "payload", "source"}
+        with self._pool.writer() as conn:
+            self._insert_events(conn, events)
+
+    def _insert_events(self, conn: sqlite3.Connection, events: List[dict]) -> None:
+        required = {"id", "session_id", "timestamp", "type", "payload", "source"}
+        explicit_max: Dict[str, int] = {}
+        implicit_count: Dict[str, int] = {}
+        for event in events:
             missing = required - set(event.keys())
             if missing:
                 raise ValueError(f"Missing event fields: {sorted(missing)}")
-            if "event_index" not in event:
-                cur = conn.execute(
-                    "SELECT COALESCE(MAX(event_index), 0) FROM session_events WHERE session_id = ?",
-                    (event["session_id"],)
-                )
-                next_index = int(cur.fetchone()[0]) + 1
-                event = dict(event)
-                event["event_index"] = next_index
-            conn.execute("""
-                INSERT INTO session_events (
-                    id, session_id, timestamp, event_index, type, payload, source, event_hash, prev_hash
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
+            session_id = event["session_id"]
+            if event.get("event_index") is None:
+                implicit_count[session_id] = implicit_count.get(session_id, 0) + 1
+            else:
+                explicit_max[session_id] = max(explicit_max.get(session_id, 0), event["event_index"])
+
+        # Explicit indices advance the sequence first so implicit ones never collide
+        for session_id, max_index in explicit_max.items():
+            self._advance_sequence(conn, session_id, max_index)
+        allocated: Dict[str, Iterator[int]] = {
+            session_id: iter(self._allocate_indices(conn, session_id, count))
+            for session_id, count in implicit_count.items()
+        }
+
+        owners: Dict[str, Optional[str]] = {}
+        rows = []
+        for event in events:
+            session_id = event["session_id"]
+            event_index = event.get("event_index")
+            if event_index is None:
+                event_index = next(allocated[session_id])
+            if session_id not in owners:
+                cur = conn.execute("SELECT user_id FROM sessions WHERE id = ?", (session_id,))
+                row = cur.fetchone()
+                owners[session_id] = row[0] if row else None
+            user_id = event.get("user_id") or owners[session_id]
+            rows.append((
                 event["id"],
-                event["session_id"],
+                session_id,
                 event["timestamp"],
-                event["event_index"],
+                event_index,
                 event["type"],
-                json.dumps(event["payload"]),
+                event.get("payload_raw") or canonical_json(event["payload"]),
                 event["source"],
                 event.get("event_hash"),
                 event.get("prev_hash"),
+                user_id,
+                event["timestamp"][:10],
             ))
+        conn.executemany("""
+            INSERT INTO session_events (
+                id, session_id, timestamp, event_index, type, payload, source, event_hash, prev_hash,
+                user_id, day, payload_canonical
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+        """, rows)
+
+        by_day: Dict[Tuple[str, str], List[tuple]] = {}
+        for row in rows:
+            if row[9]:
+                by_day.setdefault((row[9], row[10]), []).append(row)
+        for (uid, day), day_rows in by_day.items():
+            self._fold_daily_aggregate(conn, uid, day, [EventRecord.from_row(r[:9]) for r in day_rows])
+
+        # Live SSE: publish once committed, in commit order. Subscribers are
+        # checked after the commit so a stream that subscribes mid-transaction
+        # either reads the rows or receives them, never neither.
+        def publish() -> None:
+            for sid in implicit_count.keys() | explicit_max.keys():
+                channel = session_channel(sid)
+                if self._broker.has_subscribers(channel):
+                    self._broker.publish(
+                        channel,
+                        (EventRecord.from_row(row[:9]) for row in rows if row[1] == sid),
+                    )
+            for uid in {row[9] for row in rows if row[9]}:
+                channel = user_channel(uid)
+                if self._broker.has_subscribers(channel):
+                    self._broker.publish(
+                        channel,
+                        (EventRecord.from_row(row[:9]) for row in rows if row[9] == uid),
+                    )
+        self._pool.after_commit(publish)
+
+    def _publish_notice(self, user_id: str, notice_type: str, build_payload: Callable[[], dict]) -> None:
+        # Inside a writer transaction: deliver to the user's channel on commit.
+        # The payload is only built when someone is listening.
+        def publish() -> None:
+            channel = user_channel(user_id)
+            if self._broker.has_subscribers(channel):
+                self._broker.publish(channel, (Notice(notice_type, build_payload()),))
+        self._pool.after_commit(publish)
+
+    # ----------------------------
+    # Event index sequences
+    # ----------------------------
+
+    def allocate_event_indices(self, session_id: str, count: int = 1) -> range:
+        """
+        Atomically reserve `count` consecutive event indices for a session.
+        Safe under concurrent writers: allocation happens inside the writer
+        transaction against the session_event_sequences counter row.
+        """
+        with self._pool.writer() as conn:
+            return self._allocate_indices(conn, session_id, count)
+
+    def _ensure_sequence(self, conn: sqlite3.Connection, session_id: str) -> None:
+        # First touch of a session seeds its counter from any pre-existing journal rows
+        conn.execute("""
+            INSERT INTO session_event_sequences (session_id, last_index)
+            SELECT ?, COALESCE(MAX(event_index), 0) FROM session_events WHERE session_id = ?
+            ON CONFLICT (session_id) DO NOTHING
+        """, (session_id, session_id))
+
+    def _allocate_indices(self, conn: sqlite3.Connection, session_id: str, count: int) -> range:
+        if count < 1:
+            raise ValueError("count must be >= 1")
+        sql = """
+            UPDATE session_event_sequences SET last_index = last_index + ?
+            WHERE session_id = ?
+            RETURNING last_index
+        """
+        row = conn.execute(sql, (count, session_id)).fetchone()
+        if row is None:
+            self._ensure_sequence(conn, session_id)
+            row = conn.execute(sql, (count, session_id)).fetchone()
+        last = int(row[0])
+        return range(last - count + 1, last + 1)
+
+    def _advance_sequence(self, conn: sqlite3.Connection, session_id: str, index: int) -> None:
+        cur = conn.execute("""
+            UPDATE session_event_sequences SET last_index = MAX(last_index, ?)
+            WHERE session_id = ?
+        """, (index, session_id))
+        if cur.rowcount == 0:
+            self._ensure_sequence(conn, session_id)
+            conn.execute("""
+                UPDATE session_event_sequences SET last_index = MAX(last_index, ?)
+                WHERE session_id = ?
+            """, (index, session_id))
 
-    def get_events(self, session_id: str) -> List[dict]:
+    def get_events(self, session_id: str) -> List[EventRecord]:
         """
         Read event journal in chronological order for replay.
         """
-        with sqlite3.connect(self.db_path) as conn:
-            cur = conn.execute("""
-                SELECT id, session_id, timestamp, event_index, type, payload, source, event_hash, prev_hash
+        return list(self.iter_events(session_id))
+
+    def iter_events(
+        self,
+        session_id: str,
+        chunk_size: int = 256,
+        after_index: Optional[int] = None,
+    ) -> Iterator[EventRecord]:
+        """
+        Stream the journal in order, `chunk_size` rows per keyset page.
+        Payloads stay undecoded until accessed. No connection or lock is
+        held between pages, so a paused or abandoned consumer never blocks
+        writers, and the iterator can be resumed from any thread.
+        With after_index, only events with event_index > after_index are read
+        (a range scan on the (session_id, event_index) index).
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be >= 1")
+        while True:
+            with self._pool.reader() as conn:
+                legacy, rows = self._journal_page(conn, session_id, after_index, chunk_size)
+            for row in legacy:
+                yield EventRecord.from_row(row)
+            for row in rows:
+                yield EventRecord.from_row(row)
+            if len(rows) < chunk_size:
+                return
+            after_index = rows[-1][3]
+
+    def _journal_page(
+        self, conn: sqlite3.Connection, session_id: str, after_index: Optional[int], limit: int
+    ) -> Tuple[list, list]:
+        """
+        (legacy rows, indexed rows) of one keyset page; shared by iter_events
+        and read_events_after so both agree on what a legacy row is. Legacy
+        rows (no index, or index <= 0) come first and only when after_index
+        is None; there are few of them.
+        """
+        legacy: list = []
+        if after_index is None:
+            legacy = conn.execute(f"""
+                SELECT {EventRecord.COLUMNS}
                 FROM session_events
-                WHERE session_id = ?
+                WHERE session_id = ? AND (event_index IS NULL OR event_index <= 0)
                 ORDER BY COALESCE(event_index, 0) ASC, timestamp ASC
-            """, (session_id,))
-            return [
-                {
-                    "id": r[0],
-                    "session_id": r[1],
-                    "timestamp": r[2],
-                    "event_index": r[3],
-                    "type": r[4],
-                    "payload": json.loads(r[5]),
-                    "source": r[6],
-                    "event_hash": r[7],
-                    "prev_hash": r[8],
-                }
-                for r in cur.fetchall()
-            ]
-        
+            """, (session_id,)).fetchall()
+            after_index = 0
+        rows = conn.execute(f"""
+            SELECT {EventRecord.COLUMNS}
+            FROM session_events
+            WHERE session_id = ? AND event_index > ?
+            ORDER BY event_index ASC
+            LIMIT ?
+        """, (session_id, after_index, limit)).fetchall()
+        return legacy, rows
+
+    def legacy_payload_event_ids(self, session_id: str) -> Set[str]:
+        """Ids of a session's rows stored before payloads were kept as canonical text."""
+        with self._pool.reader() as conn:
+            cur = conn.execute(
+                "SELECT id FROM session_events WHERE session_id = ? AND payload_canonical IS NULL",
+                (session_id,),
+            )
+            return {row[0] for row in cur.fetchall()}
+
+    def read_events_after(
+        self,
+        session_id: str,
+        after_index: Optional[int] = None,
+        limit: int = 256,
+    ) -> List[EventRecord]:
+        """
+        One keyset page of the journal: up to `limit` events with
+        event_index > after_index, in order. Each call is a single short
+        query, so pages can be fetched from any thread. after_index=None
+        starts from the beginning, including legacy rows (no index, or <= 0).
+        """
+        with self._pool.reader() as conn:
+            legacy, rows = self._journal_page(conn, session_id, after_index, limit)
+        return [EventRecord.from_row(row) for row in legacy + rows]
+
     # ----------------------------
     # Daily snapshots (C.2)
     # ----------------------------
 
     def upsert_daily_snapshot(self, user_id: str, day: str, snapshot: dict, version: str = "v1") -> str:
         self._ensure_providers()
+        with self._pool.writer() as conn:
+            return self._upsert_daily_snapshot(conn, user_id, day, snapshot, version)
+
+    def _upsert_daily_snapshot(
+        self, conn: sqlite3.Connection, user_id: str, day: str, snapshot: dict, version: str
+    ) -> str:
+        snapshot_json = json.dumps(snapshot)
         snapshot_id = f"snap_{self._id_provider.new_id()}"
         created_at = self._time_provider.now().isoformat()
-
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                INSERT OR REPLACE INTO daily_snapshots (
-                    id, user_id, day, created_at, snapshot, version
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                snapshot_id,
-                user_id,
-                day,
-                created_at,
-                json.dumps(snapshot),
-                version
-            ))
-
+        # A day keeps its first snapshot id (and created_at) across updates
+        snapshot_id = conn.execute("""
+            INSERT INTO daily_snapshots (
+                id, user_id, day, created_at, snapshot, version
+            ) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, day) DO UPDATE SET
+                snapshot = excluded.snapshot,
+                version = excluded.version
+            RETURNING id
+        """, (
+            snapshot_id,
+            user_id,
+            day,
+            created_at,
+            snapshot_json,
+            version
+        )).fetchone()[0]
+        self._publish_notice(
+            user_id,
+            "daily_update",
+            lambda: {"day": day, "snapshot": json.loads(snapshot_json)},
+        )
+        self._update_user_stats(conn, user_id, day, snapshot)
         return snapshot_id
 
     def get_daily_snapshot(self, user_id: str, day: str) -> Optional[dict]:
-        with sqlite3.connect(self.db_path) as conn:
+        with self._pool.reader() as conn:
             cur = conn.execute("""
                 SELECT id, user_id, day, created_at, snapshot, version
                 FROM daily_snapshots
@@ -274,7 +854,7 @@ class SessionRepository:
             }
 
     def list_daily_snapshots(self, user_id: str, limit: int = 60) -> List[dict]:
-        with sqlite3.connect(self.db_path) as conn:
+        with self._pool.reader() as conn:
             cur = conn.execute("""
                 SELECT id, user_id, day, created_at, snapshot, version
                 FROM daily_snapshots
@@ -295,49 +875,620 @@ class SessionRepository:
                 for r in cur.fetchall()
             ]
 
-    def get_events_for_user_day(self, user_id: str, day: str) -> List[dict]:
+    def get_events_for_user_day(self, user_id: str, day: str) -> List[EventRecord]:
         """
-        C.2 helper: get all events for all sessions belonging to user, filtered to UTC day prefix.
-        (We’ll upgrade to a more direct query later by storing user_id on events.)
+        C.2 helper: get all events for all sessions belonging to user on a UTC day.
+        Single range scan over idx_session_events_user_day.
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self._pool.reader() as conn:
+            return self._journal_for_user_day(conn, user_id, day)
+
+    def _journal_for_user_day(self, conn: sqlite3.Connection, user_id: str, day: str) -> List[EventRecord]:
+        # rowid breaks (event_index, timestamp) ties in append order
+        cur = conn.execute(f"""
+            SELECT {EventRecord.COLUMNS}
+            FROM session_events
+            WHERE user_id = ? AND day = ?
+            ORDER BY event_index ASC, timestamp ASC, rowid ASC
+        """, (user_id, day))
+        return [EventRecord.from_row(r) for r in cur.fetchall()]
+
+    # ----------------------------
+    # User stats (rolling windows over daily snapshots)
+    # ----------------------------
+
+    def get_user_stats(self, user_id: str) -> dict:
+        """
+        Streak, last meaningful day and the newest STATS_WINDOW days' meaningful
+        event counts and focus values (newest first): one primary-key read.
+        focus is None for days whose snapshot has no skills. Built from
+        daily_snapshots on first touch.
+        """
+        with self._pool.reader() as conn:
+            stats = self._read_user_stats(conn, user_id)
+        if stats is None:
+            self._ensure_providers()
+            with self._pool.writer() as conn:
+                stats = self._read_user_stats(conn, user_id) or self._rebuild_user_stats(conn, user_id)
+        return {"user_id": user_id, **stats}
+
+    def _read_user_stats(self, conn: sqlite3.Connection, user_id: str) -> Optional[dict]:
+        row = conn.execute("""
+            SELECT streak, last_meaningful_day, days, meaningful, focus
+            FROM user_stats WHERE user_id = ?
+        """, (user_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "streak": row[0],
+            "last_meaningful_day": row[1],
+            "days": json.loads(row[2]),
+            "meaningful": json.loads(row[3]),
+            "focus": json.loads(row[4]),
+        }
+
+    def _rebuild_user_stats(self, conn: sqlite3.Connection, user_id: str) -> dict:
+        days: List[str] = []
+        meaningful: List[int] = []
+        focus: List[Optional[float]] = []
+        cur = conn.execute("""
+            SELECT day, snapshot FROM daily_snapshots
+            WHERE user_id = ?
+            ORDER BY day DESC
+            LIMIT ?
+        """, (user_id, STATS_WINDOW))
+        for day, snapshot_json in cur.fetchall():
+            count, focus_value = _stats_entry(json.loads(snapshot_json))
+            days.append(day)
+            meaningful.append(count)
+            focus.append(focus_value)
+        return self._write_user_stats(conn, user_id, days, meaningful, focus)
+
+    def _update_user_stats(self, conn: sqlite3.Connection, user_id: str, day: str, snapshot: dict) -> None:
+        # Inside the snapshot upsert transaction; the row is already written
+        stats = self._read_user_stats(conn, user_id)
+        if stats is None:
+            self._rebuild_user_stats(conn, user_id)
+            return
+        days, meaningful, focus = stats["days"], stats["meaningful"], stats["focus"]
+        count, focus_value = _stats_entry(snapshot)
+        if day in days:
+            pos = days.index(day)
+            meaningful[pos], focus[pos] = count, focus_value
+        else:
+            pos = next((i for i, d in enumerate(days) if d < day), len(days))
+            if pos >= STATS_WINDOW:
+                # Older than the whole window: only the last meaningful day can move
+                if stats["last_meaningful_day"] is None or day >= stats["last_meaningful_day"]:
+                    self._write_user_stats(conn, user_id, days, meaningful, focus)
+                return
+            days.insert(pos, day)
+            meaningful.insert(pos, count)
+            focus.insert(pos, focus_value)
+            del days[STATS_WINDOW:], meaningful[STATS_WINDOW:], focus[STATS_WINDOW:]
+        self._write_user_stats(conn, user_id, days, meaningful, focus)
+
+    def _write_user_stats(
+        self,
+        conn: sqlite3.Connection,
+        user_id: str,
+        days: List[str],
+        meaningful: List[int],
+        focus: List[Optional[float]],
+    ) -> dict:
+        # Same rule as compute_streak: leading snapshots with meaningful events
+        streak = next((i for i, count in enumerate(meaningful) if count <= 0), len(meaningful))
+        last_meaningful_day = next((d for d, count in zip(days, meaningful) if count > 0), None)
+        if last_meaningful_day is None and len(days) == STATS_WINDOW:
+            # Rare: a full window without activity; look further back
             cur = conn.execute("""
-                SELECT id FROM sessions
-                WHERE user_id = ?
-            """, (user_id,))
-            session_ids = [r[0] for r in cur.fetchall()]
+                SELECT day, snapshot FROM daily_snapshots
+                WHERE user_id = ? AND day < ?
+                ORDER BY day DESC
+            """, (user_id, days[-1]))
+            last_meaningful_day = next(
+                (d for d, snapshot_json in cur if _stats_entry(json.loads(snapshot_json))[0] > 0), None
+            )
+        conn.execute("""
+            INSERT INTO user_stats (user_id, streak, last_meaningful_day, days, meaningful, focus, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET
+                streak = excluded.streak,
+                last_meaningful_day = excluded.last_meaningful_day,
+                days = excluded.days,
+                meaningful = excluded.meaningful,
+                focus = excluded.focus,
+                updated_at = excluded.updated_at
+        """, (
+            user_id,
+            streak,
+            last_meaningful_day,
+            canonical_json(days),
+            canonical_json(meaningful),
+            canonical_json(focus),
+            self._time_provider.now().isoformat(),
+        ))
+        return {
+            "streak": streak,
+            "last_meaningful_day": last_meaningful_day,
+            "days": days,
+            "meaningful": meaningful,
+            "focus": focus,
+        }
 
-        if not session_ids:
-            return []
+    # ----------------------------
+    # Daily aggregates (running C.2 snapshot)
+    # ----------------------------
 
-        placeholders = ",".join(["?"] * len(session_ids))
-        with sqlite3.connect(self.db_path) as conn:
-            cur = conn.execute(f"""
-                SELECT id, session_id, timestamp, type, payload, source
-                FROM session_events
-                WHERE session_id IN ({placeholders})
-                  AND timestamp LIKE ?
-                                ORDER BY COALESCE(event_index, 0) ASC, timestamp ASC
-            """, (*session_ids, f"{day}%"))
+    def get_daily_aggregate(self, user_id: str, day: str) -> dict:
+        """
+        Running snapshot for a user-day: a single primary-key read.
+        A day never touched since the table existed is built from the journal once.
+        """
+        with self._pool.reader() as conn:
+            aggregate = self._read_daily_aggregate(conn, user_id, day)
+        if aggregate is None:
+            with self._pool.writer() as conn:
+                aggregate = (
+                    self._read_daily_aggregate(conn, user_id, day)
+                    or self._rebuild_daily_aggregate(conn, user_id, day)
+                )
+        return {
+            "user_id": user_id,
+            "day": day,
+            "snapshot": aggregate["snapshot"],
+            "high_water_index": aggregate["high_water_index"],
+            "event_count": aggregate["event_count"],
+        }
 
-            return [
-                {
-                    "id": r[0],
-                    "session_id": r[1],
-                    "timestamp": r[2],
-                    "type": r[3],
-                    "payload": json.loads(r[4]),
-                    "source": r[5],
-                }
-                for r in cur.fetchall()
-            ]
+    def verify_daily_aggregate(self, user_id: str, day: str) -> dict:
+        """
+        Compare the stored running snapshot with build_daily_snapshot() over the
+        journal, as canonical JSON. Both reads share the writer transaction so
+        no append lands in between.
+        """
+        with self._pool.writer() as conn:
+            row = conn.execute(
+                "SELECT snapshot FROM daily_aggregates WHERE user_id = ? AND day = ?", (user_id, day)
+            ).fetchone()
+            batch = canonical_json(build_daily_snapshot(self._journal_for_user_day(conn, user_id, day)))
+        incremental = row[0] if row else None
+        return {
+            "user_id": user_id,
+            "day": day,
+            "match": incremental == batch,
+            "incremental": incremental,
+            "batch": batch,
+        }
+
+    def rebuild_daily_aggregates(self, user_id: Optional[str] = None) -> Dict[str, int]:
+        """
+        Rebuild every running snapshot (or one user's) from the journal, one day
+        per transaction. `mismatches` counts days whose stored snapshot was not
+        byte-identical to the rebuilt one.
+        """
+        with self._pool.reader() as conn:
+            if user_id is None:
+                cur = conn.execute("""
+                    SELECT DISTINCT user_id, day FROM session_events
+                    WHERE user_id IS NOT NULL AND day IS NOT NULL
+                    ORDER BY user_id, day
+                """)
+            else:
+                cur = conn.execute("""
+                    SELECT DISTINCT user_id, day FROM session_events
+                    WHERE user_id = ? AND day IS NOT NULL
+                    ORDER BY day
+                """, (user_id,))
+            days = cur.fetchall()
+        mismatches = 0
+        for uid, day in days:
+            with self._pool.writer() as conn:
+                row = conn.execute(
+                    "SELECT snapshot FROM daily_aggregates WHERE user_id = ? AND day = ?", (uid, day)
+                ).fetchone()
+                rebuilt = self._rebuild_daily_aggregate(conn, uid, day)
+                if row is not None and row[0] != canonical_json(rebuilt["snapshot"]):
+                    mismatches += 1
+        return {"days": len(days), "mismatches": mismatches}
+
+    def _read_daily_aggregate(self, conn: sqlite3.Connection, user_id: str, day: str) -> Optional[dict]:
+        row = conn.execute("""
+            SELECT snapshot, last_keys, high_water_index, event_count
+            FROM daily_aggregates
+            WHERE user_id = ? AND day = ?
+        """, (user_id, day)).fetchone()
+        if row is None:
+            return None
+        return {
+            "snapshot": json.loads(row[0]),
+            "last_keys": json.loads(row[1]),
+            "high_water_index": row[2],
+            "event_count": row[3],
+        }
+
+    def _write_daily_aggregate(self, conn: sqlite3.Connection, user_id: str, day: str, aggregate: dict) -> None:
+        conn.execute("""
+            INSERT INTO daily_aggregates (user_id, day, snapshot, last_keys, high_water_index, event_count)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, day) DO UPDATE SET
+                snapshot = excluded.snapshot,
+                last_keys = excluded.last_keys,
+                high_water_index = excluded.high_water_index,
+                event_count = excluded.event_count
+        """, (
+            user_id,
+            day,
+            canonical_json(aggregate["snapshot"]),
+            canonical_json(aggregate["last_keys"]),
+            aggregate["high_water_index"],
+            aggregate["event_count"],
+        ))
+
+    def _rebuild_daily_aggregate(self, conn: sqlite3.Connection, user_id: str, day: str) -> dict:
+        aggregate = {"snapshot": empty_snapshot(), "last_keys": {}, "high_water_index": None, "event_count": 0}
+        self._fold_records(aggregate, self._journal_for_user_day(conn, user_id, day))
+        self._write_daily_aggregate(conn, user_id, day, aggregate)
+        return aggregate
+
+    def _fold_daily_aggregate(
+        self, conn: sqlite3.Connection, user_id: str, day: str, records: List[EventRecord]
+    ) -> None:
+        # Inside the append transaction, after `records` were inserted
+        aggregate = self._read_daily_aggregate(conn, user_id, day)
+        if aggregate is None:
+            # First touch of the day; the journal read already includes `records`
+            self._rebuild_daily_aggregate(conn, user_id, day)
+            return
+        self._fold_records(aggregate, records)
+        self._write_daily_aggregate(conn, user_id, day, aggregate)
+
+    @staticmethod
+    def _fold_records(aggregate: dict, records: Iterator[EventRecord]) -> None:
+        """
+        Fold records (in append order) into a running aggregate. A last-value
+        field only moves forward in (event_index, timestamp) order, the order
+        the batch read uses, so the result does not depend on arrival order.
+        """
+        snapshot = aggregate["snapshot"]
+        last_keys = aggregate["last_keys"]
+        high_water = aggregate["high_water_index"]
+        for record in records:
+            latest = True
+            if record.type in LAST_VALUE_TYPES:
+                # NULL indices sort first in the batch read
+                key = [-1 if record.event_index is None else record.event_index, record.timestamp]
+                previous = last_keys.get(record.type)
+                # Ties go to the later append, as rowid does in the batch read
+                latest = previous is None or key >= previous
+                if latest:
+                    last_keys[record.type] = key
+            fold_event(snapshot, record, latest=latest)
+            if record.event_index is not None and (high_water is None or record.event_index > high_water):
+                high_water = record.event_index
+            aggregate["event_count"] += 1
+        aggregate["high_water_index"] = high_water
+
+    # ----------------------------
+    # Daily update state (watermark + input digest)
+    # ----------------------------
+
+    def get_daily_update_state(self, user_id: str, day: str) -> Optional[dict]:
+        with self._pool.reader() as conn:
+            row = conn.execute("""
+                SELECT event_count, high_water_index, input_digest, result, updated_at
+                FROM daily_update_state
+                WHERE user_id = ? AND day = ?
+            """, (user_id, day)).fetchone()
+        if row is None:
+            return None
+        return {
+            "event_count": row[0],
+            "high_water_index": row[1],
+            "input_digest": row[2],
+            "result": row[3],
+            "updated_at": row[4],
+        }
+
+    def put_daily_update_state(
+        self,
+        user_id: str,
+        day: str,
+        event_count: int,
+        high_water_index: Optional[int],
+        input_digest: str,
+        result: str,
+    ) -> None:
+        self._ensure_providers()
+        with self._pool.writer() as conn:
+            self._put_daily_update_state(conn, user_id, day, event_count, high_water_index, input_digest, result)
+
+    def _put_daily_update_state(
+        self,
+        conn: sqlite3.Connection,
+        user_id: str,
+        day: str,
+        event_count: int,
+        high_water_index: Optional[int],
+        input_digest: str,
+        result: str,
+    ) -> None:
+        updated_at = self._time_provider.now().isoformat()
+        conn.execute("""
+            INSERT INTO daily_update_state (
+                user_id, day, event_count, high_water_index, input_digest, result, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, day) DO UPDATE SET
+                event_count = excluded.event_count,
+                high_water_index = excluded.high_water_index,
+                input_digest = excluded.input_digest,
+                result = excluded.result,
+                updated_at = excluded.updated_at
+        """, (user_id, day, event_count, high_water_index, input_digest, result, updated_at))
+
+    def save_daily_updates(
+        self,
+        updates: List[dict],
+        checkpoint: Optional[str] = None,
+        checkpoint_users: Sequence[str] = (),
+    ) -> None:
+        """
+        Write computed daily updates in one transaction: per update the day's
+        snapshot, the avatar state and the daily update state. Each update has
+        user_id, day, snapshot, avatar_state, event_count, high_water_index,
+        input_digest and result (JSON text). With `checkpoint`, users in
+        checkpoint_users are marked done for that job in the same transaction.
+        """
+        self._ensure_providers()
+        with self._pool.writer() as conn:
+            for update in updates:
+                user_id, day = update["user_id"], update["day"]
+                self._upsert_daily_snapshot(conn, user_id, day, update["snapshot"], "v1")
+                self._upsert_avatar_state(conn, user_id, json.dumps(update["avatar_state"]), "v1")
+                self._put_daily_update_state(
+                    conn,
+                    user_id,
+                    day,
+                    update["event_count"],
+                    update["high_water_index"],
+                    update["input_digest"],
+                    update["result"],
+                )
+            if checkpoint is not None and checkpoint_users:
+                completed_at = self._time_provider.now().isoformat()
+                conn.executemany("""
+                    INSERT OR REPLACE INTO batch_checkpoints (job, user_id, completed_at)
+                    VALUES (?, ?, ?)
+                """, [(checkpoint, user_id, completed_at) for user_id in checkpoint_users])
+
+    # ----------------------------
+    # Batch jobs
+    # ----------------------------
+
+    def list_active_users(self, day: str) -> List[str]:
+        """Users with at least one journal event on a UTC day, in user_id order."""
+        with self._pool.reader() as conn:
+            cur = conn.execute("""
+                SELECT DISTINCT user_id FROM session_events
+                WHERE day = ? AND user_id IS NOT NULL
+                ORDER BY user_id
+            """, (day,))
+            return [row[0] for row in cur.fetchall()]
+
+    def get_batch_checkpoint(self, job: str) -> Set[str]:
+        """Users already completed by a batch job."""
+        with self._pool.reader() as conn:
+            cur = conn.execute("SELECT user_id FROM batch_checkpoints WHERE job = ?", (job,))
+            return {row[0] for row in cur.fetchall()}
+
+    def clear_batch_checkpoint(self, job: str) -> int:
+        with self._pool.writer() as conn:
+            return conn.execute("DELETE FROM batch_checkpoints WHERE job = ?", (job,)).rowcount
+
+    # ----------------------------
+    # Full-history rebuild (shadow tables + atomic swap)
+    # ----------------------------
+
+    def list_user_ids(self) -> List[str]:
+        """Every user with journal events or stored daily snapshots, in user_id order."""
+        with self._pool.reader() as conn:
+            cur = conn.execute("""
+                SELECT user_id FROM session_events WHERE user_id IS NOT NULL
+                UNION
+                SELECT user_id FROM daily_snapshots
+                ORDER BY user_id
+            """)
+            return [row[0] for row in cur.fetchall()]
+
+    def list_user_days(self, user_id: str) -> List[str]:
+        """UTC days on which a user has journal events or a stored daily snapshot, oldest first."""
+        with self._pool.reader() as conn:
+            cur = conn.execute("""
+                SELECT day FROM session_events WHERE user_id = ? AND day IS NOT NULL
+                UNION
+                SELECT day FROM daily_snapshots WHERE user_id = ?
+                ORDER BY day
+            """, (user_id, user_id))
+            return [row[0] for row in cur.fetchall()]
+
+    def begin_history_rebuild(self) -> None:
+        """
+        (Re)create empty shadow tables; leftovers of an interrupted rebuild are
+        discarded. From here until the swap, triggers record the user of every
+        write to the live history tables, so swap_rebuilt_history() can refuse
+        a stale stage and take_history_rebuild_writes() can name who to restage.
+        """
+        with self._pool.writer() as conn:
+            self._drop_history_rebuild(conn)
+            conn.execute("CREATE TABLE history_rebuild_writes (user_id TEXT PRIMARY KEY)")
+            for table in REBUILD_WATCHED_TABLES:
+                for op, rows in (("INSERT", ("NEW",)), ("UPDATE", ("OLD", "NEW")), ("DELETE", ("OLD",))):
+                    # Journal rows without a user are not part of any user's replay
+                    marks = "".join(
+                        f"""
+                            INSERT OR IGNORE INTO history_rebuild_writes (user_id)
+                            SELECT {row}.user_id WHERE {row}.user_id IS NOT NULL;"""
+                        for row in rows
+                    )
+                    conn.execute(f"""
+                        CREATE TRIGGER history_rebuild_{table}_{op.lower()}
+                        AFTER {op} ON {table}
+                        BEGIN{marks}
+                        END
+                    """)
+            # Same columns as the live tables; the unique index is built at swap time
+            conn.execute("""
+                CREATE TABLE daily_snapshots_rebuild (
+                    id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    snapshot TEXT NOT NULL,
+                    version TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE avatar_state_rebuild (
+                    user_id TEXT PRIMARY KEY,
+                    updated_at TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    version TEXT NOT NULL
+                )
+            """)
+            # Identities live outside the database; staged here and promoted after the swap
+            conn.execute("""
+                CREATE TABLE identity_rebuild (
+                    user_id TEXT PRIMARY KEY,
+                    identity TEXT NOT NULL
+                )
+            """)
+
+    def write_rebuilt_user(
+        self,
+        user_id: str,
+        snapshots: Sequence[Tuple[str, dict]],
+        avatar_state: Optional[dict],
+        identity: Optional[dict],
+        version: str = "v1",
+    ) -> None:
+        """
+        Stage one user's rebuilt history in the shadow tables (one transaction),
+        replacing whatever was staged for them before.
+        Days that already have a live snapshot keep its id and created_at.
+        """
+        self._ensure_providers()
+        now = self._time_provider.now().isoformat()
+        with self._pool.writer() as conn:
+            for table in ("daily_snapshots_rebuild", "avatar_state_rebuild", "identity_rebuild"):
+                conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+            conn.executemany("""
+                INSERT INTO daily_snapshots_rebuild (id, user_id, day, created_at, snapshot, version)
+                SELECT COALESCE(live.id, ?), ?, ?, COALESCE(live.created_at, ?), ?, ?
+                FROM (SELECT 1) LEFT JOIN daily_snapshots AS live
+                    ON live.user_id = ? AND live.day = ?
+            """, [
+                (f"snap_{self._id_provider.new_id()}", user_id, day, now, json.dumps(snapshot), version, user_id, day)
+                for day, snapshot in snapshots
+            ])
+            if avatar_state is not None:
+                conn.execute("""
+                    INSERT INTO avatar_state_rebuild (user_id, updated_at, state, version)
+                    VALUES (?, ?, ?, ?)
+                """, (user_id, now, json.dumps(avatar_state), version))
+            if identity is not None:
+                conn.execute(
+                    "INSERT INTO identity_rebuild (user_id, identity) VALUES (?, ?)",
+                    (user_id, json.dumps(identity)),
+                )
+
+    def take_history_rebuild_writes(self) -> List[str]:
+        """
+        Users whose live history was written since the rebuild started or since
+        the last call, in user_id order; they need to be staged again.
+        """
+        with self._pool.writer() as conn:
+            rows = conn.execute("SELECT user_id FROM history_rebuild_writes ORDER BY user_id").fetchall()
+            conn.execute("DELETE FROM history_rebuild_writes")
+        return [row[0] for row in rows]
+
+    def swap_rebuilt_history(self) -> Dict[str, int]:
+        """
+        Replace daily_snapshots and avatar_state with their shadow tables in
+        one transaction. Stored daily update results, user stats and daily
+        batch checkpoints were computed from the old history and are cleared.
+
+        Raises HistoryRebuildConflict, leaving the live tables untouched, if
+        the journal, a daily snapshot or an avatar state was written since it
+        was staged: the stage would silently drop that write. Restage the users
+        from take_history_rebuild_writes() and try again.
+        """
+        with self._pool.writer() as conn:
+            users = conn.execute("SELECT COUNT(*) FROM history_rebuild_writes").fetchone()[0]
+            if users:
+                raise HistoryRebuildConflict(
+                    f"live history of {users} user(s) written since it was staged"
+                )
+            self._drop_rebuild_watch(conn)
+            conn.execute("DROP TABLE daily_snapshots")
+            conn.execute("ALTER TABLE daily_snapshots_rebuild RENAME TO daily_snapshots")
+            conn.execute("""
+                CREATE UNIQUE INDEX idx_daily_snapshots_user_day
+                ON daily_snapshots (user_id, day)
+            """)
+            conn.execute("DROP TABLE avatar_state")
+            conn.execute("ALTER TABLE avatar_state_rebuild RENAME TO avatar_state")
+            conn.execute("DELETE FROM daily_update_state")
+            conn.execute("DELETE FROM user_stats")
+            conn.execute("DELETE FROM batch_checkpoints WHERE job LIKE 'daily_update:%'")
+            snapshots = conn.execute("SELECT COUNT(*) FROM daily_snapshots").fetchone()[0]
+            avatars = conn.execute("SELECT COUNT(*) FROM avatar_state").fetchone()[0]
+        return {"daily_snapshots": snapshots, "avatar_states": avatars}
+
+    def iter_rebuilt_identities(self, batch_size: int = 256) -> Iterator[Tuple[str, dict]]:
+        """Staged identities in user_id order, one page at a time."""
+        after = ""
+        while True:
+            with self._pool.reader() as conn:
+                rows = conn.execute("""
+                    SELECT user_id, identity FROM identity_rebuild
+                    WHERE user_id > ?
+                    ORDER BY user_id
+                    LIMIT ?
+                """, (after, batch_size)).fetchall()
+            for user_id, identity_json in rows:
+                yield user_id, json.loads(identity_json)
+            if len(rows) < batch_size:
+                return
+            after = rows[-1][0]
+
+    def finish_history_rebuild(self) -> None:
+        """Drop staged identities once they are promoted."""
+        with self._pool.writer() as conn:
+            conn.execute("DROP TABLE IF EXISTS identity_rebuild")
+
+    def abort_history_rebuild(self) -> None:
+        """Discard a staged rebuild and stop watching the live tables."""
+        with self._pool.writer() as conn:
+            self._drop_history_rebuild(conn)
+
+    def _drop_history_rebuild(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DROP TABLE IF EXISTS daily_snapshots_rebuild")
+        conn.execute("DROP TABLE IF EXISTS avatar_state_rebuild")
+        conn.execute("DROP TABLE IF EXISTS identity_rebuild")
+        self._drop_rebuild_watch(conn)
+
+    def _drop_rebuild_watch(self, conn: sqlite3.Connection) -> None:
+        for table in REBUILD_WATCHED_TABLES:
+            for op in ("insert", "update", "delete"):
+                conn.execute(f"DROP TRIGGER IF EXISTS history_rebuild_{table}_{op}")
+        conn.execute("DROP TABLE IF EXISTS history_rebuild_writes")
 
     # ----------------------------
     # Avatar state (C.3)
     # ----------------------------
 
     def get_avatar_state(self, user_id: str) -> Optional[dict]:
-        with sqlite3.connect(self.db_path) as conn:
+        with self._pool.reader() as conn:
             cur = conn.execute("""
                 SELECT user_id, updated_at, state, version
                 FROM avatar_state
@@ -355,15 +1506,68 @@ class SessionRepository:
             }
 
     def upsert_avatar_state(self, user_id: str, state: dict, version: str = "v1") -> None:
+        with self._pool.writer() as conn:
+            self._upsert_avatar_state(conn, user_id, json.dumps(state), version)
+
+    def _upsert_avatar_state(self, conn: sqlite3.Connection, user_id: str, state_json: str, version: str) -> None:
         updated_at = self._time_provider.now().isoformat()
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                INSERT OR REPLACE INTO avatar_state (user_id, updated_at, state, version)
-                VALUES (?, ?, ?, ?)
-            """, (
-                user_id,
-                updated_at,
-                json.dumps(state),
-                version
-            ))
+        conn.execute("""
+            INSERT OR REPLACE INTO avatar_state (user_id, updated_at, state, version)
+            VALUES (?, ?, ?, ?)
+        """, (
+            user_id,
+            updated_at,
+            state_json,
+            version
+        ))
+        self._publish_notice(user_id, "avatar_state", lambda: {"state": json.loads(state_json)})
+
+    # ----------------------------
+    # Pipeline output cache
+    # ----------------------------
+
+    def get_pipeline_output(self, version: str, input_hash: str) -> Optional[str]:
+        with self._pool.reader() as conn:
+            cur = conn.execute(
+                "SELECT output FROM pipeline_cache WHERE version = ? AND input_hash = ?",
+                (version, input_hash)
+            )
+            row = cur.fetchone()
+            return row[0] if row else None
+
+    def put_pipeline_output(self, version: str, input_hash: str, output: str, max_rows: int = 10000) -> None:
+        with self._pool.writer() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pipeline_cache (version, input_hash, output) VALUES (?, ?, ?)",
+                (version, input_hash, output)
+            )
+            # Oldest rows fall off first (rowid follows insertion order)
+            conn.execute(
+                "DELETE FROM pipeline_cache WHERE rowid <= (SELECT MAX(rowid) FROM pipeline_cache) - ?",
+                (max_rows,)
+            )
 
+    def purge_pipeline_outputs(self, keep_version: str) -> int:
+        with self._pool.writer() as conn:
+            cur = conn.execute("DELETE FROM pipeline_cache WHERE version != ?", (keep_version,))
+            return cur.rowcount
+
+    # ----------------------------
+    # Rendered SSE frames
+    # ----------------------------
+
+    def get_rendered_frames(self, session_id: str, frame_format: str) -> Optional[Tuple[bytes, str]]:
+        with self._pool.reader() as conn:
+            cur = conn.execute(
+                "SELECT body, offsets FROM session_frames WHERE session_id = ? AND format = ?",
+                (session_id, frame_format)
+            )
+            row = cur.fetchone()
+            return (row[0], row[1]) if row else None
+
+    def put_rendered_frames(self, session_id: str, frame_format: str, body: bytes, offsets: str) -> None:
+        with self._pool.writer() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO session_frames (session_id, format, body, offsets) VALUES (?, ?, ?, ?)",
+                (session_id, frame_format, sqlite3.Binary(body), offsets)
+            )
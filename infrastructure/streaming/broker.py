@@ -0,0 +1,163 @@
+"""
+In-process pub/sub broker for live journal events.
+
+The repository publishes every committed journal event; SSE streams
+subscribe per channel ("session:<id>", or "user:<id>" for everything that
+happens to one user) and receive events on their own event loop. publish() is thread-safe and never blocks: writes happen on
+worker threads, delivery is scheduled onto each subscriber's loop.
+
+Settings:
+  REFLECTO_STREAM_QUEUE_SIZE   max undelivered events per subscriber (default 1000)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+
+def session_channel(session_id: str) -> str:
+    return f"session:{session_id}"
+
+
+def user_channel(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+@dataclass(frozen=True)
+class Notice:
+    """A non-journal update (daily snapshot, avatar state) shaped like an event."""
+
+    type: str
+    payload: dict
+    session_id: Optional[str] = None
+    event_index: Optional[int] = None
+
+
+class Subscription:
+    """One subscriber's view of a channel. Use from the loop that created it."""
+
+    def __init__(
+        self,
+        broker: "EventBroker",
+        channel: str,
+        loop: asyncio.AbstractEventLoop,
+        maxsize: int,
+        accept: Optional[Callable[[Any], bool]] = None,
+    ):
+        self.channel = channel
+        self.accept = accept
+        self.overflowed = False
+        self.closed = False
+        self._broker = broker
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def _deliver(self, item: Any) -> None:
+        # Runs on the subscriber's loop
+        if self.closed:
+            return
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Too far behind: cut the subscriber loose rather than buffer forever
+            self.overflowed = True
+            self.close()
+
+    def _push(self, item: Any) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, item)
+        except RuntimeError:
+            # Subscriber's loop already closed
+            self.close()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Next published item, or None on timeout / once closed and drained."""
+        if self.closed and self._queue.empty():
+            return None
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._broker._unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class EventBroker:
+    def __init__(self, queue_size: int = 1000):
+        self.queue_size = queue_size
+        self._channels: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"published": 0, "delivered": 0, "subscriptions": 0}
+
+    @classmethod
+    def from_env(cls) -> "EventBroker":
+        return cls(queue_size=int(os.getenv("REFLECTO_STREAM_QUEUE_SIZE", "1000")))
+
+    def subscribe(self, channel: str, accept: Optional[Callable[[Any], bool]] = None) -> Subscription:
+        """
+        Subscribe the running event loop to a channel. accept, if given, is
+        evaluated on the publishing thread; rejected items are never queued.
+        """
+        sub = Subscription(self, channel, asyncio.get_running_loop(), self.queue_size, accept)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(sub)
+            self._stats["subscriptions"] += 1
+        return sub
+
+    def _unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._channels.get(sub.channel)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._channels[sub.channel]
+
+    def has_subscribers(self, channel: str) -> bool:
+        return channel in self._channels
+
+    def publish(self, channel: str, items: Iterable[Any]) -> None:
+        """Fan items out to every subscriber of channel, in order."""
+        items = list(items)
+        with self._lock:
+            subs: List[Subscription] = list(self._channels.get(channel, ()))
+            self._stats["published"] += len(items)
+        delivered = 0
+        for sub in subs:
+            for item in items:
+                if sub.accept is None or sub.accept(item):
+                    sub._push(item)
+                    delivered += 1
+        with self._lock:
+            self._stats["delivered"] += delivered
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            out = dict(self._stats)
+            out["channels"] = len(self._channels)
+            out["subscribers"] = sum(len(s) for s in self._channels.values())
+        return out
+
+
+_broker: Optional[EventBroker] = None
+_broker_lock = threading.Lock()
+
+
+def get_event_broker() -> EventBroker:
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = EventBroker.from_env()
+        return _broker
@@ -0,0 +1,226 @@
+"""
+Connection management for SSE responses.
+
+Every SSE response is wrapped by StreamRegistry.guard(), which:
+  - sends a comment heartbeat when no frame has gone out for a while, so
+    proxies and load balancers keep idle streams open
+  - pumps frames from the source into a per-client buffer and tracks its
+    size in bytes; a client that lets the buffer grow past the limit is
+    disconnected (it is not reading, and the journal can be resumed with
+    Last-Event-ID anyway)
+  - registers the stream so drain() can close every open stream on
+    shutdown: sources stop, buffered frames are flushed, and anything still
+    open at the deadline is cut off, cancelling a response stuck sending to
+    a client that stopped reading
+
+The app starts the drain from the server's exit signal (start_drain()), not
+from lifespan shutdown: servers only reach lifespan shutdown once every
+connection has closed, which an open SSE stream never does by itself.
+
+Settings:
+  REFLECTO_STREAM_HEARTBEAT_SECONDS   idle time before a heartbeat (default 15, 0 disables)
+  REFLECTO_STREAM_MAX_BUFFER_BYTES    per-client unsent bytes before disconnect (default 1 MiB)
+  REFLECTO_STREAM_DRAIN_SECONDS       shutdown deadline for open streams (default 10)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from typing import AsyncIterator, Dict, Optional, Set, Union
+
+HEARTBEAT = ": keepalive\n\n"
+
+_END = object()
+
+Frame = Union[str, bytes]
+
+
+def _frame_size(frame: Frame) -> int:
+    # Bytes on the wire: str frames are sent UTF-8 encoded
+    return len(frame.encode("utf-8")) if isinstance(frame, str) else len(frame)
+
+
+class _StreamState:
+    __slots__ = ("queue", "buffered", "abort", "error", "task", "closed", "consumer", "sending")
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.buffered = 0
+        self.abort = False
+        self.error: Optional[BaseException] = None
+        self.task: Optional[asyncio.Task] = None
+        self.closed = asyncio.Event()
+        # The response task iterating guard(), and whether it is out sending a frame
+        self.consumer: Optional[asyncio.Task] = None
+        self.sending = False
+
+
+class StreamRegistry:
+    def __init__(
+        self,
+        heartbeat_seconds: float = 15.0,
+        max_buffer_bytes: int = 1024 * 1024,
+        drain_seconds: float = 10.0,
+    ):
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_buffer_bytes = max_buffer_bytes
+        self.drain_seconds = drain_seconds
+        self._open: Set[_StreamState] = set()
+        self._draining = False
+        self._drain_task: Optional[asyncio.Future] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "opened": 0,
+            "closed": 0,
+            "heartbeats": 0,
+            "slow_disconnects": 0,
+            "drained": 0,
+            "forced_closes": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "StreamRegistry":
+        return cls(
+            heartbeat_seconds=float(os.getenv("REFLECTO_STREAM_HEARTBEAT_SECONDS", "15")),
+            max_buffer_bytes=int(os.getenv("REFLECTO_STREAM_MAX_BUFFER_BYTES", str(1024 * 1024))),
+            drain_seconds=float(os.getenv("REFLECTO_STREAM_DRAIN_SECONDS", "10")),
+        )
+
+    @property
+    def draining(self) -> bool:
+        return self._draining
+
+    def reopen(self) -> None:
+        """Accept streams again (app startup)."""
+        self._draining = False
+        self._drain_task = None
+
+    def start_drain(self) -> "asyncio.Future[Dict[str, int]]":
+        """
+        Start drain() in the background, once: an exit signal starts it and
+        lifespan shutdown awaits the same drain. Must run on the event loop.
+        """
+        if self._drain_task is None:
+            self._drain_task = asyncio.ensure_future(self.drain())
+        return self._drain_task
+
+    def _bump(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += n
+
+    async def _pump(self, source: AsyncIterator[Frame], state: _StreamState) -> None:
+        try:
+            async for frame in source:
+                size = _frame_size(frame)
+                # A single oversized frame is fine; a backlog is not
+                if state.buffered and state.buffered + size > self.max_buffer_bytes:
+                    state.abort = True
+                    self._bump("slow_disconnects")
+                    return
+                state.buffered += size
+                state.queue.put_nowait((frame, size))
+        except Exception as exc:
+            # Re-raised by the consumer, in the response task
+            state.error = exc
+        finally:
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            state.queue.put_nowait(_END)
+
+    async def guard(self, source: AsyncIterator[Frame]) -> AsyncIterator[Frame]:
+        """Wrap an SSE frame iterator with heartbeats, backpressure and drain."""
+        if self._draining:
+            return
+        state = _StreamState()
+        self._open.add(state)
+        self._bump("opened")
+        state.task = asyncio.ensure_future(self._pump(source, state))
+        state.consumer = asyncio.current_task()
+        timeout = self.heartbeat_seconds or None
+        try:
+            while not state.abort:
+                try:
+                    item = await asyncio.wait_for(state.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    self._bump("heartbeats")
+                    state.sending = True
+                    yield HEARTBEAT
+                    state.sending = False
+                    continue
+                if item is _END and state.error is not None:
+                    raise state.error
+                if item is _END or state.abort:
+                    return
+                frame, size = item
+                state.buffered -= size
+                state.sending = True
+                yield frame
+                state.sending = False
+        finally:
+            if not state.task.done():
+                state.task.cancel()
+            try:
+                await state.task
+            except asyncio.CancelledError:
+                pass
+            self._open.discard(state)
+            self._bump("closed")
+            state.closed.set()
+
+    async def drain(self, timeout: Optional[float] = None) -> Dict[str, int]:
+        """
+        Stop accepting streams, stop every source, let buffered frames flush,
+        and cut off whatever is still open after `timeout` seconds.
+        """
+        self._draining = True
+        states = list(self._open)
+        for state in states:
+            if state.task is not None and not state.task.done():
+                state.task.cancel()
+        if not states:
+            return {"drained": 0, "forced": 0}
+
+        deadline = self.drain_seconds if timeout is None else timeout
+        waits = [asyncio.ensure_future(state.closed.wait()) for state in states]
+        _, pending = await asyncio.wait(waits, timeout=deadline)
+        for w in pending:
+            w.cancel()
+        forced = 0
+        for state in states:
+            if not state.closed.is_set():
+                state.abort = True
+                state.queue.put_nowait(_END)
+                # Suspended at a yield: the response is blocked in send() to a
+                # client that stopped reading, and will never come back for _END
+                consumer = state.consumer
+                if state.sending and consumer is not None and consumer is not asyncio.current_task():
+                    consumer.cancel()
+                forced += 1
+        self._bump("drained", len(states) - forced)
+        self._bump("forced_closes", forced)
+        return {"drained": len(states) - forced, "forced": forced}
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            out: Dict[str, object] = dict(self._stats)
+        out["open"] = len(self._open)
+        out["buffered_bytes"] = sum(state.buffered for state in list(self._open))
+        out["draining"] = self._draining
+        out["heartbeat_seconds"] = self.heartbeat_seconds
+        out["max_buffer_bytes"] = self.max_buffer_bytes
+        return out
+
+
+_registry: Optional[StreamRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_stream_registry() -> StreamRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = StreamRegistry.from_env()
+        return _registry
@@ -0,0 +1,196 @@
+"""
+Rendered SSE frame cache for completed sessions.
+
+A session's journal never changes once its 'done' event is written, so the
+SSE frames for it are rendered once and kept as a single UTF-8 body plus the
+byte offset of every event. A full replay is one bytes write; a resumed
+replay (Last-Event-ID) is a slice of the same body.
+
+Bodies live in an in-process LRU bounded by total bytes and, optionally, in
+a SQLite blob column shared by every worker on the same database.
+
+Settings:
+  REFLECTO_SSE_FRAME_CACHE_BYTES    in-process byte budget (default 32 MiB, 0 disables)
+  REFLECTO_SSE_FRAME_CACHE_SQLITE   "1" enables the SQLite tier
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+from infrastructure.persistence.session_repository import SessionRepository
+
+# Bump whenever sse() output changes so stale SQLite bodies are ignored
+FRAME_FORMAT = "sse-v2"
+
+
+@dataclass(frozen=True)
+class RenderedSession:
+    body: bytes
+    indices: Tuple[int, ...]
+    offsets: Tuple[int, ...]
+
+    @classmethod
+    def from_frames(cls, frames: Sequence[Tuple[int, str]]) -> "RenderedSession":
+        indices, offsets, parts = [], [], []
+        position = 0
+        for event_index, frame in frames:
+            encoded = frame.encode("utf-8")
+            indices.append(event_index)
+            offsets.append(position)
+            parts.append(encoded)
+            position += len(encoded)
+        return cls(b"".join(parts), tuple(indices), tuple(offsets))
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.body)
+
+    def body_after(self, after_index: Optional[int] = None) -> bytes:
+        """Frames for events with event_index > after_index, as one body."""
+        if after_index is None:
+            return self.body
+        pos = bisect.bisect_right(self.indices, after_index)
+        if pos >= len(self.offsets):
+            return b""
+        return self.body[self.offsets[pos]:]
+
+    def frames(self, after_index: Optional[int] = None) -> Iterator[str]:
+        start = 0 if after_index is None else bisect.bisect_right(self.indices, after_index)
+        ends = self.offsets[1:] + (len(self.body),)
+        for pos in range(start, len(self.offsets)):
+            yield self.body[self.offsets[pos]:ends[pos]].decode("utf-8")
+
+
+def _cache_key(repo: SessionRepository, session_id: str) -> Tuple[str, str]:
+    db = repo.db_path if repo.db_path == ":memory:" else os.path.abspath(repo.db_path)
+    return db, session_id
+
+
+class FrameCache:
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, sqlite_enabled: bool = False):
+        self.max_bytes = max_bytes
+        self.sqlite_enabled = sqlite_enabled
+        self._entries: "OrderedDict[Tuple[str, str], RenderedSession]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "sqlite_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "FrameCache":
+        return cls(
+            max_bytes=int(os.getenv("REFLECTO_SSE_FRAME_CACHE_BYTES", str(32 * 1024 * 1024))),
+            sqlite_enabled=os.getenv("REFLECTO_SSE_FRAME_CACHE_SQLITE") == "1",
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 or self.sqlite_enabled
+
+    def lookup(self, repo: SessionRepository, session_id: str) -> Optional[RenderedSession]:
+        """Memory tier only; never touches the database."""
+        if self.max_bytes <= 0:
+            return None
+        key = _cache_key(repo, session_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["memory_hits"] += 1
+            return entry
+
+    def load(self, repo: SessionRepository, session_id: str) -> Optional[RenderedSession]:
+        """SQLite tier (blocking); promotes hits into memory. Counts a miss otherwise."""
+        if self.sqlite_enabled:
+            stored = repo.get_rendered_frames(session_id, FRAME_FORMAT)
+            if stored is not None:
+                body, offsets_json = stored
+                indices, offsets = json.loads(offsets_json)
+                entry = RenderedSession(bytes(body), tuple(indices), tuple(offsets))
+                with self._lock:
+                    self._stats["sqlite_hits"] += 1
+                    self._remember(_cache_key(repo, session_id), entry)
+                return entry
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def get(self, repo: SessionRepository, session_id: str) -> Optional[RenderedSession]:
+        if not self.enabled:
+            return None
+        return self.lookup(repo, session_id) or self.load(repo, session_id)
+
+    def put(self, repo: SessionRepository, session_id: str, entry: RenderedSession) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._stats["stores"] += 1
+            self._remember(_cache_key(repo, session_id), entry)
+        if self.sqlite_enabled:
+            repo.put_rendered_frames(
+                session_id,
+                FRAME_FORMAT,
+                entry.body,
+                json.dumps([entry.indices, entry.offsets], separators=(",", ":")),
+            )
+
+    def _remember(self, key: Tuple[str, str], entry: RenderedSession) -> None:
+        # Caller holds the lock
+        if entry.nbytes > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.nbytes
+        self._entries[key] = entry
+        self._bytes += entry.nbytes
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            out: Dict[str, object] = dict(self._stats)
+            out["entries"] = len(self._entries)
+            out["bytes"] = self._bytes
+        lookups = out["memory_hits"] + out["sqlite_hits"] + out["misses"]
+        out["hit_ratio"] = (out["memory_hits"] + out["sqlite_hits"]) / lookups if lookups else 0.0
+        out["max_bytes"] = self.max_bytes
+        out["sqlite_enabled"] = self.sqlite_enabled
+        return out
+
+
+_frame_cache: Optional[FrameCache] = None
+_frame_cache_lock = threading.Lock()
+
+
+def get_frame_cache() -> FrameCache:
+    global _frame_cache
+    with _frame_cache_lock:
+        if _frame_cache is None:
+            _frame_cache = FrameCache.from_env()
+        return _frame_cache
+
+
+def reset_frame_cache() -> None:
+    """Drop the process-wide cache; the next access re-reads settings."""
+    global _frame_cache
+    with _frame_cache_lock:
+        _frame_cache = None
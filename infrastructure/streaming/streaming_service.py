@@ -1,41 +1,297 @@
-
+import asyncio
 import json
-from typing import AsyncIterator, Iterator, Optional
+import os
+from contextlib import aclosing
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Tuple, Union
 from infrastructure.persistence.session_repository import SessionRepository
+from infrastructure.streaming.broker import session_channel, user_channel
+from infrastructure.streaming.frame_cache import RenderedSession, get_frame_cache
 
 # Helper: format SSE event
-def sse(event_type: str, payload: dict) -> str:
+def sse(event_type: str, payload: dict, event_id: Optional[int] = None, retry_ms: Optional[int] = None) -> str:
+    """
+    Format one SSE frame. event_id (the journal event_index) becomes the
+    frame's `id:`, which EventSource echoes back as Last-Event-ID on reconnect.
+    """
+    head = f"retry: {retry_ms}\n" if retry_ms else ""
+    head += f"event: {event_type}\n"
+    if event_id is not None:
+        head += f"id: {event_id}\n"
     if event_type == "done" and "session_id" in payload:
-        return (
-            f"event: done\n"
-            f'data: {{ "session_id": "{payload["session_id"]}" }}\n\n'
-        )
-    return f"event: {event_type}\ndata: {json.dumps(payload, sort_keys=True)}\n\n"
+        return head + f'data: {{ "session_id": "{payload["session_id"]}" }}\n\n'
+    return head + f"data: {json.dumps(payload, sort_keys=True)}\n\n"
+
+
+def _retry_ms() -> int:
+    # Reconnect delay hinted to clients on the first frame (0 disables)
+    return int(os.getenv("REFLECTO_STREAM_RETRY_MS", "3000"))
+
+
+def _idle_timeout() -> float:
+    # How long a live stream waits for the next event before ending
+    return float(os.getenv("REFLECTO_STREAM_IDLE_TIMEOUT", "30"))
+
+
+def _user_idle_timeout() -> float:
+    # User channels are long-lived; EventSource reconnects after this
+    return float(os.getenv("REFLECTO_USER_STREAM_IDLE_TIMEOUT", "300"))
+
+
+def _chunk_size() -> int:
+    # Journal rows read per off-loop query; bounds each stream's buffer
+    return max(1, int(os.getenv("REFLECTO_STREAM_CHUNK_SIZE", "256")))
+
+
+class _FrameRecorder:
+    """Collects a full stream's frames so a completed session is rendered once."""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._frames: List[Tuple[int, str]] = []
+
+    def add(self, event_index: Optional[int], frame: str) -> None:
+        if not self.enabled:
+            return
+        if event_index is None:
+            # Legacy rows without an index cannot be resumed from a slice
+            self.enabled = False
+            self._frames = []
+            return
+        self._frames.append((event_index, frame))
+
+    def rendered(self) -> Optional[RenderedSession]:
+        return RenderedSession.from_frames(self._frames) if self.enabled and self._frames else None
+
 
 class _SessionEventStream:
-    def __init__(self, session_id: str, repo: SessionRepository):
+    def __init__(
+        self,
+        session_id: str,
+        repo: SessionRepository,
+        idle_timeout: Optional[float] = None,
+        after_index: Optional[int] = None,
+    ):
         self._session_id = session_id
         self._repo = repo
+        self._idle_timeout = _idle_timeout() if idle_timeout is None else idle_timeout
+        self._after_index = after_index
+        self._retry_ms = _retry_ms()
+        self._chunk_size = _chunk_size()
+        self._cache = get_frame_cache()
 
-    def __iter__(self) -> Iterator[str]:
+    def _retry_line(self) -> str:
+        return f"retry: {self._retry_ms}\n" if self._retry_ms else ""
+
+    def _recorder(self) -> _FrameRecorder:
+        # Only a stream that starts at the beginning sees every frame
+        return _FrameRecorder(self._cache.enabled and self._after_index is None)
+
+    def _replay(self) -> Iterator:
+        return self._repo.iter_events(self._session_id, after_index=self._after_index)
+
+    def _already_done(self) -> bool:
+        # A client resuming after 'done' gets an empty, immediately closed stream
+        if self._after_index is None:
+            return False
+        page = self._repo.read_events_after(self._session_id, self._after_index - 1, limit=1)
+        return bool(page) and page[0].type == "done"
+
+    def _read_page(self, after_index: Optional[int]) -> List:
+        return self._repo.read_events_after(self._session_id, after_index, limit=self._chunk_size)
+
+    async def _replay_pages(self) -> AsyncIterator[List]:
+        """
+        Journal pages read off the event loop. The next page is fetched while
+        the current one is being sent, so a stream holds at most two pages.
+        """
+        after = self._after_index
+        pending = asyncio.ensure_future(asyncio.to_thread(self._read_page, after))
         try:
-            for event in self._repo.get_events(self._session_id):
-                yield sse(event["type"], event["payload"])
-                if event["type"] == "done":
+            while True:
+                page = await pending
+                indexed = [e.event_index for e in page if e.event_index is not None]
+                more = len(indexed) >= self._chunk_size
+                if more:
+                    after = indexed[-1]
+                    pending = asyncio.ensure_future(asyncio.to_thread(self._read_page, after))
+                if page:
+                    yield page
+                if not more:
                     return
+                # Let other streams on this loop run between pages
+                await asyncio.sleep(0)
         finally:
-            pass
+            if not pending.done():
+                pending.cancel()
 
-    def __aiter__(self) -> AsyncIterator[str]:
-        async def gen() -> AsyncIterator[str]:
-            for chunk in self:
-                yield chunk
+    def __iter__(self) -> Iterator[str]:
+        """Replay-only: whatever is in the journal now, up to 'done'."""
+        rendered = self._cache.get(self._repo, self._session_id)
+        if rendered is not None:
+            retry = self._retry_line()
+            for frame in rendered.frames(self._after_index):
+                yield retry + frame
+                retry = ""
+            return
+
+        recorder = self._recorder()
+        retry = self._retry_line()
+        for event in self._replay():
+            frame = sse(event.type, event.payload, event_id=event.event_index)
+            recorder.add(event.event_index, frame)
+            yield retry + frame
+            retry = ""
+            if event.type == "done":
+                self._store(recorder)
+                return
+
+    def _store(self, recorder: _FrameRecorder) -> None:
+        rendered = recorder.rendered()
+        if rendered is not None:
+            self._cache.put(self._repo, self._session_id, rendered)
+
+    async def _cached_async(self) -> Optional[RenderedSession]:
+        cache = self._cache
+        if not cache.enabled:
+            return None
+        rendered = cache.lookup(self._repo, self._session_id)
+        if rendered is None:
+            if cache.sqlite_enabled:
+                rendered = await asyncio.to_thread(cache.load, self._repo, self._session_id)
+            else:
+                rendered = cache.load(self._repo, self._session_id)
+        return rendered
+
+    def __aiter__(self) -> AsyncIterator[Union[str, bytes]]:
+        return self._live()
+
+    async def _live(self) -> AsyncIterator[Union[str, bytes]]:
+        """
+        Replay the journal, then follow live appends until 'done'.
+        Subscribing before the replay read means nothing committed in between
+        is missed; event_index is the watermark that drops the overlap.
+        A completed session that is already rendered is sent as one bytes body.
+        """
+        rendered = await self._cached_async()
+        if rendered is not None:
+            body = rendered.body_after(self._after_index)
+            if body:
+                yield self._retry_line().encode("utf-8") + body
+            return
+
+        recorder = self._recorder()
+        retry = self._retry_line()
+        sub = self._repo.broker.subscribe(session_channel(self._session_id))
+        try:
+            watermark = self._after_index or 0
+            first = True
+            async with aclosing(self._replay_pages()) as pages:
+                async for page in pages:
+                    for event in page:
+                        frame = sse(event.type, event.payload, event_id=event.event_index)
+                        recorder.add(event.event_index, frame)
+                        yield (retry if first else "") + frame
+                        first = False
+                        watermark = event.event_index or watermark
+                        if event.type == "done":
+                            await asyncio.to_thread(self._store, recorder)
+                            return
+            if first and await asyncio.to_thread(self._already_done):
+                return
+
+            while True:
+                event = await sub.get(timeout=self._idle_timeout)
+                if event is None:
+                    return
+                if (event.event_index or 0) <= watermark:
+                    continue
+                frame = sse(event.type, event.payload, event_id=event.event_index)
+                recorder.add(event.event_index, frame)
+                yield (retry if first else "") + frame
+                first = False
+                watermark = event.event_index
+                if event.type == "done":
+                    await asyncio.to_thread(self._store, recorder)
+                    return
+        finally:
+            sub.close()
 
-        return gen()
 
 def stream_session_events(
     session_id: str,
     repo: Optional[SessionRepository] = None,
+    idle_timeout: Optional[float] = None,
+    after_index: Optional[int] = None,
 ) -> _SessionEventStream:
-    """Deterministic session SSE stream (sync + async iterable)."""
-    return _SessionEventStream(session_id, repo or SessionRepository())
+    """
+    Deterministic session SSE stream (sync replay + async replay-then-live).
+    after_index resumes after that event_index (SSE Last-Event-ID).
+    """
+    return _SessionEventStream(
+        session_id,
+        repo or SessionRepository(),
+        idle_timeout=idle_timeout,
+        after_index=after_index,
+    )
+
+
+def user_frame(item) -> str:
+    """SSE frame for the user channel: every event is tagged with its session."""
+    data = {
+        "session_id": item.session_id,
+        "event_index": item.event_index,
+        "payload": item.payload,
+    }
+    return f"event: {item.type}\ndata: {json.dumps(data, sort_keys=True)}\n\n"
+
+
+class _UserEventStream:
+    """
+    Live-only multiplex of one user's journal events (all sessions), daily
+    updates and avatar state changes. Async iteration only.
+    """
+
+    def __init__(
+        self,
+        user_id: str,
+        repo: SessionRepository,
+        types: Optional[Iterable[str]] = None,
+        idle_timeout: Optional[float] = None,
+    ):
+        self._user_id = user_id
+        self._repo = repo
+        self._types = frozenset(types) if types else None
+        self._idle_timeout = _user_idle_timeout() if idle_timeout is None else idle_timeout
+        self._retry_ms = _retry_ms()
+
+    def _accept(self, item) -> bool:
+        return item.type in self._types
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._live()
+
+    async def _live(self) -> AsyncIterator[str]:
+        sub = self._repo.broker.subscribe(
+            user_channel(self._user_id),
+            accept=self._accept if self._types is not None else None,
+        )
+        try:
+            if self._retry_ms:
+                yield f"retry: {self._retry_ms}\n\n"
+            while True:
+                item = await sub.get(timeout=self._idle_timeout)
+                if item is None:
+                    return
+                yield user_frame(item)
+        finally:
+            sub.close()
+
+
+def stream_user_events(
+    user_id: str,
+    repo: Optional[SessionRepository] = None,
+    types: Optional[Iterable[str]] = None,
+    idle_timeout: Optional[float] = None,
+) -> _UserEventStream:
+    """One SSE connection for everything happening to a user, optionally filtered by event type."""
+    return _UserEventStream(user_id, repo or SessionRepository(), types=types, idle_timeout=idle_timeout)
@@ -0,0 +1,165 @@
+"""
+Reflecto Instrumentation
+Per-stage timing for orchestrator phases and session_service stages.
+
+Wrap a stage in measure(scope, stage). Each run records:
+  - wall time (perf_counter)
+  - CPU time of the running thread (thread_time)
+  - net allocated memory blocks (sys.getallocatedblocks delta; process-wide,
+    so concurrent threads add noise)
+
+Each sample is folded into an in-process histogram per "scope.stage", handed
+to every registered hook (exporters, tracing), and appended to the active
+collect_timings() block if there is one. Timings are never written into
+persisted session output.
+
+Settings:
+  REFLECTO_INSTRUMENTATION   "0" disables measurement entirely (default on)
+"""
+
+from __future__ import annotations
+
+import contextvars
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Upper bounds (seconds) of the wall-time histogram buckets
+WALL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+@dataclass(frozen=True)
+class StageTiming:
+    scope: str
+    stage: str
+    wall_seconds: float
+    cpu_seconds: float
+    alloc_blocks: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.scope}.{self.stage}"
+
+
+Hook = Callable[[StageTiming], None]
+
+_enabled = os.getenv("REFLECTO_INSTRUMENTATION", "1") != "0"
+_hooks: List[Hook] = []
+_lock = threading.Lock()
+_histograms: Dict[str, Dict[str, object]] = {}
+_collector: contextvars.ContextVar[Optional[List[StageTiming]]] = contextvars.ContextVar(
+    "reflecto_timings", default=None
+)
+
+
+def add_hook(hook: Hook) -> None:
+    with _lock:
+        _hooks.append(hook)
+
+
+def remove_hook(hook: Hook) -> None:
+    with _lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+
+def set_enabled(enabled: bool) -> None:
+    global _enabled
+    _enabled = enabled
+
+
+def _record(timing: StageTiming) -> None:
+    with _lock:
+        hist = _histograms.get(timing.key)
+        if hist is None:
+            hist = _histograms[timing.key] = {
+                "count": 0,
+                "wall_total_seconds": 0.0,
+                "wall_max_seconds": 0.0,
+                "cpu_total_seconds": 0.0,
+                "alloc_blocks_total": 0,
+                "buckets": [0] * (len(WALL_BUCKETS) + 1),
+            }
+        hist["count"] += 1
+        hist["wall_total_seconds"] += timing.wall_seconds
+        hist["wall_max_seconds"] = max(hist["wall_max_seconds"], timing.wall_seconds)
+        hist["cpu_total_seconds"] += timing.cpu_seconds
+        hist["alloc_blocks_total"] += timing.alloc_blocks
+        for i, bound in enumerate(WALL_BUCKETS):
+            if timing.wall_seconds <= bound:
+                hist["buckets"][i] += 1
+                break
+        else:
+            hist["buckets"][-1] += 1
+        hooks = list(_hooks)
+    collected = _collector.get()
+    if collected is not None:
+        collected.append(timing)
+    for hook in hooks:
+        hook(timing)
+
+
+@contextmanager
+def measure(scope: str, stage: str) -> Iterator[None]:
+    if not _enabled:
+        yield
+        return
+    blocks = sys.getallocatedblocks()
+    cpu = time.thread_time()
+    wall = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(StageTiming(
+            scope=scope,
+            stage=stage,
+            wall_seconds=time.perf_counter() - wall,
+            cpu_seconds=time.thread_time() - cpu,
+            alloc_blocks=sys.getallocatedblocks() - blocks,
+        ))
+
+
+@contextmanager
+def collect_timings() -> Iterator[List[StageTiming]]:
+    """Capture every stage measured in this context (including phases run on pool threads)."""
+    collected: List[StageTiming] = []
+    token = _collector.set(collected)
+    try:
+        yield collected
+    finally:
+        _collector.reset(token)
+
+
+def timings_block(timings: List[StageTiming]) -> Dict[str, Dict[str, float]]:
+    """Compact per-stage summary for a response's meta.timings."""
+    out: Dict[str, Dict[str, float]] = {}
+    for t in timings:
+        entry = out.setdefault(t.key, {"wall_ms": 0.0, "cpu_ms": 0.0, "alloc_blocks": 0})
+        entry["wall_ms"] += round(t.wall_seconds * 1000, 3)
+        entry["cpu_ms"] += round(t.cpu_seconds * 1000, 3)
+        entry["alloc_blocks"] += t.alloc_blocks
+    return out
+
+
+def instrumentation_stats() -> Dict[str, Dict[str, object]]:
+    with _lock:
+        snapshot = {key: dict(hist, buckets=list(hist["buckets"])) for key, hist in _histograms.items()}
+    out: Dict[str, Dict[str, object]] = {}
+    for key, hist in snapshot.items():
+        buckets = hist.pop("buckets")
+        hist["wall_mean_seconds"] = hist["wall_total_seconds"] / hist["count"] if hist["count"] else 0.0
+        hist["wall_histogram"] = {
+            **{f"le_{bound}": count for bound, count in zip(WALL_BUCKETS, buckets)},
+            "le_inf": buckets[-1],
+        }
+        out[key] = hist
+    return out
+
+
+def reset_instrumentation() -> None:
+    with _lock:
+        _histograms.clear()
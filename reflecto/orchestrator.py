@@ -5,7 +5,7 @@ Pure deterministic cognition pipeline coordinator.
 
 from __future__ import annotations
 
-import copy
+from typing import Iterable
 
 from domain.core.daily_state import DailyState
 from domain.core.memory_intelligence import analyze_memory_patterns
@@ -18,6 +18,7 @@ from reflecto.chatbot.flow import run_reflecto_flow
 from reflecto.avatar.response_shaper import shape_response as _shape_response_impl
 
 from domain.phases.purity import freeze_value
+from reflecto.phase_graph import Phase, PhaseGraph
 
 from .avatar.voice_engine import build_voice
 
@@ -116,6 +117,100 @@ def decide_closing(presence_dict, silence_dict, continuity_dict, voice_dict, flo
     return build_closing(presence_dict, silence_dict, continuity_dict, voice_dict, flow_context)
 
 
+# ------------------------------------------------------------
+# Phase graph
+# Phase bodies resolve the module-level names above at call time, so
+# monkeypatching `orch.<phase>` keeps working.
+# ------------------------------------------------------------
+
+def _prompt_phase(v):
+    return {"prompt": load_avatar_prompt(v["today_state"], None, v["flow_context"])}
+
+
+def _flow_phase(v):
+    raw_response = v["raw_response"]
+    responder = (lambda _: raw_response) if raw_response is not None else (lambda _: "<stub>")
+    flow_output = run_reflecto_flow(v["today_state"].to_dict(), responder) or {}
+    return {
+        "questions": flow_output.get("questions", []) if isinstance(flow_output, dict) else [],
+        "flow_decisions": flow_output.get("flow_decisions", []) if isinstance(flow_output, dict) else [],
+    }
+
+
+def _memory_phase(v):
+    memory_patterns = analyze_memory_patterns(serialize_history(v["history"]))
+    return {"memory_patterns": memory_patterns, "memory_patterns_dict": _as_plain_dict(memory_patterns)}
+
+
+def _presence_phase(v):
+    presence = build_presence(v["today_state"], v["memory_patterns"], v["flow_context"])
+    return {"presence": presence, "presence_dict": _as_plain_dict(presence)}
+
+
+def _shape_phase(v):
+    # Must be called even when raw_response is None; shaped_response is then None
+    raw_response = v["raw_response"]
+    shape_result = None
+    try:
+        if raw_response is None:
+            shape_response("", v["presence_dict"])
+        else:
+            shape_result = shape_response(raw_response, v["presence_dict"])
+    except Exception:
+        pass
+    return {"shaped_response": None if raw_response is None else shape_result}
+
+
+def _silence_phase(v):
+    return {"silence": decide_silence(v["presence_dict"], v["memory_patterns_dict"], v["flow_context"])}
+
+
+def _continuity_phase(v):
+    continuity = decide_continuity(v["memory_patterns_dict"], v["presence_dict"], v["silence"], v["flow_context"])
+    return {"continuity": continuity, "continuity_dict": _as_plain_dict(continuity)}
+
+
+def _voice_phase(v):
+    voice_text = v["raw_response"] if v["raw_response"] is not None else ""
+    voice = apply_voice(voice_text, v["presence_dict"], v["silence"], v["continuity_dict"])
+    return {"voice": voice, "voice_dict": _as_plain_dict(voice)}
+
+
+def _closing_phase(v):
+    return {"closing": decide_closing(
+        v["presence_dict"], v["silence"], v["continuity_dict"], v["voice_dict"], v["flow_context"]
+    )}
+
+
+# Declared in pipeline order; the executor's stable topological sort keeps it
+REFLECTO_GRAPH = PhaseGraph([
+    Phase("prompt", _prompt_phase, ("today_state", "flow_context"), ("prompt",)),
+    Phase("flow", _flow_phase, ("today_state", "raw_response"), ("questions", "flow_decisions")),
+    Phase("memory", _memory_phase, ("history",), ("memory_patterns", "memory_patterns_dict")),
+    Phase("presence", _presence_phase, ("today_state", "memory_patterns", "flow_context"), ("presence", "presence_dict")),
+    Phase("shape", _shape_phase, ("raw_response", "presence_dict"), ("shaped_response",)),
+    Phase("silence", _silence_phase, ("presence_dict", "memory_patterns_dict", "flow_context"), ("silence",)),
+    Phase(
+        "continuity",
+        _continuity_phase,
+        ("memory_patterns_dict", "presence_dict", "silence", "flow_context"),
+        ("continuity", "continuity_dict"),
+    ),
+    Phase("voice", _voice_phase, ("raw_response", "presence_dict", "silence", "continuity_dict"), ("voice", "voice_dict")),
+    Phase(
+        "closing",
+        _closing_phase,
+        ("presence_dict", "silence", "continuity_dict", "voice_dict", "flow_context"),
+        ("closing",),
+    ),
+], name="orchestrator")
+
+OUTPUT_KEYS = (
+    "prompt", "questions", "flow_decisions", "memory_patterns", "presence",
+    "shaped_response", "silence", "continuity", "voice", "closing",
+)
+
+
 # ------------------------------------------------------------
 # Main Reflecto Pipeline (Phase 8 output contract)
 # ------------------------------------------------------------
@@ -125,6 +220,7 @@ def run_reflecto(
     history: list,
     flow_context: dict,
     raw_response: str | None = None,
+    outputs: Iterable[str] | None = None,
 ):
     """
     Must return exactly these keys (tests/test_phase8_orchestrator.py):
@@ -133,69 +229,33 @@ def run_reflecto(
 
     Must call phases in this order (monkeypatch test):
       prompt, flow, memory, presence, shape, silence, continuity, voice, closing
-    """
-    user_state = copy.deepcopy(user_state)
-    history = copy.deepcopy(history)
-    flow_context = copy.deepcopy(flow_context)
-    today_state = _coerce_today_state(user_state, history)
-
-    # 1) prompt
-    prompt = load_avatar_prompt(today_state, None, flow_context)
-
-    # 2) flow
-    responder = (lambda _: raw_response) if raw_response is not None else (lambda _: "<stub>")
-    flow_output = run_reflecto_flow(today_state.to_dict(), responder) or {}
-    questions = flow_output.get("questions", []) if isinstance(flow_output, dict) else []
-    flow_decisions = flow_output.get("flow_decisions", []) if isinstance(flow_output, dict) else []
 
-    # 3) memory
-    memory_patterns = analyze_memory_patterns(serialize_history(history))
-
-    # 4) presence
-    presence = build_presence(today_state, memory_patterns, flow_context)
-    presence_dict = _as_plain_dict(presence)
-    memory_patterns_dict = _as_plain_dict(memory_patterns)
-
-    # 5) shape (must be called even when raw_response is None)
-    shape_result = None
-    try:
-        if raw_response is None:
-            shape_response("", presence_dict)
-        else:
-            shape_result = shape_response(raw_response, presence_dict)
-    except Exception:
-        pass
-
-    # 6) silence
-    silence = decide_silence(presence_dict, memory_patterns_dict, flow_context)
-
-    # 7) continuity (test expects this before voice)
-    continuity = decide_continuity(memory_patterns_dict, presence_dict, silence, flow_context)
-    continuity_dict = _as_plain_dict(continuity)
-
-    # 8) voice
-    voice_text = raw_response if raw_response is not None else ""
-    voice = apply_voice(voice_text, presence_dict, silence, continuity_dict)
-    voice_dict = _as_plain_dict(voice)
-
-    # 9) closing
-    closing = decide_closing(presence_dict, silence, continuity_dict, voice_dict, flow_context)
-
-    # shaped_response must be None when raw_response is None (skip-shape test)
-    shaped_response = None if raw_response is None else shape_result
-
-    output = {
-        "prompt": copy.deepcopy(prompt),
-        "questions": copy.deepcopy(questions),
-        "flow_decisions": copy.deepcopy(flow_decisions),
-        "memory_patterns": copy.deepcopy(memory_patterns),
-        "presence": copy.deepcopy(presence),
-        "shaped_response": copy.deepcopy(shaped_response),
-        "silence": copy.deepcopy(silence),
-        "continuity": copy.deepcopy(continuity),
-        "voice": copy.deepcopy(voice),
-        "closing": copy.deepcopy(closing),
-    }
-
-    # Enforce immutability at the orchestration boundary
-    return freeze_value(output)
\ No newline at end of file
+    `outputs` narrows the result to a subset of those keys; phases that
+    none of them depend on are skipped.
+    """
+    requested = tuple(outputs) if outputs is not None else OUTPUT_KEYS
+    unknown = set(requested) - set(OUTPUT_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown run_reflecto outputs: {sorted(unknown)}")
+
+    # Frozen inputs are shared with every phase without further copies;
+    # dataclass leaves such as DailyState become read-only copies too
+    user_state = freeze_value(user_state)
+    history = freeze_value(history)
+    flow_context = freeze_value(flow_context)
+    today_state = freeze_value(_coerce_today_state(user_state, history))
+
+    values = REFLECTO_GRAPH.run(
+        {
+            "today_state": today_state,
+            "history": history,
+            "flow_context": flow_context,
+            "raw_response": raw_response,
+        },
+        requested=requested,
+    )
+    output = {key: values[key] for key in requested}
+
+    # Enforce immutability at the orchestration boundary; phase outputs are
+    # already frozen and are shared, anything still mutable is copied once
+    return freeze_value(output)
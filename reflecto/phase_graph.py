@@ -0,0 +1,150 @@
+"""
+Reflecto Phase Graph
+Declarative phase DAG and its executor.
+
+Each phase declares the values it reads (inputs) and the values it produces
+(outputs). The executor:
+  - orders phases topologically; among phases that are ready at the same
+    time, declaration order wins, so the schedule is stable and a graph
+    declared in pipeline order runs in exactly that order
+  - runs only the phases needed for the requested outputs
+  - runs CPU-bound phases inline, one after another; I/O-bound phases are
+    submitted to a thread pool when their turn comes and only waited on
+    when a later phase needs their outputs, so independent branches overlap
+
+Every phase run is measured as "<graph name>.<phase name>" (see
+reflecto.instrumentation).
+
+Settings:
+  REFLECTO_PHASE_WORKERS   threads for I/O-bound phases (default 4)
+"""
+
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+from reflecto.instrumentation import measure
+
+
+@dataclass(frozen=True)
+class Phase:
+    name: str
+    run: Callable[[Mapping[str, Any]], Mapping[str, Any]]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    io_bound: bool = False
+
+
+class PhaseGraph:
+    def __init__(self, phases: Sequence[Phase], name: str = "graph"):
+        self.name = name
+        self.phases: Tuple[Phase, ...] = tuple(phases)
+        self._producers: Dict[str, Phase] = {}
+        for phase in self.phases:
+            for key in phase.outputs:
+                if key in self._producers:
+                    raise ValueError(
+                        f"Output {key!r} produced by both {self._producers[key].name!r} and {phase.name!r}"
+                    )
+                self._producers[key] = phase
+        self.order: Tuple[Phase, ...] = self._toposort()
+
+    def _toposort(self) -> Tuple[Phase, ...]:
+        deps: Dict[str, Set[str]] = {
+            phase.name: {self._producers[key].name for key in phase.inputs if key in self._producers}
+            for phase in self.phases
+        }
+        done: Set[str] = set()
+        order: List[Phase] = []
+        while len(order) < len(self.phases):
+            ready = next(
+                (p for p in self.phases if p.name not in done and deps[p.name] <= done),
+                None,
+            )
+            if ready is None:
+                stuck = sorted(p.name for p in self.phases if p.name not in done)
+                raise ValueError(f"Phase graph has a cycle among {stuck}")
+            order.append(ready)
+            done.add(ready.name)
+        return tuple(order)
+
+    def plan(self, requested: Optional[Iterable[str]] = None) -> Tuple[Phase, ...]:
+        """Phases needed for `requested` outputs (all phases if None), in run order."""
+        if requested is None:
+            return self.order
+        needed: Set[str] = set()
+        stack = [key for key in requested if key in self._producers]
+        while stack:
+            phase = self._producers[stack.pop()]
+            if phase.name in needed:
+                continue
+            needed.add(phase.name)
+            stack.extend(key for key in phase.inputs if key in self._producers)
+        return tuple(p for p in self.order if p.name in needed)
+
+    def run(
+        self,
+        initial: Mapping[str, Any],
+        requested: Optional[Iterable[str]] = None,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ) -> Dict[str, Any]:
+        """Execute the plan for `requested`; returns initial values plus every produced output."""
+        values: Dict[str, Any] = dict(initial)
+        pending: Dict[str, Future] = {}  # output key -> future of its I/O-bound producer
+
+        def resolve(phase: Phase) -> Dict[str, Any]:
+            for key in phase.inputs:
+                if key in pending:
+                    collect(pending[key])
+                if key not in values:
+                    raise KeyError(f"Phase {phase.name!r} needs {key!r}, which nothing provides")
+            return {key: values[key] for key in phase.inputs}
+
+        def collect(future: Future) -> None:
+            produced = future.result()
+            for key in [k for k, f in pending.items() if f is future]:
+                del pending[key]
+            values.update(produced)
+
+        for phase in self.plan(requested):
+            args = resolve(phase)
+            if phase.io_bound:
+                # Run in a copy of this context so timing collection follows the phase
+                context = contextvars.copy_context()
+                future = (executor or get_phase_executor()).submit(context.run, self._call, phase, args)
+                for key in phase.outputs:
+                    pending[key] = future
+            else:
+                values.update(self._call(phase, args))
+
+        for future in list(dict.fromkeys(pending.values())):
+            collect(future)
+        return values
+
+    def _call(self, phase: Phase, args: Mapping[str, Any]) -> Dict[str, Any]:
+        with measure(self.name, phase.name):
+            produced = dict(phase.run(args) or {})
+        missing = [key for key in phase.outputs if key not in produced]
+        if missing:
+            raise KeyError(f"Phase {phase.name!r} did not produce {missing}")
+        return {key: produced[key] for key in phase.outputs}
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_phase_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("REFLECTO_PHASE_WORKERS", "4")),
+                thread_name_prefix="reflecto-phase",
+            )
+        return _executor
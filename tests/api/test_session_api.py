@@ -47,6 +47,16 @@ def test_post_and_get_session(monkeypatch):
     sessions = list_resp.json()
     assert any(s["id"] == session_id for s in sessions)
 
+    # Paginated projection skips the data blob
+    page_resp = client.get("/sessions/user42", params={"limit": 1, "fields": "id,created_at"})
+    assert page_resp.status_code == 200
+    page = page_resp.json()
+    assert len(page["items"]) == 1
+    assert set(page["items"][0]) == {"id", "created_at"}
+    assert "next_cursor" in page
+
+    assert client.get("/sessions/user42", params={"cursor": "bogus"}).status_code == 400
+
 
 def test_session_requires_deterministic_date():
     req = {
@@ -58,3 +68,50 @@ def test_session_requires_deterministic_date():
     }
     post_resp = client.post("/session", json=req)
     assert post_resp.status_code == 422
+
+
+def test_post_session_honors_idempotency_key():
+    req = {
+        "user_id": "user-idem",
+        "user_state": {"avatar": "test", "date": "2026-01-27"},
+        "history": [],
+        "flow_context": {},
+        "raw_response": "",
+    }
+    headers = {"Idempotency-Key": "retry-1"}
+    first = client.post("/session", json=req, headers=headers).json()
+    second = client.post("/session", json=req, headers=headers).json()
+    assert second["session_id"] == first["session_id"]
+    assert second["replayed"] is True
+
+
+def test_post_session_rejects_reused_key_with_different_body():
+    req = {
+        "user_id": "user-idem",
+        "user_state": {"avatar": "test", "date": "2026-01-27"},
+        "history": [],
+        "flow_context": {},
+        "raw_response": "",
+    }
+    headers = {"Idempotency-Key": "retry-body-1"}
+    assert client.post("/session", json=req, headers=headers).status_code == 200
+    changed = client.post("/session", json={**req, "raw_response": "other"}, headers=headers)
+    assert changed.status_code == 422
+
+
+def test_daily_update_etag_and_not_modified(monkeypatch):
+    result = {"day": "2026-02-08", "snapshot": {"counts": {}}}
+    monkeypatch.setattr("api.routes.daily.run_daily_update_service", lambda **kwargs: result)
+
+    first = client.get("/daily/u1/2026-02-08")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.json() == result
+
+    cached = client.get("/daily/u1/2026-02-08", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.content == b""
+
+    stale = client.get("/daily/u1/2026-02-08", headers={"If-None-Match": '"other"'})
+    assert stale.status_code == 200
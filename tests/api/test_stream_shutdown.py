@@ -0,0 +1,69 @@
+import asyncio
+import os
+import signal
+
+from api import main
+from infrastructure.streaming.connections import get_stream_registry
+
+
+def _scope(path):
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+
+
+def test_exit_signal_drains_open_streams_before_lifespan_shutdown(monkeypatch):
+    async def endless():
+        yield "event: first\ndata: {}\n\n"
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr("api.routes.streaming.stream_session_events", lambda **kwargs: endless())
+
+    async def scenario():
+        async with main.lifespan(main.app):
+            sent = []
+            first_frame = asyncio.Event()
+
+            async def send(message):
+                sent.append(message)
+                if message.get("body"):
+                    first_frame.set()
+
+            async def receive():
+                # The client stays connected
+                await asyncio.sleep(3600)
+
+            response = asyncio.ensure_future(main.app(_scope("/session/s-open/stream"), receive, send))
+            await asyncio.wait_for(first_frame.wait(), 5)
+
+            # What the server receives on restart; lifespan shutdown has not started
+            os.kill(os.getpid(), signal.SIGTERM)
+            await asyncio.wait_for(response, 5)
+            assert main.shutdown_event.is_set()
+            return sent
+
+    # Stand-in for the server's own handler, which the app chains to
+    chained = []
+    previous = signal.signal(signal.SIGTERM, lambda signum, frame: chained.append(signum))
+    try:
+        sent = asyncio.run(scenario())
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+        # The registry is process-wide; let later tests open streams again
+        get_stream_registry().reopen()
+        main.shutdown_event.clear()
+
+    assert chained == [signal.SIGTERM]
+    assert sent[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
+    assert b"event: first" in b"".join(m.get("body", b"") for m in sent)
@@ -3,6 +3,8 @@ Tests for Phase 13: Streaming API (SSE)
 """
 
 
+import re
+
 from fastapi.testclient import TestClient
 from api.main import app
 client = TestClient(app)
@@ -71,3 +73,18 @@ def test_streaming_matches_replay():
     replay_events = [e.strip() for e in replay_concat.split("\n\n") if e.strip()]
     # Compare event-by-event
     assert stream_events == replay_events
+
+def test_sse_resumes_from_last_event_id():
+    resp = client.post("/session/stream", json=session_payload())
+    frames = [e for e in resp.text.split("\n\n") if e.strip()]
+    session_id = re.search(r'session_id":\s*"([^"]+)"', frames[-1]).group(1)
+
+    resumed = client.get(f"/session/{session_id}/stream", headers={"Last-Event-ID": "10"})
+    assert resumed.status_code == 200
+    ids = [line for line in resumed.text.splitlines() if line.startswith("id: ")]
+    assert ids == [f"id: {i}" for i in range(11, len(frames) + 1)]
+
+    via_query = client.get(f"/session/{session_id}/stream?after=10")
+    assert via_query.text == resumed.text
+
+    assert client.get(f"/session/{session_id}/stream", headers={"Last-Event-ID": "x"}).status_code == 400
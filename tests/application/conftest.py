@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+
+class FileIdentityStore:
+    """Identity files under a directory; picklable for worker processes."""
+
+    def __init__(self, root):
+        self.root = str(root)
+
+    def _path(self, user_id):
+        return f"{self.root}/{user_id}.json"
+
+    def load_identity(self, user_id):
+        try:
+            with open(self._path(user_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save_identity(self, user_id, identity):
+        with open(self._path(user_id), "w") as f:
+            json.dump(identity, f)
+
+
+class StaticPromptStore:
+    def load_prompt_bundle(self, base_path):
+        return {"identity": "I", "purpose": "P", "style_rules": "S"}
+
+
+@pytest.fixture
+def file_identity_store(tmp_path):
+    def _factory(root=tmp_path) -> FileIdentityStore:
+        return FileIdentityStore(root)
+
+    return _factory
+
+
+@pytest.fixture
+def prompt_store():
+    return StaticPromptStore()
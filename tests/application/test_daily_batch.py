@@ -0,0 +1,72 @@
+from application.services.daily_batch import batch_job_name, run_daily_batch
+from application.services.daily_update_service import run_daily_update_service
+from infrastructure.persistence.models import SessionRecord
+from infrastructure.persistence.session_repository import SessionRepository
+
+DAY = "2026-02-08"
+
+
+def _seed(repo, users):
+    for n, user_id in enumerate(users):
+        repo.save_with_events(SessionRecord(user_id=user_id, data={}, version="v", record_id=f"s{n}"), [{
+            "id": f"e{n}",
+            "session_id": f"s{n}",
+            "timestamp": f"{DAY}T09:00:00Z",
+            "type": "presence",
+            "payload": {"state": user_id},
+            "source": "test",
+        }])
+
+
+def test_batch_precomputes_and_resumes(tmp_path, file_identity_store, prompt_store):
+    db_path = str(tmp_path / "sessions.db")
+    repo = SessionRepository(db_path)
+    _seed(repo, ["u1", "u2", "u3"])
+    identities = file_identity_store()
+
+    # A previous run got through u1 before it crashed
+    repo.save_daily_updates([], checkpoint=batch_job_name(DAY), checkpoint_users=["u1"])
+
+    report = run_daily_batch(
+        DAY, db_path=db_path, workers=0, chunk_size=2,
+        identity_store=identities, prompt_store=prompt_store,
+    )
+    assert report["users"] == 3
+    assert report["resumed"] == 1
+    assert report["computed"] == 2
+    assert report["failed"] == {}
+    assert report["users_per_second"] > 0
+    assert "daily_update.compute" in report["stages"]
+    assert "daily_batch.write" in report["stages"]
+    assert repo.get_batch_checkpoint(batch_job_name(DAY)) == {"u1", "u2", "u3"}
+
+    # The request path finds unchanged inputs and serves the stored result
+    stored = repo.get_daily_snapshot("u2", DAY)
+    result = run_daily_update_service(
+        "u2", DAY, repo=repo, identity_store=identities, prompt_store=prompt_store
+    )
+    assert result["snapshot"]["last_presence"] == {"state": "u2"}
+    assert repo.get_daily_snapshot("u2", DAY) == stored
+
+    rerun = run_daily_batch(
+        DAY, db_path=db_path, workers=0, identity_store=identities,
+        prompt_store=prompt_store, restart=True,
+    )
+    assert rerun["resumed"] == 0
+    assert rerun["computed"] == 1  # u1 was never actually computed
+    assert rerun["unchanged"] == 2
+
+
+def test_batch_runs_chunks_in_worker_processes(tmp_path, file_identity_store, prompt_store):
+    db_path = str(tmp_path / "sessions.db")
+    repo = SessionRepository(db_path)
+    _seed(repo, ["a", "b", "c", "d"])
+
+    report = run_daily_batch(
+        DAY, db_path=db_path, workers=2, chunk_size=2,
+        identity_store=file_identity_store(), prompt_store=prompt_store,
+    )
+    assert report["chunks"] == 2
+    assert report["computed"] == 4
+    assert report["failed"] == {}
+    assert all(repo.get_daily_update_state(u, DAY) is not None for u in "abcd")
@@ -0,0 +1,75 @@
+from application.services.daily_update_service import daily_update_etag, run_daily_update_service
+from infrastructure.persistence.models import SessionRecord
+from infrastructure.persistence.session_repository import SessionRepository
+
+DAY = "2026-02-08"
+
+
+class FakeIdentityStore:
+    def __init__(self):
+        self.saved = []
+
+    def load_identity(self, user_id):
+        return self.saved[-1] if self.saved else None
+
+    def save_identity(self, user_id, identity):
+        self.saved.append(identity)
+
+
+def _event(event_id, timestamp, event_type="presence"):
+    return {
+        "id": event_id,
+        "session_id": "s1",
+        "timestamp": timestamp,
+        "type": event_type,
+        "payload": {"state": event_id},
+        "source": "test",
+    }
+
+
+def _run(repo, identity_store, prompt_store, day=DAY):
+    return run_daily_update_service(
+        "u1", day, repo=repo, identity_store=identity_store, prompt_store=prompt_store
+    )
+
+
+def test_unchanged_day_skips_the_rewrite(tmp_path, prompt_store):
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+    identity_store = FakeIdentityStore()
+    repo.save_with_events(
+        SessionRecord(user_id="u1", data={}, version="v", record_id="s1"),
+        [_event("e1", f"{DAY}T09:00:00Z")],
+    )
+
+    first = _run(repo, identity_store, prompt_store)
+    snapshot_row = repo.get_daily_snapshot("u1", DAY)
+    avatar_row = repo.get_avatar_state("u1")
+
+    second = _run(repo, identity_store, prompt_store)
+    assert daily_update_etag(second) == daily_update_etag(first)
+    assert len(identity_store.saved) == 1
+    assert repo.get_daily_snapshot("u1", DAY) == snapshot_row
+    assert repo.get_avatar_state("u1") == avatar_row
+
+    # A new event moves the watermark: recomputed, same snapshot id
+    repo.append_event(_event("e2", f"{DAY}T10:00:00Z"))
+    third = _run(repo, identity_store, prompt_store)
+    assert len(identity_store.saved) == 2
+    assert third["snapshot"]["counts"] == {"presence": 2}
+    assert daily_update_etag(third) != daily_update_etag(first)
+    assert repo.get_daily_snapshot("u1", DAY)["id"] == snapshot_row["id"]
+
+
+def test_other_day_changes_invalidate(tmp_path, prompt_store):
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+    identity_store = FakeIdentityStore()
+    repo.save(SessionRecord(user_id="u1", data={}, version="v", record_id="s1"))
+
+    _run(repo, identity_store, prompt_store)
+    _run(repo, identity_store, prompt_store, day="2026-02-07")
+    assert len(identity_store.saved) == 2
+    # 02-07 now has a stored snapshot, which is part of 02-08's inputs
+    _run(repo, identity_store, prompt_store)
+    assert len(identity_store.saved) == 3
+    _run(repo, identity_store, prompt_store)
+    assert len(identity_store.saved) == 3
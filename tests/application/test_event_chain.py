@@ -0,0 +1,74 @@
+import hashlib
+import json
+
+from application.services.session_service import _append_stream_events, verify_event_chain
+from infrastructure.persistence.canonical import canonical_json, event_hash
+from infrastructure.persistence.connection_pool import get_pool
+from infrastructure.persistence.session_repository import SessionRepository
+
+
+SESSION_OUTPUT = {
+    "avatar_prompt": "A",
+    "questions": ["Q"],
+    "response": "R",
+    "presence": {"state": "calm", "b": [1, 2.5, None], "ü": "✓"},
+    "closing_phrase": "C",
+}
+
+
+def _legacy_hash(event_type, payload, event_index, timestamp, prev):
+    canonical = {
+        "type": event_type,
+        "payload": payload,
+        "event_index": event_index,
+        "timestamp": timestamp,
+        "prev_hash": prev,
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def test_event_hash_matches_full_canonical_encoding():
+    payload = SESSION_OUTPUT["presence"]
+    assert event_hash("presence", canonical_json(payload), 5, "2026-02-08T00:00:00Z", "abc") == (
+        _legacy_hash("presence", payload, 5, "2026-02-08T00:00:00Z", "abc")
+    )
+    assert event_hash("done", canonical_json({}), None, "t", None) == _legacy_hash("done", {}, None, "t", None)
+
+
+def test_stored_payload_is_the_hashed_canonical_text(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    repo = SessionRepository(db_path)
+    _append_stream_events("s1", SESSION_OUTPUT, repo, now="2026-02-08T00:00:00Z")
+
+    events = repo.get_events("s1")
+    assert all(e.payload_raw == canonical_json(e.payload) for e in events)
+    assert verify_event_chain("s1", repo=repo) == {"session_id": "s1", "valid": True}
+
+    # Re-encoding a canonical row (whitespace / key order) is tampering
+    with get_pool(db_path).writer() as conn:
+        conn.execute(
+            "UPDATE session_events SET payload = ? WHERE id = ?",
+            (json.dumps(events[1].payload, indent=1), events[1].id),
+        )
+    result = verify_event_chain("s1", repo=repo)
+    assert result["valid"] is False
+    assert result["index"] == events[1].event_index
+
+    # Legacy rows stored with plain json.dumps (no canonical marker) still verify
+    with get_pool(db_path).writer() as conn:
+        for e in events:
+            conn.execute(
+                "UPDATE session_events SET payload = ?, payload_canonical = NULL WHERE id = ?",
+                (json.dumps(e.payload), e.id),
+            )
+    assert verify_event_chain("s1", repo=repo)["valid"] is True
+
+    with get_pool(db_path).writer() as conn:
+        conn.execute(
+            "UPDATE session_events SET payload = ? WHERE session_id = 's1' AND event_index = 4",
+            ('{"text":"tampered"}',),
+        )
+    result = verify_event_chain("s1", repo=repo)
+    assert result["valid"] is False
+    assert result["index"] == 4
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+
+import pytest
+
+from application.services.executor import BlockingExecutor, ExecutorSaturated
+
+
+def test_blocking_work_runs_off_loop_and_is_measured():
+    executor = BlockingExecutor(workers=2, max_queue=0)
+
+    async def main():
+        loop_thread = threading.get_ident()
+        worker_thread = await executor.run(threading.get_ident)
+        return loop_thread, worker_thread
+
+    loop_thread, worker_thread = asyncio.run(main())
+    assert loop_thread != worker_thread
+    stats = executor.stats()
+    assert stats["completed"] == 1
+    assert stats["in_flight"] == 0
+    assert sum(stats["latency_histogram"].values()) == 1
+    executor.shutdown()
+
+
+def test_saturated_executor_rejects_immediately():
+    executor = BlockingExecutor(workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def main():
+        running = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(ExecutorSaturated):
+            await executor.run(lambda: None)
+        release.set()
+        await asyncio.gather(*running)
+
+    asyncio.run(main())
+    stats = executor.stats()
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 2
+    executor.shutdown()
+
+
+def test_failures_propagate_and_count():
+    executor = BlockingExecutor(workers=1, max_queue=0)
+
+    def boom():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        asyncio.run(executor.run(boom))
+    assert executor.stats()["failed"] == 1
+    executor.shutdown()
+
+
+def test_cancelled_call_keeps_its_slot_until_the_worker_finishes():
+    executor = BlockingExecutor(workers=1, max_queue=0)
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait()
+
+    async def main():
+        task = asyncio.ensure_future(executor.run(slow))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The worker is still busy, so the admission bound still holds
+        assert executor.stats()["in_flight"] == 1
+        with pytest.raises(ExecutorSaturated):
+            await executor.run(lambda: None)
+        release.set()
+        await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    asyncio.run(main())
+    stats = executor.stats()
+    assert stats["in_flight"] == 0
+    assert stats["completed"] == 1
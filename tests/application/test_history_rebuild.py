@@ -0,0 +1,182 @@
+import pytest
+
+from application.services import history_rebuild
+from application.services.daily_update_service import run_daily_update_service
+from application.services.history_rebuild import rebuild_history
+from domain.core.snapshot_builder import build_daily_snapshot
+from infrastructure.persistence.connection_pool import get_pool
+from infrastructure.persistence.models import SessionRecord
+from infrastructure.persistence.session_repository import HistoryRebuildConflict, SessionRepository
+
+DAYS = ["2026-02-06", "2026-02-07", "2026-02-08"]
+
+
+def _seed(repo, users):
+    for user_id in users:
+        for n, day in enumerate(DAYS):
+            session_id = f"{user_id}-{n}"
+            repo.save_with_events(SessionRecord(user_id=user_id, data={}, version="v", record_id=session_id), [
+                {
+                    "id": f"{session_id}-p",
+                    "session_id": session_id,
+                    "timestamp": f"{day}T09:00:00Z",
+                    "type": "presence",
+                    "payload": {"state": day},
+                    "source": "test",
+                },
+                {
+                    "id": f"{session_id}-s",
+                    "session_id": session_id,
+                    "timestamp": f"{day}T10:00:00Z",
+                    "type": "skills",
+                    "payload": {"focus": 90 + n},
+                    "source": "test",
+                },
+            ])
+
+
+def _history(repo, user_id):
+    return [(s["day"], s["snapshot"]) for s in reversed(repo.list_daily_snapshots(user_id))]
+
+
+def test_rebuild_replays_every_day_and_swaps(tmp_path, file_identity_store, prompt_store):
+    db_path = str(tmp_path / "sessions.db")
+    repo = SessionRepository(db_path)
+    _seed(repo, ["u1", "u2"])
+    identities = file_identity_store()
+
+    # Only the last day was ever computed live
+    run_daily_update_service("u1", DAYS[-1], repo=repo, identity_store=identities, prompt_store=prompt_store)
+    live_id = repo.get_daily_snapshot("u1", DAYS[-1])["id"]
+
+    report = rebuild_history(db_path, workers=0, identity_store=identities)
+    assert report["users"] == 2
+    assert report["days"] == 6
+    assert report["daily_snapshots"] == 6
+    assert report["avatar_states"] == 2
+    assert report["identities"] == 2
+    assert "history_rebuild.compute" in report["stages"]
+
+    for user_id in ("u1", "u2"):
+        assert _history(repo, user_id) == [
+            (day, build_daily_snapshot(repo.get_events_for_user_day(user_id, day))) for day in DAYS
+        ]
+        assert identities.load_identity(user_id)["last_updated"] == DAYS[-1]
+    assert repo.get_daily_snapshot("u1", DAYS[-1])["id"] == live_id
+    assert repo.get_daily_update_state("u1", DAYS[-1]) is None
+
+    # Same journal, same history
+    avatar = repo.get_avatar_state("u1")["state"]
+    identity = identities.load_identity("u1")
+    rebuild_history(db_path, workers=0, identity_store=identities)
+    assert repo.get_avatar_state("u1")["state"] == avatar
+    assert identities.load_identity("u1") == identity
+    assert _history(repo, "u2")[0][0] == DAYS[0]
+
+    # The swapped-in table keeps the (user_id, day) upsert working
+    run_daily_update_service("u1", DAYS[-1], repo=repo, identity_store=identities, prompt_store=prompt_store)
+    assert repo.get_daily_snapshot("u1", DAYS[-1])["id"] == live_id
+
+
+def test_rebuild_in_worker_processes_matches_inline(tmp_path, file_identity_store):
+    inline_path = str(tmp_path / "inline.db")
+    pooled_path = str(tmp_path / "pooled.db")
+    (tmp_path / "inline").mkdir()
+    (tmp_path / "pooled").mkdir()
+    for path in (inline_path, pooled_path):
+        _seed(SessionRepository(path), ["a", "b", "c"])
+
+    rebuild_history(inline_path, workers=0, identity_store=file_identity_store(tmp_path / "inline"))
+    report = rebuild_history(pooled_path, workers=2, identity_store=file_identity_store(tmp_path / "pooled"))
+    assert report["users"] == 3
+
+    inline, pooled = SessionRepository(inline_path), SessionRepository(pooled_path)
+    for user_id in "abc":
+        assert _history(inline, user_id) == _history(pooled, user_id)
+        assert inline.get_avatar_state(user_id)["state"] == pooled.get_avatar_state(user_id)["state"]
+
+
+def test_rebuild_keeps_stored_days_without_journal_events(tmp_path, file_identity_store):
+    db_path = str(tmp_path / "sessions.db")
+    repo = SessionRepository(db_path)
+    _seed(repo, ["u1"])
+    legacy = {"counts": {"presence": 1}, "meaningful_events": 2}
+    repo.upsert_daily_snapshot("u1", "2026-02-01", legacy)
+    repo.upsert_daily_snapshot("u0", "2026-02-01", legacy)
+
+    report = rebuild_history(db_path, workers=0, identity_store=file_identity_store())
+
+    assert report["users"] == 2
+    assert _history(repo, "u1")[0] == ("2026-02-01", legacy)
+    assert [day for day, _ in _history(repo, "u1")] == ["2026-02-01"] + DAYS
+    assert _history(repo, "u0") == [("2026-02-01", legacy)]
+    assert repo.get_avatar_state("u0") is not None
+
+
+def test_rebuild_restages_users_written_during_the_stage(tmp_path, monkeypatch, file_identity_store, prompt_store):
+    db_path = str(tmp_path / "sessions.db")
+    repo = SessionRepository(db_path)
+    _seed(repo, ["u1", "u2"])
+    identities = file_identity_store()
+    run_daily_update_service("u1", DAYS[-1], repo=repo, identity_store=identities, prompt_store=prompt_store)
+    replay = history_rebuild.replay_user
+    replayed = []
+
+    def replay_during_live_write(r, user_id):
+        result = replay(r, user_id)
+        replayed.append(user_id)
+        if replayed == ["u1", "u2"]:
+            # A daily update lands after u1 was already staged
+            SessionRepository(db_path).upsert_daily_snapshot("u1", "2026-02-09", {"counts": {}})
+        return result
+
+    monkeypatch.setattr(history_rebuild, "replay_user", replay_during_live_write)
+    report = rebuild_history(db_path, workers=0, identity_store=identities)
+
+    assert replayed == ["u1", "u2", "u1"]
+    assert report["swap_retries"] == 1
+    assert report["restaged"] == 1
+    assert report["users"] == 2
+    assert report["days"] == 7
+    assert [day for day, _ in _history(repo, "u1")] == DAYS + ["2026-02-09"]
+    assert identities.load_identity("u1")["last_updated"] == "2026-02-09"
+
+
+def test_rebuild_aborts_when_live_history_keeps_moving(tmp_path, monkeypatch, file_identity_store, prompt_store):
+    db_path = str(tmp_path / "sessions.db")
+    repo = SessionRepository(db_path)
+    _seed(repo, ["u1", "u2"])
+    identities = file_identity_store()
+    run_daily_update_service("u1", DAYS[-1], repo=repo, identity_store=identities, prompt_store=prompt_store)
+    before = _history(repo, "u1")
+    replay = history_rebuild.replay_user
+    written = []
+
+    def replay_during_live_write(r, user_id):
+        result = replay(r, user_id)
+        if user_id == "u1":
+            # Every restage of u1 races another daily update
+            day = f"2026-03-0{len(written) + 1}"
+            SessionRepository(db_path).upsert_daily_snapshot("u1", day, {"counts": {}})
+            written.append((day, {"counts": {}}))
+        return result
+
+    monkeypatch.setattr(history_rebuild, "replay_user", replay_during_live_write)
+    with pytest.raises(HistoryRebuildConflict):
+        rebuild_history(db_path, workers=0, identity_store=identities, swap_retries=2)
+
+    assert len(written) == 3
+    assert _history(repo, "u1") == before + written
+    assert repo.get_daily_update_state("u1", DAYS[-1]) is not None
+
+    # Nothing is left watching the live tables; a quiet rerun goes through
+    with get_pool(db_path).reader() as conn:
+        leftovers = conn.execute(
+            "SELECT name FROM sqlite_master WHERE name LIKE '%rebuild%' AND type IN ('table', 'trigger')"
+        ).fetchall()
+    assert leftovers == []
+    monkeypatch.setattr(history_rebuild, "replay_user", replay)
+    report = rebuild_history(db_path, workers=0, identity_store=identities)
+    assert report["users"] == 2
+    assert report["swap_retries"] == 0
+    assert [day for day, _ in _history(repo, "u1")] == DAYS + [day for day, _ in written]
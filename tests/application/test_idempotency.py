@@ -0,0 +1,113 @@
+import threading
+from datetime import datetime, timedelta, UTC
+
+import pytest
+
+from application.services import session_service as ss
+from infrastructure.persistence.connection_pool import get_pool
+from infrastructure.persistence.session_repository import IdempotencyConflict, SessionRepository
+from infrastructure.providers import FixedTimeProvider, UUIDProvider
+
+
+def _input_data():
+    return {
+        "user_state": {"avatar": "reflecto", "date": "2026-02-08"},
+        "history": [{"date": "2026-02-07", "energy": 5, "mood": 5, "stress": 5, "focus": 5, "meaning": 5}],
+        "flow_context": {},
+        "raw_response": "steady",
+    }
+
+
+def _session_count(repo, user_id):
+    return len(repo.list_for_user(user_id))
+
+
+def test_idempotency_key_replays_stored_session(tmp_path):
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+    first = ss.create_session("u1", _input_data(), repo=repo, idempotency_key="k1")
+    again = ss.create_session("u1", _input_data(), repo=repo, idempotency_key="k1")
+
+    assert again["replayed"] is True
+    assert again["session_id"] == first["session_id"]
+    assert again["session"] == first["session"]
+    assert _session_count(repo, "u1") == 1
+
+    # Keys are scoped per user; no key means no dedup
+    ss.create_session("u2", _input_data(), repo=repo, idempotency_key="k1")
+    ss.create_session("u1", _input_data(), repo=repo)
+    assert _session_count(repo, "u1") == 2
+    assert _session_count(repo, "u2") == 1
+
+
+def test_reused_key_with_different_body_is_rejected(tmp_path):
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+    ss.create_session("u1", _input_data(), repo=repo, idempotency_key="k1")
+
+    changed = {**_input_data(), "raw_response": "restless"}
+    with pytest.raises(IdempotencyConflict):
+        ss.create_session("u1", changed, repo=repo, idempotency_key="k1")
+    assert _session_count(repo, "u1") == 1
+
+
+def test_expired_keys_are_pruned_on_insert(tmp_path, monkeypatch):
+    monkeypatch.setenv("REFLECTO_IDEMPOTENCY_WINDOW_SECONDS", "60")
+    db_path = str(tmp_path / "sessions.db")
+    repo = SessionRepository(db_path)
+    start = datetime(2026, 2, 8, 12, 0, tzinfo=UTC)
+
+    def create_at(offset_seconds, key):
+        return ss.create_session(
+            "u1",
+            _input_data(),
+            repo=repo,
+            time_provider=FixedTimeProvider(start + timedelta(seconds=offset_seconds)),
+            id_provider=UUIDProvider(),
+            idempotency_key=key,
+        )
+
+    create_at(0, "old")
+    create_at(120, "new")
+    with get_pool(db_path).reader() as conn:
+        keys = [row[0] for row in conn.execute("SELECT idem_key FROM session_idempotency")]
+    assert keys == ["key:new"]
+
+
+def test_input_hash_dedup_respects_window(tmp_path, monkeypatch):
+    monkeypatch.setenv("REFLECTO_IDEMPOTENCY_INPUT_HASH", "1")
+    monkeypatch.setenv("REFLECTO_IDEMPOTENCY_WINDOW_SECONDS", "60")
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+    start = datetime(2026, 2, 8, 12, 0, tzinfo=UTC)
+
+    def create_at(offset_seconds):
+        return ss.create_session(
+            "u1",
+            _input_data(),
+            repo=repo,
+            time_provider=FixedTimeProvider(start + timedelta(seconds=offset_seconds)),
+            id_provider=UUIDProvider(),
+        )
+
+    first = create_at(0)
+    assert create_at(30)["session_id"] == first["session_id"]
+    assert create_at(120)["session_id"] != first["session_id"]
+    assert _session_count(repo, "u1") == 2
+
+
+def test_concurrent_duplicates_store_one_session(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    SessionRepository(db_path)
+    results = []
+
+    def post():
+        results.append(ss.create_session("u1", _input_data(), repo=SessionRepository(db_path), idempotency_key="retry"))
+
+    threads = [threading.Thread(target=post) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    repo = SessionRepository(db_path)
+    assert len({r["session_id"] for r in results}) == 1
+    assert _session_count(repo, "u1") == 1
+    assert len(repo.get_events(results[0]["session_id"])) == 12
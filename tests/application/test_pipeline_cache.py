@@ -0,0 +1,111 @@
+import pytest
+
+from application.services import session_service as ss
+from application.services.pipeline_cache import PipelineCache, get_pipeline_cache
+from domain.phases.purity import freeze_value
+from infrastructure.persistence.connection_pool import get_pool
+from infrastructure.persistence.session_repository import SessionRepository
+
+
+def _input_data():
+    return {
+        "user_state": {"avatar": "reflecto", "date": "2026-02-08"},
+        "history": [{"date": "2026-02-07", "energy": 5, "mood": 5, "stress": 5, "focus": 5, "meaning": 5}],
+        "flow_context": {},
+        "raw_response": "steady",
+    }
+
+
+def test_identical_inputs_reuse_pipeline_output(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_run_session(*args, **kwargs):
+        calls.append(1)
+        return {"avatar_prompt": "A", "questions": ["Q"], "response": "R", "presence": {}, "meta": {}}
+
+    monkeypatch.setattr(ss, "run_session", fake_run_session)
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+
+    first = ss.create_session("u1", _input_data(), repo=repo)
+    second = ss.create_session("u1", _input_data(), repo=repo)
+
+    assert len(calls) == 1
+    assert first["session"] == second["session"]
+    assert first["session_id"] != second["session_id"]
+    stats = get_pipeline_cache().stats()
+    assert (stats["memory_hits"], stats["misses"]) == (1, 1)
+
+
+def test_cache_hit_and_miss_outputs_behave_the_same(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        ss,
+        "run_session",
+        lambda *args, **kwargs: freeze_value(
+            {"avatar_prompt": "A", "questions": ["Q"], "response": "R", "presence": {}, "meta": {"k": 1}}
+        ),
+    )
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+
+    miss = ss.create_session("u1", _input_data(), repo=repo)["session"]
+    hit = ss.create_session("u1", _input_data(), repo=repo)["session"]
+
+    assert miss == hit
+    assert miss["meta"]["k"] == 1 and "input_hash" in miss["meta"]
+    for output in (miss, hit):
+        with pytest.raises(TypeError):
+            output["meta"]["input_hash"] = "x"
+        with pytest.raises(TypeError):
+            output["questions"].append("Q2")
+    # The cached entry itself never picked up the per-request meta
+    third = ss.create_session("u1", _input_data(), repo=repo)["session"]
+    assert third == miss
+
+
+def test_cache_hit_stores_the_same_session_data_as_a_miss(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        ss,
+        "run_session",
+        lambda *args, **kwargs: {"response": "R", "avatar_prompt": "A", "presence": {"z": 1, "a": 2}, "meta": {}},
+    )
+    db_path = str(tmp_path / "sessions.db")
+    repo = SessionRepository(db_path)
+
+    miss = ss.create_session("u1", _input_data(), repo=repo)
+    hit = ss.create_session("u1", _input_data(), repo=repo)
+
+    assert list(hit["session"]) == list(miss["session"])
+    with get_pool(db_path).reader() as conn:
+        rows = dict(conn.execute("SELECT id, data FROM sessions").fetchall())
+    assert rows[hit["session_id"]] == rows[miss["session_id"]]
+
+
+def test_cache_is_bounded_and_invalidated_by_version():
+    cache = PipelineCache(max_entries=2)
+    cache.put("v1", "a", {"x": 1})
+    cache.put("v1", "b", {"x": 2})
+    cache.put("v1", "c", {"x": 3})
+    assert cache.get("v1", "a") is None
+    assert cache.get("v1", "c") == {"x": 3}
+
+    # Hits are read-only, like a freshly computed output
+    with pytest.raises(TypeError):
+        cache.get("v1", "c")["x"] = 99
+    assert cache.get("v1", "c") == {"x": 3}
+
+    assert cache.get("v2", "c") is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["invalidations"] == 1
+    assert stats["entries"] == 0
+
+
+def test_sqlite_tier_survives_process_cache_and_version_purge(tmp_path):
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+    PipelineCache(max_entries=0, sqlite_enabled=True).put("v1", "h", {"x": 1}, repo=repo)
+
+    fresh = PipelineCache(max_entries=4, sqlite_enabled=True)
+    assert fresh.get("v1", "h", repo=repo) == {"x": 1}
+    assert fresh.stats()["sqlite_hits"] == 1
+
+    assert PipelineCache(sqlite_enabled=True).get("v2", "h", repo=repo) is None
+    assert repo.get_pipeline_output("v1", "h") is None
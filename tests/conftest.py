@@ -17,3 +17,17 @@ def sequence_id_provider():
         return SequenceIdProvider(ids)
 
     return _factory
+
+
+@pytest.fixture(autouse=True)
+def _isolated_pipeline_cache():
+    # Pipeline outputs and rendered SSE frames are memoized per process;
+    # keep tests independent
+    from application.services.pipeline_cache import reset_pipeline_cache
+    from infrastructure.streaming.frame_cache import reset_frame_cache
+
+    reset_pipeline_cache()
+    reset_frame_cache()
+    yield
+    reset_pipeline_cache()
+    reset_frame_cache()
@@ -0,0 +1,155 @@
+import copy
+import dataclasses
+
+import pytest
+
+from domain.core.daily_state import DailyState
+from domain.phases.purity import (
+    FrozenDict,
+    FrozenList,
+    PurityViolation,
+    freeze_value,
+    get_purity_mode,
+    phase_pure,
+    purity_stats,
+    set_purity_mode,
+)
+
+
+@pytest.fixture
+def purity_mode():
+    previous = get_purity_mode()
+    yield set_purity_mode
+    set_purity_mode(previous)
+
+
+@phase_pure
+def _mutating_phase(ctx):
+    ctx["seen"] = True
+    return {"ok": True}
+
+
+def test_freeze_value_detaches_from_mutable_input():
+    day = DailyState(date="2026-02-08", energy=5, mood=5, stress=5, focus=5, meaning=5)
+    source = {"history": [{"mood": 5}], "today": day, "tags": ("a", ["b"])}
+    frozen = freeze_value(source)
+
+    source["history"][0]["mood"] = 9
+    source["tags"][1].append("c")
+    day.mood = 1
+
+    assert frozen == {"history": [{"mood": 5}], "today": frozen["today"], "tags": ("a", ["b"])}
+    assert frozen["today"].mood == 5
+    assert isinstance(frozen["history"], FrozenList) and isinstance(frozen["history"][0], FrozenDict)
+    with pytest.raises(TypeError):
+        frozen["history"][0]["mood"] = 1
+    with pytest.raises(TypeError):
+        frozen["tags"][1].append("d")
+
+
+def test_shared_dataclass_leaves_cannot_leak_between_phases(purity_mode):
+    purity_mode("strict")
+    history = freeze_value([DailyState(date="2026-02-07", mood=5), DailyState(date="2026-02-08", mood=6)])
+    seen = []
+
+    @phase_pure
+    def mutating(h):
+        h[0].mood = 1
+
+    @phase_pure
+    def reading(h):
+        seen.append(h[0].mood)
+        return h
+
+    with pytest.raises(TypeError):
+        mutating(history)
+    assert reading(history) is history
+    assert seen == [5]
+    assert isinstance(history[0], DailyState) and history[0] == DailyState(date="2026-02-07", mood=5)
+    # Deriving a new state from a frozen one yields a plain, mutable instance
+    changed = dataclasses.replace(history[0], mood=2)
+    changed.mood = 3
+    assert history[0].mood == 5
+
+
+def test_frozen_subtrees_are_shared_not_copied():
+    history = freeze_value([{"date": f"2026-01-{i:02d}", "mood": i} for i in range(1, 31)])
+
+    assert freeze_value(history) is history
+    assert copy.deepcopy(history) is history
+    wrapped = freeze_value({"history": history, "extra": [1]})
+    assert wrapped["history"] is history
+
+
+def test_phase_pure_passes_frozen_inputs_through_without_copying(purity_mode):
+    purity_mode("strict")
+    context = freeze_value({"main_mode": "explore", "items": [1, 2]})
+    seen = {}
+
+    @phase_pure
+    def phase(ctx, plain):
+        seen["ctx"] = ctx
+        with pytest.raises(TypeError):
+            plain["items"].append(3)
+        return {"ctx": ctx, "count": len(plain["items"])}
+
+    plain = {"items": [1]}
+    out = phase(context, plain)
+
+    assert seen["ctx"] is context
+    assert out["ctx"] is context and out["count"] == 1
+    assert plain == {"items": [1]}
+
+
+def test_verify_mode_detects_mutation_without_copying(purity_mode):
+    purity_mode("verify")
+    ctx = {"main_mode": "explore"}
+    checks = purity_stats()["checks"]
+
+    with pytest.raises(PurityViolation):
+        _mutating_phase(ctx)
+
+    stats = purity_stats()
+    assert stats["mode"] == "verify"
+    assert stats["checks"] == checks + 1 and stats["violations"] >= 1
+
+
+class _Opaque:
+    # __repr__ does not show the state a phase could change
+    def __init__(self):
+        self.mood = 5
+
+    def __repr__(self):
+        return "<opaque>"
+
+
+def test_verify_mode_sees_attribute_changes_hidden_from_repr(purity_mode):
+    purity_mode("verify")
+
+    @phase_pure
+    def phase(obj):
+        obj.mood = 1
+
+    with pytest.raises(PurityViolation):
+        phase(_Opaque())
+
+
+def test_off_mode_is_a_pass_through(purity_mode):
+    purity_mode("off")
+    ctx = {"items": [1]}
+
+    @phase_pure
+    def phase(c):
+        return c
+
+    calls = purity_stats()["calls"]
+    assert phase(ctx) is ctx
+    assert purity_stats()["calls"] == calls
+    with pytest.raises(ValueError):
+        purity_mode("lenient")
+
+
+def test_strict_mode_blocks_mutation(purity_mode):
+    purity_mode("strict")
+    with pytest.raises(TypeError):
+        _mutating_phase({"main_mode": "explore"})
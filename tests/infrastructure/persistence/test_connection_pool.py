@@ -0,0 +1,114 @@
+import gc
+import os
+import sqlite3
+import threading
+import weakref
+
+import pytest
+
+from infrastructure.persistence.connection_pool import get_pool
+from infrastructure.persistence.session_repository import SessionRepository
+from infrastructure.persistence.models import SessionRecord
+
+
+def test_repositories_share_one_pool_in_wal_mode(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    repo_a = SessionRepository(db_path)
+    repo_b = SessionRepository(db_path)
+
+    session_id = repo_a.save(SessionRecord(user_id="u1", data={"a": 1}, version="v"))
+    assert repo_b.get(session_id)["data"] == {"a": 1}
+
+    stats = repo_a.pool_stats()
+    assert stats == repo_b.pool_stats()
+    assert stats["settings"]["journal_mode"] == "wal"
+    assert stats["writer_open"] is True
+    assert stats["readers_open"] == 1
+
+    with get_pool(db_path).reader() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_reader_connections_are_thread_affine(tmp_path):
+    pool = get_pool(str(tmp_path / "sessions.db"))
+    seen = []
+    all_open = threading.Barrier(3)
+
+    def grab():
+        with pool.reader() as first, pool.reader() as second:
+            seen.append((id(first), id(second)))
+            all_open.wait()
+
+    threads = [threading.Thread(target=grab) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert all(a == b for a, b in seen)
+    assert len({a for a, _ in seen}) == 3
+    assert pool.stats()["connections_opened"] >= 3
+    # Each thread's reader is closed once the thread is gone
+    gc.collect()
+    assert pool.stats()["readers_open"] == 0
+
+
+def test_failed_write_rolls_back(tmp_path):
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+    with pytest.raises(ValueError):
+        repo.append_event({"id": "e1", "session_id": "s1"})
+
+    assert repo.pool_stats()["rollbacks"] == 1
+    assert repo.get_events("s1") == []
+
+
+def test_failing_after_commit_callback_does_not_fail_the_write(tmp_path):
+    pool = get_pool(str(tmp_path / "sessions.db"))
+    ran = []
+
+    def boom():
+        raise RuntimeError("subscriber bug")
+
+    with pool.writer() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.execute("INSERT INTO t VALUES (1)")
+        pool.after_commit(boom)
+        pool.after_commit(lambda: ran.append(True))
+
+    assert ran == [True]
+    with pool.reader() as conn:
+        assert conn.execute("SELECT x FROM t").fetchall() == [(1,)]
+
+
+def test_replaced_pool_stays_usable_for_existing_repositories(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    repo = SessionRepository(db_path)
+    session_id = repo.save(SessionRecord(user_id="u1", data={}, version="v"))
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    fresh = SessionRepository(db_path)
+    assert fresh.get(session_id) is None
+    # The old repository's pool was not closed underneath it
+    assert repo.get(session_id) is not None
+
+
+def test_retired_pool_closes_once_unreferenced(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    repo = SessionRepository(db_path)
+    repo.save(SessionRecord(user_id="u1", data={}, version="v"))
+    retired = weakref.ref(get_pool(db_path))
+    with retired().writer() as writer:
+        pass
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    SessionRepository(db_path)
+
+    assert retired() is not None  # still serving the old repository
+    del repo
+    gc.collect()
+    assert retired() is None
+    with pytest.raises(sqlite3.ProgrammingError):
+        writer.execute("SELECT 1")
@@ -0,0 +1,80 @@
+from domain.core.snapshot_builder import build_daily_snapshot
+from infrastructure.persistence.canonical import canonical_json
+from infrastructure.persistence.models import SessionRecord
+from infrastructure.persistence.session_repository import SessionRepository
+
+DAY = "2026-02-08"
+
+
+def _event(event_id, session_id, timestamp, event_type, payload, event_index=None):
+    event = {
+        "id": event_id,
+        "session_id": session_id,
+        "timestamp": timestamp,
+        "type": event_type,
+        "payload": payload,
+        "source": "test",
+    }
+    if event_index is not None:
+        event["event_index"] = event_index
+    return event
+
+
+def test_aggregate_is_folded_at_append_time(tmp_path):
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+    repo.save_with_events(SessionRecord(user_id="u1", data={}, version="v", record_id="s1"), [
+        _event("e1", "s1", f"{DAY}T09:00:00Z", "presence", {"state": "here"}),
+        _event("e2", "s1", f"{DAY}T09:01:00Z", "time_of_day", {"time_of_day": "morning"}),
+    ])
+    repo.append_event(_event("e3", "s1", f"{DAY}T09:02:00Z", "skills", {"focus": 1}))
+
+    aggregate = repo.get_daily_aggregate("u1", DAY)
+    assert aggregate["event_count"] == 3
+    assert aggregate["high_water_index"] == 3
+    assert aggregate["snapshot"] == build_daily_snapshot(repo.get_events_for_user_day("u1", DAY))
+    assert aggregate["snapshot"]["skills"] == {"focus": 1}
+    assert repo.verify_daily_aggregate("u1", DAY)["match"]
+
+
+def test_out_of_order_appends_match_batch_order(tmp_path):
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+    repo.save(SessionRecord(user_id="u1", data={}, version="v", record_id="s1"))
+    repo.save(SessionRecord(user_id="u1", data={}, version="v", record_id="s2"))
+    # s2 is further along, so s1's later append sorts earlier in the batch read
+    repo.append_events([
+        _event("a1", "s2", f"{DAY}T09:00:00Z", "presence", {"state": "s2"}, event_index=5),
+    ])
+    repo.append_events([
+        _event("b1", "s1", f"{DAY}T10:00:00Z", "presence", {"state": "s1"}, event_index=2),
+        _event("b2", "s1", f"{DAY}T09:00:00Z", "time_of_day", {"time_of_day": "late"}, event_index=5),
+    ])
+
+    check = repo.verify_daily_aggregate("u1", DAY)
+    assert check["match"], check
+    assert repo.get_daily_aggregate("u1", DAY)["snapshot"]["last_presence"] == {"state": "s2"}
+
+
+def test_adopted_events_and_full_rebuild(tmp_path):
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+    repo.append_event(_event("e1", "s1", f"{DAY}T08:00:00Z", "presence", {"state": "early"}))
+    repo.save_with_events(SessionRecord(user_id="u1", data={}, version="v", record_id="s2"), [
+        _event("e2", "s2", f"{DAY}T09:00:00Z", "presence", {"state": "late"}),
+    ])
+    assert repo.get_daily_aggregate("u1", DAY)["event_count"] == 1
+
+    # Owning session row arrives later: the day is rebuilt on next touch
+    repo.save(SessionRecord(user_id="u1", data={}, version="v", record_id="s1"))
+    assert repo.get_daily_aggregate("u1", DAY)["event_count"] == 2
+    assert repo.verify_daily_aggregate("u1", DAY)["match"]
+
+    assert repo.rebuild_daily_aggregates() == {"days": 1, "mismatches": 0}
+    batch = canonical_json(build_daily_snapshot(repo.get_events_for_user_day("u1", DAY)))
+    assert repo.verify_daily_aggregate("u1", DAY)["incremental"] == batch
+
+
+def test_untouched_day_reads_empty_snapshot(tmp_path):
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+    aggregate = repo.get_daily_aggregate("nobody", DAY)
+    assert aggregate["snapshot"] == build_daily_snapshot([])
+    assert aggregate["event_count"] == 0
+    assert aggregate["high_water_index"] is None
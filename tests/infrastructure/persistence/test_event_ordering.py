@@ -1,3 +1,6 @@
+import threading
+
+from infrastructure.persistence.connection_pool import get_pool
 from infrastructure.persistence.session_repository import SessionRepository
 
 
@@ -19,3 +22,133 @@ def test_event_ordering_uses_append_order(tmp_path):
 
     events = repo.get_events(session_id)
     assert [e["type"] for e in events] == ["first", "second", "third"]
+
+
+def test_implicit_indices_are_unique_under_concurrent_writers(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    SessionRepository(db_path=db_path)
+
+    def writer(worker: int) -> None:
+        repo = SessionRepository(db_path=db_path)
+        for i in range(25):
+            repo.append_event({
+                "id": f"w{worker}-{i}",
+                "session_id": "s1",
+                "timestamp": "2026-02-08T00:00:00Z",
+                "type": "tick",
+                "payload": {},
+                "source": "test",
+            })
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    events = SessionRepository(db_path=db_path).get_events("s1")
+    assert [e["event_index"] for e in events] == list(range(1, 101))
+
+
+def test_allocate_event_indices_continues_after_explicit_indices(tmp_path):
+    repo = SessionRepository(db_path=str(tmp_path / "sessions.db"))
+    repo.append_events([
+        {"id": "e1", "session_id": "s1", "timestamp": "t", "event_index": 1, "type": "a", "payload": {}, "source": "test"},
+        {"id": "e2", "session_id": "s1", "timestamp": "t", "event_index": 7, "type": "b", "payload": {}, "source": "test"},
+    ])
+    assert list(repo.allocate_event_indices("s1", 3)) == [8, 9, 10]
+    assert list(repo.allocate_event_indices("s1")) == [11]
+    assert list(repo.allocate_event_indices("s2", 2)) == [1, 2]
+
+
+def test_event_records_decode_payload_lazily(tmp_path):
+    repo = SessionRepository(db_path=str(tmp_path / "sessions.db"))
+    repo.append_event({
+        "id": "e1",
+        "session_id": "s1",
+        "timestamp": "2026-02-08T00:00:00Z",
+        "type": "presence",
+        "payload": {"state": "calm"},
+        "source": "test",
+    })
+
+    (event,) = list(repo.iter_events("s1"))
+    assert event.type == "presence"
+    assert event.payload_raw == '{"state":"calm"}'
+    assert event["payload"] == {"state": "calm"}
+    assert event.payload is event.payload
+    assert event.get("missing") is None
+    assert event == {
+        "id": "e1",
+        "session_id": "s1",
+        "timestamp": "2026-02-08T00:00:00Z",
+        "event_index": 1,
+        "type": "presence",
+        "payload": {"state": "calm"},
+        "source": "test",
+        "event_hash": None,
+        "prev_hash": None,
+    }
+
+
+def test_paused_iteration_does_not_block_writers():
+    # :memory: shares the writer connection with readers; nothing may be held across yield
+    repo = SessionRepository(db_path=":memory:")
+    session_id = "paused-iter"
+    for n in range(5):
+        repo.append_event({
+            "id": f"{session_id}-{n}",
+            "session_id": session_id,
+            "timestamp": "2026-02-08T00:00:00Z",
+            "type": "step",
+            "payload": {"n": n},
+            "source": "test",
+        })
+
+    events = repo.iter_events(session_id, chunk_size=2)
+    first = next(events)
+
+    def write():
+        repo.append_event({
+            "id": f"{session_id}-late",
+            "session_id": session_id,
+            "timestamp": "2026-02-08T00:00:01Z",
+            "type": "step",
+            "payload": {"n": 5},
+            "source": "test",
+        })
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    writer.join(timeout=5)
+    assert not writer.is_alive()
+
+    # Resumed from another thread; pages continue by event_index
+    rest = []
+    reader = threading.Thread(target=lambda: rest.extend(events))
+    reader.start()
+    reader.join(timeout=5)
+    assert [first.event_index] + [e.event_index for e in rest] == [1, 2, 3, 4, 5, 6]
+
+
+def test_sync_and_paged_readers_agree_on_legacy_rows(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    repo = SessionRepository(db_path=db_path)
+    session_id = "legacy-mix"
+    for n in range(4):
+        repo.append_event({
+            "id": f"{session_id}-{n}",
+            "session_id": session_id,
+            "timestamp": f"2026-02-08T00:00:0{n}Z",
+            "type": "step",
+            "payload": {"n": n},
+            "source": "test",
+        })
+    # Legacy rows carry a non-positive index
+    with get_pool(db_path).writer() as conn:
+        conn.execute("UPDATE session_events SET event_index = -1 WHERE id = ?", (f"{session_id}-0",))
+        conn.execute("UPDATE session_events SET event_index = 0 WHERE id = ?", (f"{session_id}-1",))
+
+    synced = [e.id for e in repo.iter_events(session_id, chunk_size=1)]
+    paged = [e.id for e in repo.read_events_after(session_id)]
+    assert synced == paged == [f"{session_id}-{n}" for n in range(4)]
@@ -1,6 +1,7 @@
 import os
 import tempfile
 import shutil
+import sqlite3
 import pytest
 from infrastructure.persistence.session_repository import SessionRepository
 from infrastructure.persistence.models import SessionRecord
@@ -42,3 +43,71 @@ def test_list_for_user(temp_db):
 def test_get_missing(temp_db):
     repo = SessionRepository(temp_db)
     assert repo.get("not-a-real-id") is None
+
+def _event(event_id, session_id, event_type, event_index=None):
+    event = {
+        "id": event_id,
+        "session_id": session_id,
+        "timestamp": "2026-02-08T00:00:00Z",
+        "type": event_type,
+        "payload": {},
+        "source": "test",
+    }
+    if event_index is not None:
+        event["event_index"] = event_index
+    return event
+
+def test_append_events_batch_continues_sequence(temp_db):
+    repo = SessionRepository(temp_db)
+    repo.append_event(_event("e1", "s1", "first"))
+    repo.append_events([_event("e2", "s1", "second"), _event("e3", "s1", "third")])
+    events = repo.get_events("s1")
+    assert [(e["type"], e["event_index"]) for e in events] == [("first", 1), ("second", 2), ("third", 3)]
+
+def test_save_with_events_is_all_or_nothing(temp_db):
+    repo = SessionRepository(temp_db)
+    rec = make_record("user1", {"foo": "bar"})
+    # Duplicate event index violates the unique journal index mid-batch
+    events = [_event("e1", rec.id, "start", 1), _event("e2", rec.id, "done", 1)]
+    with pytest.raises(sqlite3.IntegrityError):
+        repo.save_with_events(rec, events)
+    assert repo.get(rec.id) is None
+    assert repo.get_events(rec.id) == []
+
+    repo.save_with_events(rec, [_event("e1", rec.id, "start", 1), _event("e2", rec.id, "done", 2)])
+    assert repo.get(rec.id)["data"] == {"foo": "bar"}
+    assert [e["type"] for e in repo.get_events(rec.id)] == ["start", "done"]
+
+def test_list_for_user_page_walks_keyset_cursor(temp_db):
+    repo = SessionRepository(temp_db)
+    # s0..s2 share a created_at, so the id tiebreak matters
+    created = ["2026-02-08", "2026-02-08", "2026-02-08", "2026-02-09", "2026-02-10"]
+    for i, day in enumerate(created):
+        repo.save(SessionRecord(
+            user_id="userA",
+            data={"i": i},
+            version="v",
+            record_id=f"s{i}",
+            created_at=f"{day}T00:00:00",
+        ))
+
+    seen = []
+    cursor = None
+    while True:
+        page = repo.list_for_user_page("userA", limit=2, cursor=cursor, fields=["id", "created_at"])
+        assert all(set(item) == {"id", "created_at"} for item in page["items"])
+        seen += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["s4", "s3", "s2", "s1", "s0"]
+
+    full = repo.list_for_user_page("userA", limit=1)
+    assert full["items"][0]["data"] == {"i": 4}
+
+def test_list_for_user_page_rejects_bad_input(temp_db):
+    repo = SessionRepository(temp_db)
+    with pytest.raises(ValueError):
+        repo.list_for_user_page("userA", fields=["secret"])
+    with pytest.raises(ValueError):
+        repo.list_for_user_page("userA", cursor="not-a-cursor")
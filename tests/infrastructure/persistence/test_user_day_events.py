@@ -0,0 +1,73 @@
+import json
+import sqlite3
+
+from infrastructure.persistence.connection_pool import get_pool
+from infrastructure.persistence.models import SessionRecord
+from infrastructure.persistence.session_repository import SessionRepository
+
+
+def _event(event_id, session_id, timestamp, event_type="presence"):
+    return {
+        "id": event_id,
+        "session_id": session_id,
+        "timestamp": timestamp,
+        "type": event_type,
+        "payload": {"state": event_id},
+        "source": "test",
+    }
+
+
+def test_user_day_read_is_an_indexed_range_scan(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    repo = SessionRepository(db_path)
+    rec = SessionRecord(user_id="u1", data={}, version="v", record_id="s1")
+    repo.save_with_events(rec, [
+        _event("e1", "s1", "2026-02-07T23:59:00Z"),
+        _event("e2", "s1", "2026-02-08T09:00:00Z"),
+    ])
+    # Events appended before their session row get their owner on save
+    repo.append_event(_event("e3", "s2", "2026-02-08T10:00:00Z", "skills"))
+    repo.save(SessionRecord(user_id="u1", data={}, version="v", record_id="s2"))
+    repo.save_with_events(
+        SessionRecord(user_id="u2", data={}, version="v", record_id="s3"),
+        [_event("e4", "s3", "2026-02-08T09:00:00Z")],
+    )
+
+    events = repo.get_events_for_user_day("u1", "2026-02-08")
+    assert sorted(e["id"] for e in events) == ["e2", "e3"]
+
+    with get_pool(db_path).reader() as conn:
+        plan = " ".join(
+            str(row[-1]) for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM session_events "
+                "WHERE user_id = ? AND day = ? ORDER BY event_index",
+                ("u1", "2026-02-08"),
+            )
+        )
+    assert "idx_session_events_user_day" in plan
+
+
+def test_legacy_rows_are_backfilled(tmp_path):
+    db_path = str(tmp_path / "legacy.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE sessions (id TEXT PRIMARY KEY, user_id TEXT NOT NULL, "
+            "created_at TEXT NOT NULL, data TEXT NOT NULL, version TEXT NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE session_events (id TEXT PRIMARY KEY, session_id TEXT NOT NULL, "
+            "timestamp TEXT NOT NULL, event_index INTEGER NOT NULL, type TEXT NOT NULL, "
+            "payload TEXT NOT NULL, source TEXT NOT NULL, event_hash TEXT, prev_hash TEXT)"
+        )
+        conn.execute("INSERT INTO sessions VALUES ('s1', 'u1', '2026-02-08', '{}', 'v')")
+        for i in range(1, 8):
+            conn.execute(
+                "INSERT INTO session_events VALUES (?, 's1', '2026-02-08T09:00:00Z', ?, 'presence', ?, 'test', NULL, NULL)",
+                (f"e{i}", i, json.dumps({"i": i})),
+            )
+
+    repo = SessionRepository(db_path)
+    events = repo.get_events_for_user_day("u1", "2026-02-08")
+    assert [e["payload"]["i"] for e in events] == list(range(1, 8))
+    # Completed migrations are recorded and not re-run
+    assert repo.backfill_event_user_day() == 0
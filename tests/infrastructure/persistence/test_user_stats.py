@@ -0,0 +1,60 @@
+import random
+from datetime import date, timedelta
+
+from domain.core.pattern_engine import extract_patterns
+from domain.core.streaks import compute_streak
+from infrastructure.persistence.session_repository import STATS_WINDOW, SessionRepository
+
+
+def _day(n):
+    return (date(2026, 1, 1) + timedelta(days=n)).isoformat()
+
+
+def _expected(repo, user_id):
+    rows = repo.list_daily_snapshots(user_id, limit=STATS_WINDOW)
+    meaningful_days = [
+        s["day"] for s in repo.list_daily_snapshots(user_id, limit=10_000)
+        if s["snapshot"].get("meaningful_events", 0) > 0
+    ]
+    return rows, (meaningful_days[0] if meaningful_days else None)
+
+
+def _as_snapshots(stats):
+    return [
+        {"snapshot": {"meaningful_events": m, "skills": {} if f is None else {"focus": f}}}
+        for m, f in zip(stats["meaningful"], stats["focus"])
+    ]
+
+
+def test_stats_follow_every_upsert(tmp_path):
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+    rng = random.Random(7)
+    # Out-of-order days, rewrites of existing days, more days than the window
+    for _ in range(200):
+        snapshot = {"meaningful_events": rng.choice([0, 0, 1, 3])}
+        if rng.random() < 0.8:
+            snapshot["skills"] = {"focus": rng.randint(30, 100)}
+        repo.upsert_daily_snapshot("u1", _day(rng.randint(0, 90)), snapshot)
+
+        stats = repo.get_user_stats("u1")
+        rows, last_meaningful = _expected(repo, "u1")
+        assert stats["days"] == [r["day"] for r in rows]
+        assert stats["last_meaningful_day"] == last_meaningful
+        assert stats["streak"] == compute_streak(rows)
+        assert compute_streak(_as_snapshots(stats)) == compute_streak(rows)
+        assert extract_patterns(_as_snapshots(stats)[:13]) == extract_patterns(rows[:13])
+
+
+def test_stats_are_built_on_first_touch(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    repo = SessionRepository(db_path)
+    for n in range(5):
+        repo.upsert_daily_snapshot("u1", _day(n), {"meaningful_events": 1, "skills": {"focus": 90}})
+    with repo._pool.writer() as conn:
+        conn.execute("DELETE FROM user_stats")
+
+    stats = repo.get_user_stats("u1")
+    assert stats["streak"] == 5
+    assert stats["days"][0] == _day(4)
+    assert stats["focus"] == [90] * 5
+    assert repo.get_user_stats("nobody")["days"] == []
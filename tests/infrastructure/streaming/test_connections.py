@@ -0,0 +1,124 @@
+import asyncio
+
+from infrastructure.streaming.connections import HEARTBEAT, StreamRegistry
+
+
+async def _source(frames, delay=0.0, forever=False, closed=None):
+    try:
+        for frame in frames:
+            await asyncio.sleep(delay)
+            yield frame
+        while forever:
+            await asyncio.sleep(3600)
+    finally:
+        if closed is not None:
+            closed.append(True)
+
+
+def test_heartbeat_fills_idle_gaps():
+    registry = StreamRegistry(heartbeat_seconds=0.02)
+
+    async def main():
+        return [f async for f in registry.guard(_source(["a", "b"], delay=0.07))]
+
+    frames = asyncio.run(main())
+    assert [f for f in frames if f != HEARTBEAT] == ["a", "b"]
+    assert HEARTBEAT in frames
+    assert registry.stats()["open"] == 0
+
+
+def test_client_that_stops_reading_is_disconnected():
+    registry = StreamRegistry(heartbeat_seconds=0, max_buffer_bytes=250)
+    closed = []
+
+    async def main():
+        stream = registry.guard(_source(["x" * 100] * 10, forever=True, closed=closed))
+        frames = [await stream.__anext__()]
+        await asyncio.sleep(0.05)  # not reading: the buffer backs up
+        frames += [f async for f in stream]
+        return frames
+
+    frames = asyncio.run(main())
+    assert len(frames) < 10
+    assert closed == [True]
+    stats = registry.stats()
+    assert stats["slow_disconnects"] == 1 and stats["buffered_bytes"] == 0
+
+
+def test_buffer_limit_counts_encoded_bytes_of_text_frames():
+    # 100 characters, 200 bytes on the wire
+    registry = StreamRegistry(heartbeat_seconds=0, max_buffer_bytes=250)
+
+    async def main():
+        stream = registry.guard(_source(["\u00e9" * 100] * 3))
+        frames = [await stream.__anext__()]
+        await asyncio.sleep(0.05)
+        frames += [f async for f in stream]
+        return frames
+
+    frames = asyncio.run(main())
+    assert len(frames) < 3
+    assert registry.stats()["slow_disconnects"] == 1
+
+
+def test_drain_flushes_and_closes_open_streams():
+    registry = StreamRegistry(heartbeat_seconds=0)
+    closed = []
+
+    async def main():
+        async def consume():
+            return [f async for f in registry.guard(_source(["a", "b"], forever=True, closed=closed))]
+
+        tasks = [asyncio.ensure_future(consume()) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        result = await registry.drain(timeout=1)
+        late = [f async for f in registry.guard(_source(["late"]))]
+        return result, await asyncio.gather(*tasks), late
+
+    result, streams, late = asyncio.run(main())
+    assert result == {"drained": 3, "forced": 0}
+    assert streams == [["a", "b"]] * 3
+    assert closed == [True] * 3
+    assert late == []
+
+
+def test_drain_cuts_off_streams_past_the_deadline():
+    registry = StreamRegistry(heartbeat_seconds=0)
+
+    async def main():
+        stream = registry.guard(_source(["a", "b", "c"], forever=True))
+        first = await stream.__anext__()
+        await asyncio.sleep(0.01)
+        # The client never reads again, so the stream cannot finish flushing
+        result = await registry.drain(timeout=0.05)
+        rest = [f async for f in stream]
+        return first, result, rest
+
+    first, result, rest = asyncio.run(main())
+    assert first == "a"
+    assert result == {"drained": 0, "forced": 1}
+    assert rest == []
+
+
+def test_forced_close_cancels_a_response_stuck_sending():
+    registry = StreamRegistry(heartbeat_seconds=0)
+
+    async def main():
+        got_frame = asyncio.Event()
+
+        async def respond():
+            async for _ in registry.guard(_source(["a"], forever=True)):
+                got_frame.set()
+                # send() to a client that stopped reading never returns
+                await asyncio.Event().wait()
+
+        response = asyncio.ensure_future(respond())
+        await got_frame.wait()
+        result = await registry.drain(timeout=0.05)
+        await asyncio.wait({response}, timeout=1)
+        return result, response
+
+    result, response = asyncio.run(main())
+    assert result == {"drained": 0, "forced": 1}
+    assert response.cancelled()
+    assert registry.stats()["open"] == 0
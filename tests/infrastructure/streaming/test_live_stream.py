@@ -0,0 +1,158 @@
+import asyncio
+
+from infrastructure.persistence.session_repository import SessionRepository
+from infrastructure.streaming.streaming_service import stream_session_events
+
+
+def _event(index, event_type):
+    return {
+        "id": f"e{index}",
+        "session_id": "s1",
+        "timestamp": "2026-02-08T00:00:00Z",
+        "event_index": index,
+        "type": event_type,
+        "payload": {"i": index} if event_type != "done" else {"session_id": "s1"},
+        "source": "test",
+    }
+
+
+def _types(frames):
+    body = "".join(f.decode() if isinstance(f, bytes) else f for f in frames)
+    return [line.removeprefix("event: ") for line in body.splitlines() if line.startswith("event: ")]
+
+
+def test_stream_replays_history_then_follows_live_appends(tmp_path):
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+    repo.append_events([_event(1, "avatar"), _event(2, "questions")])
+
+    async def main():
+        frames = []
+        stream = stream_session_events("s1", repo=repo, idle_timeout=5)
+
+        async def consume():
+            async for frame in stream:
+                frames.append(frame)
+
+        task = asyncio.create_task(consume())
+        while len(frames) < 2:
+            await asyncio.sleep(0.01)
+        # Writers run on worker threads, as they do behind the API
+        await asyncio.to_thread(repo.append_events, [_event(3, "presence")])
+        await asyncio.to_thread(repo.append_events, [_event(4, "closing"), _event(5, "done")])
+        await asyncio.wait_for(task, 5)
+        return frames
+
+    frames = asyncio.run(main())
+    assert _types(frames) == ["avatar", "questions", "presence", "closing", "done"]
+    assert repo.broker.stats()["subscribers"] == 0
+
+
+def test_live_stream_ends_after_idle_timeout(tmp_path):
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+
+    async def main():
+        return [frame async for frame in stream_session_events("missing", repo=repo, idle_timeout=0.05)]
+
+    assert asyncio.run(main()) == []
+
+
+def test_frames_carry_event_index_as_sse_id_and_retry_hint_once(tmp_path):
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+    repo.append_events([_event(1, "avatar"), _event(2, "done")])
+
+    frames = list(stream_session_events("s1", repo=repo))
+    assert frames[0].startswith("retry: ") and "id: 1\n" in frames[0]
+    assert "id: 2\n" in frames[1] and "retry: " not in frames[1]
+
+
+def test_resume_after_index_skips_delivered_events(tmp_path):
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+    repo.append_events([_event(i, t) for i, t in enumerate(["avatar", "questions", "presence", "done"], 1)])
+
+    assert [e.event_index for e in repo.iter_events("s1", after_index=2)] == [3, 4]
+    assert _types(stream_session_events("s1", repo=repo, after_index=2)) == ["presence", "done"]
+
+    async def resume_after_done():
+        return [f async for f in stream_session_events("s1", repo=repo, idle_timeout=5, after_index=4)]
+
+    # Nothing left after 'done': the stream closes instead of idling
+    assert asyncio.run(resume_after_done()) == []
+
+
+def test_async_replay_reads_journal_in_pages_off_loop(tmp_path, monkeypatch):
+    monkeypatch.setenv("REFLECTO_STREAM_CHUNK_SIZE", "3")
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+    repo.append_events([_event(i, "step") for i in range(1, 10)] + [_event(10, "done")])
+
+    calls = []
+    read_page = repo.read_events_after
+
+    def spy(session_id, after_index=None, limit=256):
+        calls.append((after_index, limit))
+        return read_page(session_id, after_index, limit)
+
+    monkeypatch.setattr(repo, "read_events_after", spy)
+
+    async def main():
+        streams = [stream_session_events("s1", repo=repo, idle_timeout=5) for _ in range(20)]
+        return await asyncio.gather(*[_collect(s) for s in streams])
+
+    async def _collect(stream):
+        return [f async for f in stream]
+
+    results = asyncio.run(main())
+    assert all(r == results[0] for r in results)
+    assert _types(results[0]) == ["step"] * 9 + ["done"]
+    # Streams interleave; each one walks the same four keyset pages
+    assert sorted(calls, key=str) == sorted([(None, 3), (3, 3), (6, 3), (9, 3)] * 20, key=str)
+
+
+def test_repositories_share_schema_setup_per_database(tmp_path):
+    first = SessionRepository(str(tmp_path / "sessions.db"))
+    assert first._pool.schema_ready
+    opened = first.pool_stats()["writer_checkouts"]
+    SessionRepository(str(tmp_path / "sessions.db"))
+    assert first.pool_stats()["writer_checkouts"] == opened
+
+
+def test_completed_session_frames_are_rendered_once(tmp_path, monkeypatch):
+    from infrastructure.streaming import streaming_service
+    from infrastructure.streaming.frame_cache import get_frame_cache
+
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+    repo.append_events([_event(i, t) for i, t in enumerate(["avatar", "questions", "presence", "done"], 1)])
+    first = "".join(stream_session_events("s1", repo=repo))
+
+    def no_render(*args, **kwargs):
+        raise AssertionError("frames should come from the cache")
+
+    monkeypatch.setattr(streaming_service, "sse", no_render)
+
+    async def replay(after_index=None):
+        return [f async for f in stream_session_events("s1", repo=repo, idle_timeout=5, after_index=after_index)]
+
+    chunks = asyncio.run(replay())
+    assert chunks == [first.encode()]
+    assert "".join(stream_session_events("s1", repo=repo)) == first
+    assert _types(asyncio.run(replay(after_index=2))) == ["presence", "done"]
+    assert asyncio.run(replay(after_index=4)) == []
+
+    stats = get_frame_cache().stats()
+    # Stored without the per-connection retry hint
+    assert stats["entries"] == 1 and stats["bytes"] == len(first.encode()) - len("retry: 3000\n")
+    assert stats["memory_hits"] == 4 and stats["misses"] == 1
+
+
+def test_frame_cache_evicts_by_byte_budget_and_reloads_from_sqlite(tmp_path):
+    from infrastructure.streaming.frame_cache import FrameCache, RenderedSession
+
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+    cache = FrameCache(max_bytes=10, sqlite_enabled=True)
+    a = RenderedSession.from_frames([(1, "aaaaaa")])
+    b = RenderedSession.from_frames([(1, "bbbbbb")])
+    cache.put(repo, "a", a)
+    cache.put(repo, "b", b)
+
+    assert cache.stats()["bytes"] == 6 and cache.stats()["evictions"] == 1
+    assert cache.get(repo, "a") == a
+    assert cache.stats()["sqlite_hits"] == 1
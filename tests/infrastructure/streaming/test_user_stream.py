@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+from infrastructure.persistence.models import SessionRecord
+from infrastructure.persistence.session_repository import SessionRepository
+from infrastructure.streaming.broker import EventBroker
+from infrastructure.streaming.streaming_service import stream_user_events
+
+
+def _event(session_id, index, event_type):
+    return {
+        "id": f"{session_id}-e{index}",
+        "session_id": session_id,
+        "timestamp": "2026-02-08T00:00:00Z",
+        "event_index": index,
+        "type": event_type,
+        "payload": {"i": index},
+        "source": "test",
+    }
+
+
+def _frames(repo, types=None, writes=()):
+    async def main():
+        stream = stream_user_events("u1", repo=repo, types=types, idle_timeout=0.5)
+        it = stream.__aiter__()
+        frames = [await it.__anext__()]  # retry hint; the subscription is live now
+        for write in writes:
+            await asyncio.to_thread(write)
+        async for frame in it:
+            frames.append(frame)
+        return frames
+
+    return asyncio.run(main())
+
+
+def _parse(frames):
+    out = []
+    for frame in frames:
+        lines = dict(line.split(": ", 1) for line in frame.strip().splitlines())
+        if "event" in lines:
+            out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+
+def test_user_stream_multiplexes_sessions_and_daily_updates(tmp_path):
+    repo = SessionRepository(str(tmp_path / "sessions.db"), broker=EventBroker())
+    a = SessionRecord(user_id="u1", data={}, version="v", record_id="a")
+    b = SessionRecord(user_id="u1", data={}, version="v", record_id="b")
+    other = SessionRecord(user_id="u2", data={}, version="v", record_id="c")
+
+    events = _parse(_frames(repo, writes=[
+        lambda: repo.save_with_events(a, [_event("a", 1, "avatar"), _event("a", 2, "done")]),
+        lambda: repo.save_with_events(other, [_event("c", 1, "avatar")]),
+        lambda: repo.save_with_events(b, [_event("b", 1, "presence")]),
+        lambda: repo.upsert_daily_snapshot("u1", "2026-02-08", {"mood": 5}),
+        lambda: repo.upsert_avatar_state("u1", {"glow": 1}),
+    ]))
+
+    assert [(t, d["session_id"], d["event_index"]) for t, d in events[:3]] == [
+        ("avatar", "a", 1), ("done", "a", 2), ("presence", "b", 1),
+    ]
+    assert events[3] == ("daily_update", {
+        "session_id": None, "event_index": None,
+        "payload": {"day": "2026-02-08", "snapshot": {"mood": 5}},
+    })
+    assert events[4][0] == "avatar_state" and events[4][1]["payload"] == {"state": {"glow": 1}}
+    assert len(events) == 5
+
+
+def test_user_stream_filters_types_before_queueing(tmp_path):
+    repo = SessionRepository(str(tmp_path / "sessions.db"), broker=EventBroker())
+    a = SessionRecord(user_id="u1", data={}, version="v", record_id="a")
+
+    events = _parse(_frames(repo, types=["done", "daily_update"], writes=[
+        lambda: repo.save_with_events(a, [_event("a", 1, "avatar"), _event("a", 2, "done")]),
+        lambda: repo.upsert_daily_snapshot("u1", "2026-02-08", {"mood": 5}),
+    ]))
+
+    assert [t for t, _ in events] == ["done", "daily_update"]
+    assert repo.broker.stats()["delivered"] == 2
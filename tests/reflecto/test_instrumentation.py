@@ -0,0 +1,54 @@
+"""
+Tests for per-stage instrumentation.
+"""
+from domain.core.daily_state import DailyState
+from reflecto import instrumentation
+from reflecto.orchestrator import run_reflecto
+
+
+def _history():
+    return [DailyState(date="2026-01-20", energy=6, mood=7, stress=4, focus=5, meaning=6)]
+
+
+def test_orchestrator_phases_are_measured_and_hooked():
+    instrumentation.reset_instrumentation()
+    seen = []
+    instrumentation.add_hook(seen.append)
+    try:
+        with instrumentation.collect_timings() as timings:
+            run_reflecto({}, _history(), {"main_mode": "explore"}, "hi")
+    finally:
+        instrumentation.remove_hook(seen.append)
+
+    phases = ["prompt", "flow", "memory", "presence", "shape", "silence", "continuity", "voice", "closing"]
+    assert [t.key for t in timings] == [f"orchestrator.{p}" for p in phases]
+    assert seen == timings
+    assert all(t.wall_seconds >= 0 and t.cpu_seconds >= 0 for t in timings)
+
+    stats = instrumentation.instrumentation_stats()
+    assert stats["orchestrator.memory"]["count"] == 1
+    assert sum(stats["orchestrator.memory"]["wall_histogram"].values()) == 1
+
+
+def test_create_session_timings_are_opt_in_and_never_persisted(tmp_path):
+    from application.services.session_service import create_session
+    from infrastructure.persistence.session_repository import SessionRepository
+
+    repo = SessionRepository(str(tmp_path / "sessions.db"))
+    input_data = {
+        "user_state": {"avatar": "reflecto"},
+        "history": [{"date": "2026-01-27", "energy": 7, "mood": 6, "stress": 4, "focus": 5, "meaning": 6}],
+        "flow_context": {},
+        "raw_response": None,
+    }
+
+    plain = create_session("u1", input_data, repo=repo)
+    assert "timings" not in plain["session"]["meta"]
+
+    timed = create_session("u1", input_data, repo=repo, include_timings=True)
+    timings = timed["session"]["meta"]["timings"]
+    assert {"session.input_hash", "session.build_events", "session.persist"} <= set(timings)
+    assert set(timings["session.persist"]) == {"wall_ms", "cpu_ms", "alloc_blocks"}
+
+    stored = repo.get(timed["session_id"])
+    assert "timings" not in stored["data"]["meta"]
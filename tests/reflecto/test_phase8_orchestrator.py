@@ -76,3 +76,31 @@ def test_run_reflecto_no_input_mutation():
     assert user_state == user_state_orig
     assert history == history_orig
     assert flow_context == flow_context_orig
+
+def test_phase_mutating_a_history_item_does_not_leak(monkeypatch):
+    import reflecto.orchestrator as orch
+    seen = {}
+
+    def mutating_prompt(today_state, memory_patterns, flow_context):
+        # today_state is the last history item here (user_state has no date)
+        with pytest.raises(TypeError):
+            today_state.mood = 1
+        return "p"
+
+    def reading_memory(history_dicts):
+        seen["memory"] = [h["mood"] for h in history_dicts]
+        return {}
+
+    def reading_presence(today_state, memory_patterns, flow_context):
+        seen["presence"] = today_state.mood
+        return {}
+
+    monkeypatch.setattr(orch, "load_avatar_prompt", mutating_prompt)
+    monkeypatch.setattr(orch, "analyze_memory_patterns", reading_memory)
+    monkeypatch.setattr(orch, "build_presence", reading_presence)
+    history = make_fake_history()
+    orch.run_reflecto({"avatar": "reflecto"}, history, {"main_mode": "explore"}, "hi")
+
+    assert seen["memory"] == [7] * 7
+    assert seen["presence"] == 7
+    assert history == make_fake_history()
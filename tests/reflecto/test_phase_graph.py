@@ -0,0 +1,81 @@
+"""
+Tests for the phase DAG executor.
+"""
+import threading
+
+import pytest
+
+from reflecto.phase_graph import Phase, PhaseGraph
+
+
+def _phase(name, inputs, outputs, calls, io_bound=False, body=None):
+    def run(values):
+        calls.append(name)
+        if body is not None:
+            body()
+        return {key: f"{name}:{key}" for key in outputs}
+    return Phase(name, run, tuple(inputs), tuple(outputs), io_bound)
+
+
+def test_stable_topological_order_follows_declaration():
+    calls = []
+    graph = PhaseGraph([
+        _phase("late", ["b"], ["c"], calls),
+        _phase("first", ["seed"], ["a"], calls),
+        _phase("second", ["a"], ["b"], calls),
+        _phase("free", [], ["d"], calls),
+    ])
+    assert [p.name for p in graph.order] == ["first", "second", "late", "free"]
+
+    values = graph.run({"seed": 1})
+    assert calls == ["first", "second", "late", "free"]
+    assert values["c"] == "late:c"
+
+
+def test_unrequested_outputs_are_skipped():
+    calls = []
+    graph = PhaseGraph([
+        _phase("a", [], ["a"], calls),
+        _phase("b", ["a"], ["b"], calls),
+        _phase("unrelated", [], ["u"], calls),
+    ])
+    graph.run({}, requested=["b"])
+    assert calls == ["a", "b"]
+
+
+def test_io_bound_branches_overlap():
+    calls = []
+    # Each branch waits for the other: only passes if both run at once
+    barrier = threading.Barrier(2, timeout=2)
+    graph = PhaseGraph([
+        _phase("left", [], ["l"], calls, io_bound=True, body=barrier.wait),
+        _phase("right", [], ["r"], calls, io_bound=True, body=barrier.wait),
+        _phase("join", ["l", "r"], ["out"], calls),
+    ])
+    values = graph.run({})
+    assert values["out"] == "join:out"
+    assert calls[-1] == "join"
+
+
+def test_invalid_graphs_are_rejected():
+    calls = []
+    with pytest.raises(ValueError, match="cycle"):
+        PhaseGraph([_phase("a", ["y"], ["x"], calls), _phase("b", ["x"], ["y"], calls)])
+    with pytest.raises(ValueError, match="produced by both"):
+        PhaseGraph([_phase("a", [], ["x"], calls), _phase("b", [], ["x"], calls)])
+    with pytest.raises(KeyError):
+        PhaseGraph([_phase("a", ["missing"], ["x"], calls)]).run({})
+
+
+def test_run_reflecto_skips_phases_for_unrequested_outputs(monkeypatch):
+    import reflecto.orchestrator as orch
+    from domain.core.daily_state import DailyState
+
+    calls = []
+    for name, attr in [("prompt", "load_avatar_prompt"), ("presence", "build_presence"), ("closing", "decide_closing")]:
+        monkeypatch.setattr(orch, attr, lambda *a, _n=name, **k: calls.append(_n) or _n)
+    history = [DailyState(date="2026-01-20", energy=6, mood=7, stress=4, focus=5, meaning=6)]
+
+    out = orch.run_reflecto({}, history, {"main_mode": "explore"}, outputs=["prompt", "presence"])
+    assert out == {"prompt": "prompt", "presence": "presence"}
+    assert calls == ["prompt", "presence"]